@@ -1,11 +1,18 @@
 import streamlit as st
-import yt_dlp
 import os
-import speech_recognition as sr
-import tempfile
-import subprocess
+import datetime
 import json
-from pydub import AudioSegment
+import time
+from batch import DONE, BatchItem, export_archive
+from improve import improvement_cache
+from jobs import CANCELLED, JobManager
+from metrics import REGISTRY, StageMetrics, serve_metrics
+from recognizers import BACKENDS, DEFAULT_BACKEND
+from transcript_cache import TranscriptCache
+from transcriber import (
+    AUTO_LANGUAGE, DEFAULT_WORKERS, MAX_WORKERS, UPLOAD_FORMATS, build_batch, detect_platform,
+    improve_text_with_gpt, source_label, transcribe, transcribe_batch
+)
 
 # Configuration de la page
 st.set_page_config(
@@ -14,22 +21,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Liste des plateformes supportées
-SUPPORTED_PLATFORMS = {
-    'YouTube': ['youtube.com', 'youtu.be'],
-    'Vimeo': ['vimeo.com'],
-    'Dailymotion': ['dailymotion.com', 'dai.ly'],
-    'Facebook': ['facebook.com', 'fb.watch'],
-    'Instagram': ['instagram.com'],
-    'TikTok': ['tiktok.com'],
-    'Twitter/X': ['twitter.com', 'x.com'],
-    'Twitch': ['twitch.tv'],
-    'LinkedIn': ['linkedin.com'],
-    'SoundCloud': ['soundcloud.com'],
-    'Reddit': ['reddit.com'],
-    'Autres plateformes': ['*']
-}
-
 # Initialisation du session_state
 if 'transcription' not in st.session_state:
     st.session_state.transcription = None
@@ -37,41 +28,81 @@ if 'url' not in st.session_state:
     st.session_state.url = None
 if 'file_source' not in st.session_state:
     st.session_state.file_source = None
+if 'batch_archive' not in st.session_state:
+    st.session_state.batch_archive = None
+if 'batch_job' not in st.session_state:
+    st.session_state.batch_job = None
+if 'batch_items' not in st.session_state:
+    st.session_state.batch_items = None
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+if 'job_id' not in st.session_state:
+    # Après un rechargement de la page, la tâche est retrouvée grâce à l'URL
+    st.session_state.job_id = st.experimental_get_query_params().get('job', [None])[0]
+if 'loaded_job' not in st.session_state:
+    st.session_state.loaded_job = None
+if 'source_label' not in st.session_state:
+    st.session_state.source_label = None
 
-def process_uploaded_file(uploaded_file):
-    """Traite le fichier uploadé et le convertit en WAV"""
-    try:
-        temp_dir = tempfile.mkdtemp()
-        
-        # Sauvegarder le fichier uploadé
-        input_path = os.path.join(temp_dir, uploaded_file.name)
-        with open(input_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
-            
-        # Créer le chemin de sortie pour le fichier WAV
-        output_path = os.path.join(temp_dir, 'audio.wav')
-        
-        # Convertir en WAV avec ffmpeg
-        command = [
-            'ffmpeg', '-i', input_path,
-            '-acodec', 'pcm_s16le',
-            '-ar', '44100',
-            '-ac', '2',
-            output_path
-        ]
-        
-        subprocess.run(command, capture_output=True)
-        
-        # Vérifier si le fichier existe
-        if not os.path.exists(output_path):
-            st.error("❌ Erreur lors de la conversion du fichier audio")
-            return None
-            
-        return output_path
-        
-    except Exception as e:
-        st.error(f"❌ Erreur lors du traitement du fichier : {str(e)}")
-        return None
+@st.cache_resource
+def get_transcript_cache():
+    """Cache des transcriptions partagé par toutes les sessions du serveur"""
+    max_mb = int(os.getenv('TRANSCRIPT_CACHE_MAX_MB', '200'))
+    return TranscriptCache(max_bytes=max_mb * 1024 * 1024)
+
+@st.cache_resource
+def get_improvement_cache():
+    """Cache des morceaux améliorés par GPT, partagé par toutes les sessions du serveur"""
+    max_mb = int(os.getenv('IMPROVEMENT_CACHE_MAX_MB', '50'))
+    return improvement_cache(max_bytes=max_mb * 1024 * 1024)
+
+@st.cache_resource
+def get_job_manager():
+    """Tâches de transcription d'arrière-plan, partagées par toutes les sessions du serveur"""
+    return JobManager(max_workers=int(os.getenv('TRANSCRIPTION_JOBS', '4')))
+
+@st.cache_resource
+def start_metrics_server():
+    """Expose les mesures du processus au format Prometheus si METRICS_PORT est défini"""
+    port = os.getenv('METRICS_PORT')
+    return serve_metrics(int(port)) if port else None
+
+def upload_types():
+    """Extensions acceptées par les champs d'upload (None : toutes, variable UPLOAD_FORMATS='*')"""
+    return None if '*' in UPLOAD_FORMATS else UPLOAD_FORMATS
+
+def show_metrics(metrics, key):
+    """Tableau des mesures par étape, détail par segment et exports"""
+    gauges = metrics.gauge_values()
+    if 'scratch_bytes' in gauges:
+        st.caption(
+            f"Espace temporaire : {gauges['scratch_bytes'] / 1e6:.1f} Mo, "
+            f"{gauges['scratch_dirs']} tâche(s), {gauges['scratch_waiting']} en attente de place"
+        )
+    services = [name[:-len('_circuit_open')] for name in gauges if name.endswith('_circuit_open')]
+    if services:
+        st.caption("Services externes : " + ", ".join(
+            f"{name} {'⏸️ suspendu' if gauges[f'{name}_circuit_open'] else 'actif'} "
+            f"({gauges[f'{name}_waiting']} requête(s) en attente)"
+            for name in services
+        ))
+    summary = metrics.summary()
+    if not summary:
+        st.caption("Aucune mesure pour l'instant")
+        return
+    st.dataframe(
+        [dict(stage=stage, **stats) for stage, stats in summary.items()],
+        use_container_width=True, hide_index=True
+    )
+    segments = metrics.to_dict()['segments']
+    if segments:
+        st.caption("Par segment")
+        st.dataframe(segments, use_container_width=True, hide_index=True, height=200)
+    col1, col2 = st.columns(2)
+    col1.download_button("JSON", metrics.to_json(), file_name="mesures.json",
+                         mime="application/json", key=f"metrics_json_{key}")
+    col2.download_button("Prometheus", metrics.to_prometheus(), file_name="mesures.prom",
+                         mime="text/plain", key=f"metrics_prom_{key}")
 
 def get_openai_client():
     """Initialise le client OpenAI uniquement si nécessaire"""
@@ -87,339 +118,44 @@ def get_openai_client():
         st.error(f"Erreur : {str(e)}")
     return None
 
-def detect_platform(url):
-    """Détecte la plateforme à partir de l'URL"""
-    for platform, domains in SUPPORTED_PLATFORMS.items():
-        for domain in domains:
-            if domain in url.lower() or domain == '*':
-                return platform
-    return 'Autres plateformes'
-
-def is_peertube_instance(url):
-    """Détecte si l'URL provient d'une instance PeerTube"""
-    try:
-        import requests
-        from urllib.parse import urlparse
-
-        # Parse l'URL pour obtenir le domaine et le chemin
-        parsed_url = urlparse(url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        
-        # Vérifie si l'API PeerTube est disponible sur ce domaine
-        try:
-            response = requests.get(f"{base_url}/api/v1/config", timeout=5)
-            if response.ok and 'instance' in response.json():
-                return True
-        except:
-            # Essaie une autre approche si la première échoue
-            try:
-                response = requests.get(f"{base_url}/api/v1/videos", timeout=5)
-                return response.ok and 'data' in response.json()
-            except:
-                pass
-        return False
-    except:
-        return False
-
-def extract_peertube_video_id(url):
-    """Extrait l'ID de la vidéo PeerTube depuis l'URL"""
-    from urllib.parse import urlparse, parse_qs
+class StreamlitReporter:
+    """Affiche les événements du pipeline dans la page (une barre de progression par étape)"""
     
-    parsed_url = urlparse(url)
-    path_parts = parsed_url.path.split('/')
+    def __init__(self):
+        self._progress_bars = {}
+        self._partials = {}
+        self.metrics = StageMetrics(parent=REGISTRY)
     
-    # Cherche d'abord un ID après /w/ (format courant de PeerTube)
-    for i, part in enumerate(path_parts):
-        if part == 'w' and i + 1 < len(path_parts):
-            # L'ID est la partie après 'w'
-            video_id = path_parts[i + 1].split('?')[0]  # Enlève les paramètres d'URL
-            return video_id
-    
-    # Si pas trouvé avec /w/, essaie d'autres formats courants
-    for part in path_parts:
-        # Ignore les parties vides ou communes
-        if not part or part in ['watch', 'videos', 'v', 'w']:
-            continue
-        # Vérifie si la partie ressemble à un ID PeerTube (longueur > 8 et alphanumérique)
-        if len(part) > 8 and part.replace('-', '').isalnum():
-            return part
-    
-    # En dernier recours, cherche dans les paramètres d'URL
-    params = parse_qs(parsed_url.query)
-    for param in ['v', 'video', 'videoId']:
-        if param in params:
-            return params[param][0]
-    
-    return None
-
-def download_from_peertube(url, output_path):
-    """Télécharge une vidéo depuis n'importe quelle instance PeerTube"""
-    try:
-        import requests
-        from urllib.parse import urlparse
-
-        # Parse l'URL pour obtenir le domaine
-        parsed_url = urlparse(url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        
-        # Extrait l'ID de la vidéo
-        video_id = extract_peertube_video_id(url)
-        if not video_id:
-            raise ValueError("Impossible d'extraire l'ID de la vidéo")
-
-        # Récupère les informations de la vidéo via l'API
-        api_url = f"{base_url}/api/v1/videos/{video_id}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json'
-        }
-        
-        response = requests.get(api_url, headers=headers)
-        if not response.ok:
-            raise Exception(f"Erreur API: {response.status_code}")
-        
-        video_data = response.json()
-        st.write("Debug - Structure de données reçue:", video_data.keys())
-        
-        # Cherche l'URL de la vidéo dans différents endroits possibles
-        direct_url = None
-        
-        # 1. Essaie dans les fichiers standards
-        if 'files' in video_data and video_data['files']:
-            direct_url = video_data['files'][0].get('fileUrl')
-            
-        # 2. Essaie dans les streams (format commun sur PeerTube)
-        if not direct_url and 'streamingPlaylists' in video_data:
-            for playlist in video_data['streamingPlaylists']:
-                if playlist.get('files'):
-                    direct_url = playlist['files'][0].get('fileUrl')
-                    break
-                    
-        # 3. Essaie dans le champ fileDownloadUrl
-        if not direct_url and 'fileDownloadUrl' in video_data:
-            direct_url = video_data['fileDownloadUrl']
-        
-        # 4. Cherche dans les formats disponibles
-        if not direct_url and 'downloadUrl' in video_data:
-            direct_url = video_data['downloadUrl']
-            
-        # 5. Dernière tentative avec le champ webVideoUrl
-        if not direct_url and 'webVideoUrl' in video_data:
-            direct_url = video_data['webVideoUrl']
-
-        if not direct_url:
-            st.write("Debug - Contenu complet de la réponse:", json.dumps(video_data, indent=2))
-            raise Exception("Aucune URL de téléchargement trouvée")
-            
-        # Assure que l'URL est absolue
-        if not direct_url.startswith('http'):
-            direct_url = f"{base_url}{direct_url}"
-            
-        st.info(f"URL de téléchargement trouvée: {direct_url}")
-            
-        temp_file = f"{output_path}_temp.mp4"
-        with requests.get(direct_url, stream=True, headers=headers) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('content-length', 0))
-            
-            with open(temp_file, 'wb') as f:
-                if total_size == 0:
-                    f.write(r.content)
-                else:
-                    dl = 0
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            dl += len(chunk)
-                            f.write(chunk)
-                            done = int(50 * dl / total_size)
-                            if done % 5 == 0:
-                                st.write(f"Téléchargement: [{'=' * done}{' ' * (50-done)}] {dl*100/total_size:.1f}%")
-        
-        # Convertit en WAV
-        st.info("Conversion en WAV...")
-        subprocess.run([
-            'ffmpeg', '-i', temp_file,
-            '-vn', '-acodec', 'pcm_s16le',
-            '-ar', '44100', '-ac', '2',
-            f"{output_path}.wav"
-        ], capture_output=True)
-        
-        # Nettoie le fichier temporaire
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-            
-        return f"{output_path}.wav"
-        
-    except Exception as e:
-        st.error(f"❌ Erreur lors du téléchargement PeerTube : {str(e)}")
-        if 'video_data' in locals():
-            st.write("Structure de la réponse de l'API :", video_data.keys())
-        return None
-
-# Modification de la fonction download_and_convert_to_wav
-def download_and_convert_to_wav(url):
-    """Télécharge l'audio depuis n'importe quelle plateforme supportée"""
-    try:
-        temp_dir = tempfile.mkdtemp()
-        output_path = os.path.join(temp_dir, 'audio')
-        
-        # Vérifie d'abord si c'est une instance PeerTube
-        if is_peertube_instance(url):
-            st.info("📺 Instance PeerTube détectée")
-            return download_from_peertube(url, output_path)
-        
-        # Si ce n'est pas PeerTube, utilise la configuration standard yt-dlp
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-                'preferredquality': '192',
-            }],
-            'outtmpl': output_path,
-            'quiet': True,
-            'extract_flat': False,
-            'no_warnings': True,
-            'no_color': True,
-            'geo_bypass': True,
-            'nocheckcertificate': True,
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'retries': 3,
-            'fragment_retries': 3,
-            'skip_unavailable_fragments': True,
-            'ignoreerrors': False,
-            'no_playlist': True
-        }
-        
-        platform = detect_platform(url)
-        st.info(f"📺 Plateforme détectée : {platform}")
-        
-        # Ajuster les options selon la plateforme
-        if platform == 'Facebook':
-            ydl_opts.update({'facebook_dl_timeout': 30})
-        elif platform == 'Twitter/X':
-            ydl_opts.update({'twitter_api_key': os.getenv('TWITTER_API_KEY', '')})
-        elif platform == 'Instagram':
-            ydl_opts.update({'instagram_login': os.getenv('INSTAGRAM_LOGIN', '')})
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            if info.get('duration', 0) > 3600:  # Plus d'une heure
-                if not st.confirm("⚠️ Cette vidéo est très longue. Continuer ?"):
-                    return None
-            
-            st.info("⏬ Téléchargement en cours...")
-            ydl.download([url])
-            
-        return f"{output_path}.wav"
-        
-    except Exception as e:
-        st.error(f"❌ Erreur inattendue : {str(e)}")
-        return None
-
-def transcribe_audio(audio_path, language='fr-FR'):
-    """Transcrit le fichier audio en le découpant en segments"""
-    recognizer = sr.Recognizer()
-    transcription = []
+    def __call__(self, event, message=None, **data):
+        if event == 'metric':
+            # Peut venir d'un thread de travail : enregistré seulement, jamais affiché
+            self.metrics.record(message, **data)
+        elif event == 'progress':
+            stage = data.get('stage')
+            if stage not in self._progress_bars:
+                self._progress_bars[stage] = st.progress(0, text=message)
+            self._progress_bars[stage].progress(data.get('value', 0.0), text=message)
+        elif event == 'partial':
+            # Texte produit au fil de l'eau, remplacé à chaque mise à jour
+            stage = data.get('stage')
+            if stage not in self._partials:
+                self._partials[stage] = st.empty()
+            self._partials[stage].markdown(message)
+        elif event == 'info':
+            st.info(message)
+        elif event == 'warning':
+            st.warning(message)
+        elif event == 'error':
+            st.error(message)
+        elif event == 'debug':
+            if 'data' in data:
+                st.write(message, data['data'])
+            else:
+                st.write(message)
     
-    try:
-        # Créer un dossier temporaire pour les segments
-        segment_dir = tempfile.mkdtemp()
-        segment_duration = 30  # en secondes
-        
-        # Utiliser ffmpeg pour diviser l'audio
-        command = [
-            'ffmpeg', '-i', audio_path,
-            '-f', 'segment',
-            '-segment_time', str(segment_duration),
-            '-c', 'copy',
-            os.path.join(segment_dir, 'segment_%03d.wav')
-        ]
-        
-        subprocess.run(command, capture_output=True)
-        
-        # Traiter chaque segment
-        segments = sorted([f for f in os.listdir(segment_dir) if f.startswith('segment_')])
-        progress_text = "Transcription en cours..."
-        progress_bar = st.progress(0, text=progress_text)
-        
-        for i, segment_file in enumerate(segments):
-            segment_path = os.path.join(segment_dir, segment_file)
-            
-            with sr.AudioFile(segment_path) as source:
-                audio = recognizer.record(source)
-                try:
-                    text = recognizer.recognize_google(audio, language=language)
-                    transcription.append(text)
-                except sr.UnknownValueError:
-                    st.warning(f"⚠️ Segment {i+1} inaudible")
-                    continue
-                except sr.RequestError as e:
-                    st.error(f"❌ Erreur API: {str(e)}")
-                    continue
-            
-            # Mettre à jour la progression
-            progress = (i + 1) / len(segments)
-            progress_bar.progress(progress, text=f"{progress_text} ({int(progress * 100)}%)")
-            
-            # Nettoyer le segment
-            os.remove(segment_path)
-        
-        progress_bar.progress(1.0, text="Transcription terminée !")
-        return ' '.join(transcription)
-        
-    except Exception as e:
-        st.error(f"Erreur de transcription: {str(e)}")
-        return None
-        
-    finally:
-        # Nettoyage des fichiers temporaires
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        if os.path.exists(segment_dir):
-            for file in os.listdir(segment_dir):
-                try:
-                    os.remove(os.path.join(segment_dir, file))
-                except:
-                    pass
-            os.rmdir(segment_dir)
-
-
-def improve_text_with_gpt(text, style='default'):
-    """Améliore le texte avec GPT"""
-    try:
-        import openai  # Import local
-        
-        if 'OPENAI_API_KEY' not in st.secrets:
-            st.warning("⚠️ Clé API OpenAI non configurée.")
-            return None
-            
-        openai.api_key = st.secrets['OPENAI_API_KEY']
-        
-        style_prompts = {
-            'default': "Reformule ce texte pour le rendre plus clair et cohérent :",
-            'formal': "Reformule ce texte dans un style formel et professionnel :",
-            'simple': "Reformule ce texte pour le rendre plus simple à comprendre :",
-            'academic': "Reformule ce texte dans un style académique :"
-        }
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Tu es un expert en réécriture et amélioration de texte."},
-                {"role": "user", "content": f"{style_prompts[style]}\n\n{text}"}
-            ],
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
-        
-    except ImportError:
-        st.error("❌ Module OpenAI non installé")
-        return None
-    except Exception as e:
-        st.error(f"Erreur lors de l'amélioration du texte : {str(e)}")
-        return None
+    def clear_partials(self):
+        for placeholder in self._partials.values():
+            placeholder.empty()
 
 def main():
     st.title("🎤 Transcripteur Audio/Vidéo Universel")
@@ -456,6 +192,38 @@ def main():
         if st.button("Effacer les cookies"):
             st.session_state.youtube_cookies = {}
             st.experimental_rerun()
+        
+        st.header("Transcription")
+        backend = st.selectbox(
+            "Moteur de reconnaissance",
+            options=list(BACKENDS),
+            index=list(BACKENDS).index(DEFAULT_BACKEND),
+            format_func=lambda name: BACKENDS[name].label,
+            help="Google : service en ligne. Whisper et Vosk : modèles locaux sur le processeur du serveur, "
+                 "chargés une seule fois puis partagés par toutes les sessions"
+        )
+        workers = st.slider(
+            "Requêtes simultanées",
+            min_value=1, max_value=MAX_WORKERS, value=DEFAULT_WORKERS,
+            help="Nombre de segments envoyés en parallèle à l'API de reconnaissance"
+        )
+        streaming = st.checkbox(
+            "Transcrire pendant le téléchargement",
+            value=True,
+            help="Les URL et les fichiers sont décodés en flux : la reconnaissance commence sans attendre "
+                 "la fin du téléchargement, sans fichier WAV intermédiaire"
+        )
+        use_captions = st.checkbox(
+            "Utiliser les sous-titres de la plateforme",
+            value=True,
+            help="Si la vidéo a déjà des sous-titres (manuels ou automatiques) dans la langue choisie, ils sont "
+                 "repris tels quels : ni téléchargement de l'audio ni reconnaissance. Décochez pour forcer la reconnaissance"
+        )
+        use_vad = st.checkbox(
+            "Découper sur les pauses",
+            value=True,
+            help="Détection d'activité vocale : segments coupés entre les mots, silences et musique ignorés"
+        )
     
     st.markdown("""
     ### Mode d'emploi :
@@ -469,11 +237,13 @@ def main():
         'Français': 'fr-FR',
         'English': 'en-US',
         'Español': 'es-ES',
-        'Deutsch': 'de-DE'
+        'Deutsch': 'de-DE',
+        # Langue choisie sur quelques secondes de parole avant la transcription
+        '🌐 Détection automatique': AUTO_LANGUAGE
     }
     
     # Onglets pour choisir la source
-    source_tab1, source_tab2 = st.tabs(["🌐 URL", "📁 Fichier local"])
+    source_tab1, source_tab2, source_tab3 = st.tabs(["🌐 URL", "📁 Fichier local", "📚 Lot"])
     
     with source_tab1:
         url = st.text_input("URL du média", 
@@ -487,54 +257,192 @@ def main():
     with source_tab2:
         uploaded_file = st.file_uploader(
             "Choisissez un fichier audio/vidéo",
-            type=['mp3', 'mp4', 'wav', 'm4a', 'ogg'],
-            help="Formats supportés : MP3, MP4, WAV, M4A, OGG"
+            type=upload_types(),
+            help=f"Formats supportés : {', '.join(UPLOAD_FORMATS).upper()}" if upload_types() else "Tout format lu par ffmpeg"
         )
         if uploaded_file:
             st.caption(f"📁 Fichier sélectionné : {uploaded_file.name}")
             st.session_state.url = None
             st.session_state.file_source = uploaded_file
     
+    with source_tab3:
+        batch_urls = st.text_area(
+            "URL à transcrire (une par ligne)",
+            placeholder="https://www.youtube.com/watch?v=...\nhttps://www.youtube.com/playlist?list=...",
+            height=150
+        )
+        batch_files = st.file_uploader(
+            "Fichiers audio/vidéo",
+            type=upload_types(),
+            accept_multiple_files=True,
+            key="batch_files"
+        )
+        expand_playlists = st.checkbox("Développer les playlists", value=True)
+        col1, col2 = st.columns(2)
+        download_workers = col1.number_input("Téléchargements simultanés", min_value=1, max_value=8, value=2)
+        recognition_workers = col2.number_input(
+            "Transcriptions simultanées", min_value=1, max_value=8, value=2,
+            help="Chaque transcription utilise en plus le nombre de requêtes simultanées choisi dans la barre latérale"
+        )
+    
     # Sélection de la langue
     selected_lang = st.selectbox("Langue", options=list(languages.keys()), index=0)
     
+    with source_tab3:
+        if st.button("📚 Lancer le lot"):
+            sources = [
+                line.strip() for line in batch_urls.splitlines()
+                if line.strip() and not line.strip().startswith('#')
+            ] + list(batch_files or [])
+            items = build_batch(sources, expand_playlists, StreamlitReporter())
+            if not items:
+                st.warning("⚠️ Veuillez ajouter au moins une URL ou un fichier")
+            else:
+                # Le lot tourne en arrière-plan comme une transcription : les reruns ne l'interrompent pas
+                st.session_state.batch_job = get_job_manager().submit(
+                    transcribe_batch,
+                    items,
+                    language=languages[selected_lang],
+                    workers=workers,
+                    use_vad=use_vad,
+                    download_workers=download_workers,
+                    recognition_workers=recognition_workers,
+                    cache=get_transcript_cache(),
+                    backend=backend,
+                    captions=use_captions,
+                    label=f"Lot de {len(items)} élément(s)"
+                )
+                st.session_state.batch_items = items
+                st.session_state.batch_archive = None
+        
+        # Suivi du lot : les éléments sont relus à chaque rafraîchissement de la page
+        batch_job = get_job_manager().get(st.session_state.batch_job) if st.session_state.batch_job else None
+        if batch_job and batch_job.running:
+            col1, col2 = st.columns([5, 1])
+            col1.progress(batch_job.progress, text=batch_job.progress_text or f"⏳ Lot {batch_job.status}...")
+            if col2.button("⏹️ Annuler", key=f"cancel_{batch_job.id}", disabled=batch_job.cancel_event.is_set()):
+                batch_job.cancel()
+            if st.session_state.batch_items:
+                st.dataframe([item.to_dict() for item in st.session_state.batch_items], use_container_width=True)
+        elif batch_job and isinstance(batch_job.result, list):
+            items = [BatchItem.from_dict(data) for data in batch_job.result]
+            succeeded = sum(item.status == DONE for item in items)
+            summary = f"{succeeded} réussis, {len(items) - succeeded} en erreur"
+            if batch_job.status == CANCELLED:
+                st.warning(f"⏹️ Lot annulé : {summary}")
+            else:
+                st.success(f"📚 Lot terminé : {summary}")
+            st.dataframe([item.to_dict() for item in items], use_container_width=True)
+            if st.session_state.batch_archive is None:
+                st.session_state.batch_archive = export_archive(items, {
+                    "language": selected_lang,
+                    "timestamp": datetime.datetime.now().isoformat()
+                })
+        elif batch_job:
+            st.error(f"❌ {batch_job.error}")
+        
+        if st.session_state.batch_archive:
+            st.download_button(
+                "🗜️ Télécharger toutes les transcriptions (ZIP)",
+                st.session_state.batch_archive,
+                file_name="transcriptions.zip",
+                mime="application/zip"
+            )
+    
     # Bouton de transcription
     if st.button("🎯 Lancer la transcription", type="primary"):
         if not st.session_state.url and not st.session_state.file_source:
             st.warning("⚠️ Veuillez d'abord choisir une source (URL ou fichier)")
             return
             
-        audio_path = None
-        
-        with st.status("Traitement en cours...") as status:
-            if st.session_state.url:
-                status.write("⏬ Téléchargement du média...")
-                audio_path = download_and_convert_to_wav(st.session_state.url)
-            elif st.session_state.file_source:
-                status.write("📝 Traitement du fichier local...")
-                audio_path = process_uploaded_file(st.session_state.file_source)
-            
-            if audio_path:
-                status.write("🎤 Transcription du contenu...")
-                transcription = transcribe_audio(
-                    audio_path,
-                    language=languages[selected_lang]
-                )
-                
-                if transcription:
-                    status.update(label="✅ Transcription terminée !", state="complete")
-                    st.session_state.transcription = transcription
+        # La transcription tourne en arrière-plan : les reruns de la page ne l'interrompent pas
+        source = st.session_state.url or st.session_state.file_source
+        job_id = get_job_manager().submit(
+            transcribe,
+            source,
+            language=languages[selected_lang],
+            workers=workers,
+            use_vad=use_vad,
+            streaming=streaming,
+            cache=get_transcript_cache(),
+            backend=backend,
+            captions=use_captions,
+            label=source_label(source)
+        )
+        st.session_state.jobs.append(job_id)
+        st.session_state.job_id = job_id
+        st.experimental_set_query_params(job=job_id)
+    
+    # Suivi de la tâche active
+    job = get_job_manager().get(st.session_state.job_id) if st.session_state.job_id else None
+    if job and job.id not in st.session_state.jobs:
+        st.session_state.jobs.append(job.id)
+    if job and job.running:
+        col1, col2 = st.columns([5, 1])
+        col1.progress(job.progress, text=job.progress_text or f"⏳ Tâche {job.id} {job.status}...")
+        # Arrête l'envoi de nouveaux segments ; ceux déjà reconnus sont gardés
+        if col2.button("⏹️ Annuler", key=f"cancel_{job.id}", disabled=job.cancel_event.is_set()):
+            job.cancel()
+        for event, message in job.messages[-5:]:
+            if event in ('warning', 'error'):
+                st.caption(message)
+        # Le texte s'affiche au fur et à mesure que les segments sont reconnus
+        partial = job.partial()
+        if partial:
+            st.text_area("Texte reconnu jusqu'ici :", str(partial), height=200, disabled=True)
+    elif job and st.session_state.loaded_job != job.id:
+        st.session_state.loaded_job = job.id
+        st.session_state.source_label = job.label
+        if job.status == DONE:
+            st.session_state.transcription = job.result
+            st.success("✅ Transcription terminée !")
+        elif job.result:
+            # Annulation ou échec en cours de route : le début de la transcription est conservé
+            st.session_state.transcription = job.result
+            icon = "⏹️" if job.status == CANCELLED else "⚠️"
+            st.warning(f"{icon} {job.error} : transcription partielle ({len(job.result)} segments)")
+        else:
+            st.error(f"❌ {job.error}")
+        if job.messages:
+            with st.expander("Journal de la tâche"):
+                for event, message in job.messages:
+                    st.write(message)
     
     # Afficher la transcription et options d'amélioration
     if st.session_state.transcription:
         st.subheader("📝 Transcription")
         raw_transcription = st.text_area(
             "Vous pouvez éditer le texte directement ici :",
-            value=st.session_state.transcription,
+            value=str(st.session_state.transcription),
             height=200,
             key="raw_transcription"
         )
         
+        # Exports horodatés, produits directement depuis les segments reconnus
+        transcript = st.session_state.transcription
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                "🎬 Sous-titres (SRT)",
+                transcript.to_srt(),
+                file_name="transcription.srt",
+                mime="application/x-subrip"
+            )
+        with col2:
+            st.download_button(
+                "🎬 Sous-titres (VTT)",
+                transcript.to_vtt(),
+                file_name="transcription.vtt",
+                mime="text/vtt"
+            )
+        with col3:
+            st.download_button(
+                "🕒 Segments horodatés (JSON)",
+                transcript.to_json(),
+                file_name="transcription_segments.json",
+                mime="application/json"
+            )
+        
         # Vérifier si OpenAI est configuré
         if 'OPENAI_API_KEY' in st.secrets:
             st.subheader("🤖 Amélioration avec IA")
@@ -555,7 +463,14 @@ def main():
             with col2:
                 if st.button("Améliorer le texte"):
                     with st.spinner("🔄 Amélioration en cours..."):
-                        improved_text = improve_text_with_gpt(raw_transcription, style)
+                        reporter = StreamlitReporter()
+                        improved_text = improve_text_with_gpt(
+                            raw_transcription, style,
+                            api_key=st.secrets['OPENAI_API_KEY'],
+                            cache=get_improvement_cache(),
+                            report=reporter
+                        )
+                        reporter.clear_partials()
                         if improved_text:
                             st.session_state.improved_text = improved_text
                             st.text_area(
@@ -589,7 +504,7 @@ def main():
                                 # Sauvegarder le rapport complet
                                 source_info = {
                                     "type": "url" if st.session_state.url else "file",
-                                    "source": st.session_state.url if st.session_state.url else st.session_state.file_source.name
+                                    "source": st.session_state.url if st.session_state.url else st.session_state.source_label
                                 }
                                 
                                 json_data = json.dumps({
@@ -597,6 +512,7 @@ def main():
                                     "platform": detect_platform(st.session_state.url) if st.session_state.url else "local_file",
                                     "language": selected_lang,
                                     "original": raw_transcription,
+                                    "segments": transcript.to_dict()["segments"],
                                     "improved": improved_text,
                                     "style": style,
                                     "timestamp": datetime.datetime.now().isoformat()
@@ -617,7 +533,48 @@ def main():
             st.session_state.url = None
             st.session_state.file_source = None
             st.session_state.improved_text = None
+            st.session_state.job_id = None
+            st.experimental_set_query_params()
             st.experimental_rerun()
+    
+    # Compteurs du cache, affichés après le traitement pour refléter cette exécution
+    with st.sidebar:
+        st.header("Cache des transcriptions")
+        cache = get_transcript_cache()
+        col1, col2 = st.columns(2)
+        col1.metric("Succès", cache.hits)
+        col2.metric("Échecs", cache.misses)
+        st.caption(f"Taille : {cache.total_size() / 1024:.0f} Ko")
+        
+        # Tâches de la session : une tâche terminée peut être rechargée à tout moment
+        if st.session_state.jobs:
+            st.header("Tâches")
+            for job_id in reversed(st.session_state.jobs):
+                session_job = get_job_manager().get(job_id)
+                if not session_job:
+                    continue
+                label = f"{session_job.status} · {session_job.label[-40:]}"
+                if st.button(label, key=f"job_{job_id}", disabled=session_job.running):
+                    st.session_state.job_id = job_id
+                    st.session_state.loaded_job = None
+                    st.experimental_set_query_params(job=job_id)
+                    st.experimental_rerun()
+    
+    # Panneau de débogage : où passe le temps, pour la tâche affichée et pour tout le serveur
+    with st.expander("🔧 Mesures du pipeline"):
+        if job:
+            st.markdown(f"**Tâche {job.id}** · {job.label}")
+            show_metrics(job.metrics, 'job')
+        st.markdown("**Serveur** (depuis le démarrage)")
+        show_metrics(REGISTRY, 'registry')
+        if os.getenv('METRICS_PORT'):
+            st.caption(f"Exposées pour Prometheus sur le port {os.getenv('METRICS_PORT')}, chemin /metrics")
+    
+    # Tant qu'une tâche ou un lot tourne, la page se rafraîchit pour afficher sa progression
+    if (job and job.running) or (batch_job and batch_job.running):
+        time.sleep(1)
+        st.experimental_rerun()
 
 if __name__ == "__main__":
+    start_metrics_server()
     main()
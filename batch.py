@@ -0,0 +1,178 @@
+"""Traitement par lots : plusieurs URL ou fichiers transcrits dans une même tâche.
+
+Les téléchargements et les transcriptions sont répartis sur deux groupes de
+threads distincts, chacun avec sa propre limite de concurrence : un élément
+passe au groupe de transcription dès que son audio est prêt, ce qui libère
+une place de téléchargement pour l'élément suivant.
+"""
+import io
+import json
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from transcript import Transcript
+
+PENDING = 'en attente'
+DOWNLOADING = 'téléchargement'
+TRANSCRIBING = 'transcription'
+DONE = 'terminé'
+FAILED = 'erreur'
+
+
+class BatchItem:
+    """Un élément du lot et son état courant"""
+
+    def __init__(self, index, source, label):
+        self.index = index
+        self.source = source
+        self.label = label
+        self.status = PENDING
+        self.transcription = None
+        self.error = None
+        self.cached = False
+
+    def to_dict(self, transcription=False):
+        """État affichable de l'élément ; avec `transcription`, aussi son résultat (sérialisable en JSON)"""
+        data = {
+            'index': self.index,
+            'source': self.label,
+            'status': self.status,
+            'cached': self.cached,
+            'error': self.error,
+        }
+        if transcription:
+            result = self.transcription
+            data['transcription'] = result.to_dict() if isinstance(result, Transcript) else result
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Élément relu depuis to_dict(transcription=True) ; la source n'est plus que son libellé"""
+        item = cls(data['index'], data['source'], data['source'])
+        item.status = data['status']
+        item.cached = data.get('cached', False)
+        item.error = data.get('error')
+        result = data.get('transcription')
+        item.transcription = Transcript.from_dict(result) if isinstance(result, dict) else result
+        return item
+
+
+class BatchRunner:
+    """Exécute un lot avec des limites séparées pour le téléchargement et la transcription
+
+    - `lookup(item)` retourne une transcription déjà connue, ou None ;
+    - `download(item)` retourne le chemin de l'audio prêt à transcrire, ou None ;
+    - `transcribe(item, audio_path)` retourne la transcription, ou None.
+
+    Si `cancel` (threading.Event) est posé, les éléments pas encore commencés
+    sont abandonnés (en erreur) ; ceux en cours vont à leur terme.
+    """
+
+    def __init__(self, items, lookup, download, transcribe, download_workers=2, recognition_workers=2,
+                 cancel=None):
+        self.items = items
+        self._cancel = cancel
+        self._lookup = lookup
+        self._download = download
+        self._transcribe = transcribe
+        self._download_pool = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix='batch-dl')
+        self._recognition_pool = ThreadPoolExecutor(max_workers=recognition_workers, thread_name_prefix='batch-asr')
+        self._remaining = len(items)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not items:
+            self._finished.set()
+
+    def start(self):
+        for item in self.items:
+            self._download_pool.submit(self._fetch, item)
+        return self
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def join(self, timeout=None):
+        """Attend la fin du lot et libère les threads"""
+        self._finished.wait(timeout)
+        if self.finished:
+            self._download_pool.shutdown()
+            self._recognition_pool.shutdown()
+        return self.finished
+
+    def counts(self):
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def _fetch(self, item):
+        if self._cancel is not None and self._cancel.is_set():
+            item.error = "Lot annulé"
+            self._complete(item, FAILED)
+            return
+        item.status = DOWNLOADING
+        try:
+            cached = self._lookup(item)
+            if cached is not None:
+                item.transcription = cached
+                item.cached = True
+                self._complete(item, DONE)
+                return
+            audio_path = self._download(item)
+        except Exception as e:
+            item.error = str(e)
+            audio_path = None
+        if not audio_path:
+            item.error = item.error or "Échec du téléchargement"
+            self._complete(item, FAILED)
+            return
+        item.status = PENDING
+        self._recognition_pool.submit(self._recognize, item, audio_path)
+
+    def _recognize(self, item, audio_path):
+        item.status = TRANSCRIBING
+        try:
+            item.transcription = self._transcribe(item, audio_path)
+        except Exception as e:
+            item.error = str(e)
+        if item.transcription:
+            self._complete(item, DONE)
+        else:
+            item.error = item.error or "Échec de la transcription"
+            self._complete(item, FAILED)
+
+    def _complete(self, item, status):
+        item.status = status
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._finished.set()
+
+
+def _slug(text, max_length=60):
+    slug = re.sub(r'[^\w.-]+', '_', text).strip('_')
+    return slug[-max_length:] or 'element'
+
+
+def export_archive(items, metadata=None):
+    """Archive ZIP : texte (et sous-titres SRT si horodaté) par élément réussi, et un index JSON du lot"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        index = []
+        for item in items:
+            entry = item.to_dict()
+            if item.transcription:
+                name = f"{item.index + 1:03d}_{_slug(item.label)}"
+                entry['file'] = f"{name}.txt"
+                archive.writestr(entry['file'], str(item.transcription))
+                if isinstance(item.transcription, Transcript):
+                    entry['subtitles'] = f"{name}.srt"
+                    archive.writestr(entry['subtitles'], item.transcription.to_srt())
+            index.append(entry)
+        archive.writestr('index.json', json.dumps(
+            dict(metadata or {}, items=index), ensure_ascii=False, indent=2
+        ))
+    return buffer.getvalue()
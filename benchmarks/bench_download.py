@@ -0,0 +1,124 @@
+"""Compare le téléchargement en un seul flux au téléchargement parallèle par plages.
+
+Sert un fichier aléatoire depuis un serveur HTTP local qui accepte les
+requêtes Range et limite le débit de chaque connexion (comme un serveur
+PeerTube chargé), puis mesure le temps de download_file avec 1 et N
+connexions. Avec --fail, des connexions sont coupées en cours de route pour
+vérifier la reprise.
+
+    python benchmarks/bench_download.py --size 64 --rate 8 --connections 4 --json resultats.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import downloader  # noqa: E402
+
+BLOCK_SIZE = 64 * 1024
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        data = server.data
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match[1])
+            end = int(match[2]) if match[2] else len(data) - 1
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(data)}")
+        else:
+            start, end = 0, len(data) - 1
+            self.send_response(200)
+        body = memoryview(data)[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        with server.lock:
+            server.connections += 1
+            cut = server.fail_every and len(body) > 1 and server.connections % server.fail_every == 0
+        limit = len(body) // 2 if cut else len(body)
+        # Débit limité par connexion
+        for offset in range(0, limit, BLOCK_SIZE):
+            self.wfile.write(body[offset:min(offset + BLOCK_SIZE, limit)])
+            time.sleep(BLOCK_SIZE / server.rate)
+        if cut:
+            self.close_connection = True
+
+
+def start_server(data, rate, fail_every=0):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    server.daemon_threads = True
+    server.data = data
+    server.rate = rate
+    server.fail_every = fail_every
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+
+
+def run(url, connections, expected_digest):
+    work_dir = tempfile.mkdtemp()
+    try:
+        output = os.path.join(work_dir, 'video.mp4')
+        start = time.perf_counter()
+        downloader.download_file(url, output, connections=connections)
+        elapsed = time.perf_counter() - start
+        with open(output, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return {
+            'connections': connections,
+            'seconds': round(elapsed, 3),
+            'megabytes_per_second': round(os.path.getsize(output) / 1e6 / elapsed, 2),
+            'intact': digest == expected_digest,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=64, help="taille du fichier (Mo)")
+    parser.add_argument('--rate', type=float, default=8, help="débit maximal par connexion (Mo/s)")
+    parser.add_argument('--connections', type=int, default=downloader.DEFAULT_CONNECTIONS)
+    parser.add_argument('--fail', type=int, default=0, help="couper une connexion sur N (0 : jamais)")
+    parser.add_argument('--json', help="fichier où enregistrer les résultats")
+    args = parser.parse_args()
+
+    data = os.urandom(args.size * 1024 * 1024)
+    digest = hashlib.sha256(data).hexdigest()
+    server, url = start_server(data, args.rate * 1e6, args.fail)
+    downloader.RETRY_BACKOFF = 0.1
+    try:
+        results = [run(url, 1, digest), run(url, args.connections, digest)]
+    finally:
+        server.shutdown()
+
+    print(f"Fichier : {args.size} Mo, {args.rate} Mo/s par connexion")
+    for r in results:
+        print(f"{r['connections']:>2} connexion(s) : {r['seconds']:7.2f} s  "
+              f"{r['megabytes_per_second']:6.1f} Mo/s  {'intact' if r['intact'] else 'CORROMPU'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'size_mb': args.size, 'rate_mb_s': args.rate, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Compare l'ancienne conversion (44,1 kHz stéréo) à la normalisation 16 kHz mono.
+
+Génère un média synthétique avec ffmpeg, puis mesure pour chaque format les
+octets écrits (le WAV converti ; les segments sont des vues en mémoire sur ce
+fichier) et le temps de conversion/découpage.
+
+    python benchmarks/bench_normalization.py --duration 600 --json resultats.json
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcriber  # noqa: E402
+
+FORMATS = {
+    'avant (44,1 kHz stéréo)': {'sample_rate': 44100, 'channels': 2},
+    'après (16 kHz mono)': {'sample_rate': transcriber.SAMPLE_RATE, 'channels': transcriber.CHANNELS},
+}
+
+
+def make_fixture(path, duration):
+    """Crée une piste AAC stéréo 44,1 kHz de la durée demandée"""
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f"sine=frequency=220:sample_rate=44100:duration={duration}",
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:sample_rate=44100:duration={duration}:amplitude=0.05",
+        '-filter_complex', 'amix=inputs=2,aformat=channel_layouts=stereo',
+        '-c:a', 'aac', '-b:a', '128k', path
+    ], check=True)
+
+
+def run(fixture, sample_rate, channels):
+    work_dir = tempfile.mkdtemp()
+    try:
+        wav_path = os.path.join(work_dir, 'audio.wav')
+
+        start = time.perf_counter()
+        transcriber.normalize_audio(fixture, wav_path, sample_rate=sample_rate, channels=channels)
+        converted = time.perf_counter()
+        samples, rate, channels = transcriber.map_wav(wav_path)
+        segments = math.ceil(len(samples) / channels / (rate * transcriber.SEGMENT_DURATION))
+        done = time.perf_counter()
+
+        wav_bytes = os.path.getsize(wav_path)
+        return {
+            'sample_rate': sample_rate,
+            'channels': channels,
+            'wav_bytes': wav_bytes,
+            'bytes_written': wav_bytes,
+            'segments': segments,
+            'bytes_per_segment': wav_bytes // max(segments, 1),
+            'convert_seconds': round(converted - start, 3),
+            'split_seconds': round(done - converted, 3),
+            'total_seconds': round(done - start, 3),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=int, default=600, help="durée du média synthétique (s)")
+    parser.add_argument('--json', help="fichier où enregistrer les résultats")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp()
+    try:
+        fixture = os.path.join(fixture_dir, 'fixture.m4a')
+        make_fixture(fixture, args.duration)
+        results = {name: run(fixture, **params) for name, params in FORMATS.items()}
+    finally:
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    print(f"Média synthétique : {args.duration} s")
+    for name, r in results.items():
+        print(f"{name:<26} {r['bytes_written'] / 1e6:9.1f} Mo écrits  "
+              f"{r['bytes_per_segment'] / 1e6:6.2f} Mo/segment  {r['total_seconds']:7.2f} s")
+    before, after = results.values()
+    print(f"Réduction : x{before['bytes_written'] / after['bytes_written']:.1f} octets, "
+          f"x{before['total_seconds'] / max(after['total_seconds'], 1e-3):.1f} temps")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'duration': args.duration, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
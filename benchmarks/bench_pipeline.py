@@ -0,0 +1,300 @@
+"""Banc d'essai hors ligne du pipeline complet : upload, découpage, reconnaissance et amélioration.
+
+Génère avec ffmpeg des médias synthétiques (alternance de « parole » et de
+silences, audio seul ou vidéo) de 1 min à 2 h, puis exécute pour chacun,
+dans un processus séparé :
+
+- process_uploaded_file (copie de l'upload et conversion en WAV 16 kHz mono) ;
+- transcribe_audio (découpage VAD ou fixe, puis reconnaissance) contre un
+  reconnaisseur local déterministe qui remplace recognize_google, ou contre
+  un vrai modèle local avec --backend whisper|vosk ;
+  avec --stream, ces deux étapes sont remplacées par transcribe_file_stream
+  (upload décodé en flux, sans WAV) ;
+- improve_text_with_gpt contre le serveur OpenAI simulé (fake_openai.py).
+
+Mesures par média : débit (secondes d'audio par seconde réelle), pic de
+mémoire (RSS du processus Python, ffmpeg non compris), pic d'occupation du
+dossier temporaire et latence par étape (module metrics). Les résultats
+sont enregistrés en JSON avec le commit courant, pour comparer deux versions :
+
+    python benchmarks/bench_pipeline.py --durations 60,600 --json avant.json
+    python benchmarks/bench_pipeline.py --durations 60,600 --json apres.json --compare avant.json
+
+Aucun accès réseau n'est nécessaire.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+DEFAULT_DURATIONS = '60,600,3600,7200'
+SPEECH_SECONDS = 5        # durée des passages « parlés » du média synthétique
+PAUSE_SECONDS = 2         # durée des silences entre eux
+WORDS_PER_SECOND = 2.5    # débit de parole simulé par le faux reconnaisseur
+SAMPLE_INTERVAL = 0.1     # période d'échantillonnage du dossier temporaire (s)
+
+VOCABULARY = (
+    "le la les un une des et de du en dans pour avec sur par transcription audio vidéo "
+    "segment parole silence texte reconnaissance modèle mesure débit temps fichier "
+    "analyse résultat rapide lent bonjour merci question réponse exemple"
+).split()
+
+
+def make_fixture(path, duration, kind):
+    """Média synthétique : sinusoïde modulée coupée de silences, bruit de fond léger"""
+    period = SPEECH_SECONDS + PAUSE_SECONDS
+    speech = (f"aevalsrc='0.4*sin(2*PI*(180+40*sin(2*PI*3*t))*t)*lt(mod(t\\,{period})\\,{SPEECH_SECONDS})'"
+              f":s=44100:d={duration}")
+    command = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', speech,
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:sample_rate=44100:duration={duration}:amplitude=0.003",
+    ]
+    if kind == 'video':
+        command += ['-f', 'lavfi', '-i', f"testsrc=size=160x120:rate=5:duration={duration}"]
+    command += ['-filter_complex', '[0:a][1:a]amix=inputs=2,aformat=channel_layouts=stereo[a]', '-map', '[a]']
+    if kind == 'video':
+        command += ['-map', '2:v', '-c:v', 'libx264', '-preset', 'ultrafast']
+    command += ['-c:a', 'libmp3lame', '-b:a', '128k', path]
+    subprocess.run(command, check=True)
+
+
+def fixture_path(fixture_dir, duration, kind):
+    path = os.path.join(fixture_dir, f"fixture_{duration}s.{'mp4' if kind == 'video' else 'mp3'}")
+    if not os.path.exists(path):
+        make_fixture(path, duration, kind)
+    return path
+
+
+class FixtureUpload(io.BytesIO):
+    """Imite UploadedFile de Streamlit : un BytesIO avec un nom"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+def install_fake_recognizer(latency):
+    """Remplace recognize_google par une reconnaissance déterministe (même audio, même texte)"""
+    import speech_recognition as sr
+
+    def recognize_google(self, audio_data, key=None, language='fr-FR', **kwargs):
+        frame_data = audio_data.get_raw_data()
+        seconds = len(frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+        if latency:
+            time.sleep(latency)
+        rng = random.Random(zlib.crc32(frame_data))
+        words = [rng.choice(VOCABULARY) for _ in range(max(1, int(seconds * WORDS_PER_SECOND)))]
+        return ' '.join(words)
+
+    sr.Recognizer.recognize_google = recognize_google
+
+
+class DiskSampler:
+    """Relève périodiquement la taille d'un dossier et retient le maximum"""
+
+    def __init__(self, path):
+        self.path = path
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def size(self):
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, self.size())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.size())
+
+
+def run_one(args):
+    """Exécuté dans un processus dédié : un média, un résultat JSON sur la sortie standard"""
+    import transcriber
+    from fake_openai import start_server
+    from metrics import StageMetrics
+    from scratch import SCRATCH
+
+    install_fake_recognizer(args.recognizer_latency)
+    server, api_base = start_server(latency=args.openai_latency)
+    metrics = StageMetrics()
+    report = metrics.reporter()
+    phases = {}
+
+    with DiskSampler(tempfile.gettempdir()) as disk, SCRATCH.job() as work_dir:
+        upload = FixtureUpload(args.one)
+        start = time.perf_counter()
+        if args.stream:
+            phases['upload'] = 0.0
+            transcript = transcriber.transcribe_file_stream(
+                upload, workers=args.workers, use_vad=not args.no_vad, report=report,
+                backend=args.backend, work_dir=work_dir
+            )
+        else:
+            audio_path = transcriber.process_uploaded_file(upload, report, work_dir)
+            phases['upload'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            transcript = transcriber.transcribe_audio(
+                audio_path, workers=args.workers, use_vad=not args.no_vad, report=report, backend=args.backend
+            )
+        phases['transcription'] = time.perf_counter() - start
+        del upload
+
+        start = time.perf_counter()
+        improved = transcriber.improve_text_with_gpt(
+            str(transcript), 'default', api_key='bench', api_base=api_base, report=report
+        )
+        phases['improvement'] = time.perf_counter() - start
+    server.shutdown()
+
+    total = sum(phases.values())
+    return {
+        'duration': args.duration,
+        'segments': len(transcript),
+        'words': len(str(transcript).split()),
+        'improved': bool(improved),
+        'gpt_requests': server.requests,
+        'phases_seconds': {name: round(seconds, 3) for name, seconds in phases.items()},
+        'total_seconds': round(total, 3),
+        'throughput': round(args.duration / total, 2),
+        'pipeline_throughput': round(args.duration / (phases['upload'] + phases['transcription']), 2),
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'temp_disk_peak_bytes': disk.peak,
+        'stages': metrics.summary(),
+    }
+
+
+def run_isolated(path, duration, args):
+    """Lance run_one dans un sous-processus avec son propre dossier temporaire"""
+    temp_dir = tempfile.mkdtemp(prefix='bench_tmp_')
+    try:
+        command = [
+            sys.executable, os.path.abspath(__file__), '--one', path, '--duration', str(duration),
+            '--workers', str(args.workers), '--recognizer-latency', str(args.recognizer_latency),
+            '--openai-latency', str(args.openai_latency), '--backend', args.backend,
+        ] + (['--no-vad'] if args.no_vad else []) + (['--stream'] if args.stream else [])
+        env = dict(
+            os.environ, TMPDIR=temp_dir, OPENAI_REQUESTS_PER_MINUTE=str(args.openai_rpm),
+            GOOGLE_REQUESTS_PER_MINUTE=str(args.google_rpm)
+        )
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {r['duration']: r for r in json.load(f)['results']}
+    print(f"\nComparaison avec {previous_path} :")
+    for r in results:
+        old = previous.get(r['duration'])
+        if not old:
+            continue
+        print(f"{r['duration']:>6} s  temps x{r['total_seconds'] / max(old['total_seconds'], 1e-3):.2f}  "
+              f"mémoire x{r['peak_rss_bytes'] / max(old['peak_rss_bytes'], 1):.2f}  "
+              f"disque x{r['temp_disk_peak_bytes'] / max(old['temp_disk_peak_bytes'], 1):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--durations', default=DEFAULT_DURATIONS, help="durées des médias (s), séparées par des virgules")
+    parser.add_argument('--kind', choices=['audio', 'video'], default='video', help="type de média synthétique")
+    parser.add_argument('--fixture-dir', help="dossier où garder les médias générés (réutilisés d'un lancement à l'autre)")
+    parser.add_argument('--workers', type=int, default=4, help="requêtes de reconnaissance simultanées")
+    parser.add_argument('--backend', default='google',
+                        help="moteur de reconnaissance (google : reconnaisseur simulé ; whisper, vosk : modèle réel)")
+    parser.add_argument('--stream', action='store_true', help="décoder l'upload en flux (transcribe_file_stream)")
+    parser.add_argument('--no-vad', action='store_true', help="découpage fixe au lieu de la VAD")
+    parser.add_argument('--recognizer-latency', type=float, default=0.05, help="latence simulée par segment (s)")
+    parser.add_argument('--openai-latency', type=float, default=0.05, help="latence simulée par requête GPT (s)")
+    parser.add_argument('--openai-rpm', type=int, default=0,
+                        help="limite de requêtes GPT par minute (0 : aucune, pour ne mesurer que le pipeline)")
+    parser.add_argument('--google-rpm', type=int, default=0,
+                        help="limite de requêtes de reconnaissance par minute (0 : aucune)")
+    parser.add_argument('--json', help="fichier où enregistrer les résultats")
+    parser.add_argument('--compare', metavar='JSON', help="résultats précédents à comparer")
+    parser.add_argument('--one', help=argparse.SUPPRESS)
+    parser.add_argument('--duration', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args)))
+        return
+
+    fixture_dir = args.fixture_dir or tempfile.mkdtemp(prefix='bench_fixtures_')
+    os.makedirs(fixture_dir, exist_ok=True)
+    results = []
+    try:
+        for duration in (int(d) for d in args.durations.split(',')):
+            path = fixture_path(fixture_dir, duration, args.kind)
+            r = run_isolated(path, duration, args)
+            results.append(r)
+            print(f"{duration:>6} s  {r['total_seconds']:8.2f} s  x{r['throughput']:7.1f} temps réel  "
+                  f"RSS {r['peak_rss_bytes'] / 1e6:7.1f} Mo  "
+                  f"disque {r['temp_disk_peak_bytes'] / 1e6:7.1f} Mo  {r['segments']} segments")
+    finally:
+        if not args.fixture_dir:
+            shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'settings': {
+                    'kind': args.kind, 'workers': args.workers, 'vad': not args.no_vad, 'backend': args.backend,
+                    'stream': args.stream,
+                    'recognizer_latency': args.recognizer_latency, 'openai_latency': args.openai_latency,
+                    'openai_rpm': args.openai_rpm, 'google_rpm': args.google_rpm,
+                },
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
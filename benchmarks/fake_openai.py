@@ -0,0 +1,128 @@
+"""Serveur local qui imite l'API OpenAI (chat completions), pour essayer l'amélioration sans clé ni facturation.
+
+La « reformulation » renvoie le texte reçu (après la consigne), en flux SSE si
+la requête le demande, avec une latence réglable. Le nombre de requêtes reçues
+est affiché à l'arrêt, ce qui permet de vérifier que le cache évite les appels.
+
+    python benchmarks/fake_openai.py --port 8001 --latency 0.5
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test \\
+        python cli.py conference.mp4 --improve formal
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS_PER_EVENT = 5
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Chemin inconnu : {self.path}", 'type': 'invalid_request_error'}})
+            return
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.fail_every and server.requests % server.fail_every == 0
+        if fail:
+            self._send_json(429, {'error': {'message': "Limite de débit simulée", 'type': 'rate_limit_error'}})
+            return
+
+        # Le texte à reformuler suit la consigne, après la première ligne vide
+        prompt = request['messages'][-1]['content']
+        text = prompt.split('\n\n', 1)[-1]
+        time.sleep(server.latency)
+
+        if request.get('stream'):
+            self._send_stream(request.get('model', ''), text)
+        else:
+            self._send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', ''),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 4,
+                          'total_tokens': (len(prompt) + len(text)) // 4},
+            })
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model, text):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        words = text.split(' ')
+        for start in range(0, len(words), WORDS_PER_EVENT):
+            content = ' '.join(words[start:start + WORDS_PER_EVENT])
+            if start:
+                content = ' ' + content
+            self._send_event({
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': content}, 'finish_reason': None}],
+            })
+        self._send_event({
+            'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+        })
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_event(self, body):
+        self.wfile.write(f"data: {json.dumps(body)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def start_server(port=0, latency=0.0, fail_every=0):
+    """Démarre le serveur dans un thread ; retourne (serveur, adresse de base de l'API)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_every = fail_every
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help="délai avant chaque réponse (s)")
+    parser.add_argument('--fail-every', type=int, default=0,
+                        help="répondre 429 à une requête sur N (0 : jamais)")
+    args = parser.parse_args()
+
+    server, api_base = start_server(args.port, args.latency, args.fail_every)
+    print(f"API OpenAI simulée sur {api_base} (Ctrl+C pour arrêter)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"{server.requests} requête(s) reçue(s)")
+
+
+if __name__ == '__main__':
+    main()
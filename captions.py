@@ -0,0 +1,93 @@
+"""Sous-titres publiés par les plateformes : choix d'une piste et conversion en segments.
+
+YouTube, Vimeo, Dailymotion ou PeerTube publient souvent des sous-titres,
+manuels ou automatiques. Quand une piste existe dans la langue voulue, elle
+remplace la reconnaissance vocale : seul le petit fichier de sous-titres est
+téléchargé, pas l'audio.
+
+Une piste est un tuple (langue, format, URL, automatique). Les pistes manuelles
+sont préférées ; parmi les automatiques, seules celles dans la langue
+d'origine sont gardées (les traductions automatiques de YouTube sont écartées).
+"""
+import html
+import re
+
+from transcript import Segment
+
+CAPTION_FORMATS = ('vtt', 'srt')   # formats lus, par ordre de préférence
+
+_TIMING = re.compile(
+    r'(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})'
+)
+_TAG = re.compile(r'<[^>]*>')
+_BLOCK_SEPARATOR = re.compile(r'\r?\n\r?\n')
+
+
+def _ms(hours, minutes, seconds, millis):
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def language_code(language):
+    """Code court d'une langue : 'fr-FR', 'fr' et 'fr-orig' donnent 'fr'"""
+    return language.split('-')[0].lower()
+
+
+def tracks_from_info(info):
+    """Pistes lisibles listées dans les métadonnées yt-dlp"""
+    tracks = []
+    for key, automatic in (('subtitles', False), ('automatic_captions', True)):
+        for language, entries in (info.get(key) or {}).items():
+            by_format = {entry.get('ext'): entry.get('url') for entry in entries if entry.get('url')}
+            for ext in CAPTION_FORMATS:
+                # Traduction automatique (tlang) : qualité trop faible pour remplacer la reconnaissance
+                if by_format.get(ext) and not (automatic and 'tlang=' in by_format[ext]):
+                    tracks.append((language, ext, by_format[ext], automatic))
+                    break
+    return tracks
+
+
+def choose_track(tracks, language=None, hint=None):
+    """Meilleure piste pour `language` (code, ou None pour la langue annoncée `hint`) ; None si aucune
+
+    Sans langue connue, seule une piste automatique (transcription de la langue
+    parlée) est retenue, et seulement si elle est unique.
+    """
+    wanted = language or hint
+    if wanted:
+        matching = [track for track in tracks if language_code(track[0]) == language_code(wanted)]
+    else:
+        matching = [track for track in tracks if track[3]]
+        if len({language_code(track[0]) for track in matching}) != 1:
+            return None
+    # Manuelles d'abord, puis format préféré
+    matching.sort(key=lambda track: (track[3], CAPTION_FORMATS.index(track[1])))
+    return matching[0] if matching else None
+
+
+def parse_captions(text):
+    """Segments d'un fichier WebVTT ou SRT
+
+    Les balises et les lignes répétées des sous-titres défilants (sous-titres
+    automatiques de YouTube) sont retirées : chaque ligne n'apparaît qu'une fois.
+    """
+    segments = []
+    recent = []
+    for block in _BLOCK_SEPARATOR.split(text.strip()):
+        lines = block.splitlines()
+        for n, line in enumerate(lines):
+            match = _TIMING.search(line)
+            if match:
+                break
+        else:
+            # En-tête WEBVTT, blocs NOTE et STYLE
+            continue
+        times = match.groups()
+        new_lines = []
+        for line in lines[n + 1:]:
+            line = html.unescape(_TAG.sub('', line)).strip()
+            if line and line not in recent:
+                new_lines.append(line)
+                recent = (recent + [line])[-2:]
+        if new_lines:
+            segments.append(Segment(_ms(*times[:4]), _ms(*times[4:]), ' '.join(new_lines)))
+    return segments
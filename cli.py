@@ -0,0 +1,197 @@
+"""Transcription en ligne de commande, sans Streamlit.
+
+    python cli.py https://www.youtube.com/watch?v=... -l fr-FR
+    python cli.py cours1.mp4 cours2.mp3 --format json -o transcriptions.json
+    python cli.py https://www.youtube.com/playlist?list=... --playlist --improve formal
+    python cli.py conference.mp4 --format srt -o conference.srt
+"""
+import argparse
+import json
+import os
+import sys
+
+from batch import DONE, FAILED
+from improve import improvement_cache
+from metrics import REGISTRY, StageMetrics
+from recognizers import BACKENDS, DEFAULT_BACKEND
+from transcript_cache import TranscriptCache
+from transcriber import (
+    DEFAULT_WORKERS, MAX_WORKERS, build_batch, improve_text_with_gpt,
+    source_label, start_batch, transcribe
+)
+
+
+class ConsoleReporter:
+    """Écrit les événements du pipeline sur la sortie d'erreur"""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.interactive = sys.stderr.isatty()
+        self.metrics = StageMetrics(parent=REGISTRY)
+
+    def __call__(self, event, message=None, **data):
+        if event == 'metric':
+            self.metrics.record(message, **data)
+        elif event == 'progress':
+            if self.interactive:
+                end = '\n' if data.get('value', 0) >= 1 else ''
+                print(f"\r{message}", end=end, file=sys.stderr, flush=True)
+        elif event in ('warning', 'error') or self.verbose and event == 'info':
+            print(message, file=sys.stderr)
+        elif event == 'debug' and self.verbose:
+            print(message, data.get('data', ''), file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcrit des URL ou des fichiers audio/vidéo.")
+    parser.add_argument('sources', nargs='+', help="URL ou chemins de fichiers")
+    parser.add_argument('-l', '--language', default='fr-FR', help="langue de reconnaissance (défaut : fr-FR), ou auto pour la détecter parmi LANGUAGE_CANDIDATES")
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"requêtes de reconnaissance simultanées (1-{MAX_WORKERS})")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help="moteur de reconnaissance : google (en ligne) ou modèle local (whisper, vosk)")
+    parser.add_argument('--no-vad', action='store_true', help="découpage fixe au lieu de couper sur les pauses")
+    parser.add_argument('--no-stream', action='store_true', help="télécharger et convertir en WAV avant de transcrire (sinon décodage en flux)")
+    parser.add_argument('--no-captions', action='store_true',
+                        help="toujours reconnaître l'audio, même si la plateforme publie des sous-titres")
+    parser.add_argument('--no-cache', action='store_true', help="ignorer le cache des transcriptions")
+    parser.add_argument('--playlist', action='store_true', help="développer les playlists en leurs vidéos")
+    parser.add_argument('--download-workers', type=int, default=2, help="téléchargements simultanés (lots)")
+    parser.add_argument('--recognition-workers', type=int, default=2, help="transcriptions simultanées (lots)")
+    parser.add_argument('--improve', metavar='STYLE', choices=['default', 'formal', 'simple', 'academic'],
+                        help="améliorer le texte avec GPT (clé dans OPENAI_API_KEY, serveur dans OPENAI_API_BASE)")
+    parser.add_argument('--format', choices=['text', 'json', 'srt', 'vtt'], default='text', help="format de sortie")
+    parser.add_argument('-o', '--output',
+                        help="fichier de sortie (défaut : sortie standard) ; dossier pour des sous-titres de plusieurs sources")
+    parser.add_argument('--metrics', metavar='FICHIER',
+                        help="enregistrer les mesures par étape (JSON, ou texte Prometheus si .prom)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="afficher les messages d'information et le résumé des mesures")
+    args = parser.parse_args(argv)
+    if args.format in ('srt', 'vtt') and (len(args.sources) > 1 or args.playlist) and not args.output:
+        parser.error("--output (dossier) est requis pour exporter les sous-titres de plusieurs sources")
+    return args
+
+
+def run(args, report):
+    """Transcrit les sources ; retourne une liste de résultats (un dictionnaire par élément)"""
+    cache = None if args.no_cache else TranscriptCache()
+    use_vad = not args.no_vad
+
+    # Une seule source : transcription directe, en flux si c'est une URL
+    if len(args.sources) == 1 and not args.playlist:
+        source = args.sources[0]
+        transcript = transcribe(
+            source, args.language, args.workers, use_vad,
+            streaming=not args.no_stream, cache=cache, report=report, backend=args.backend,
+            captions=not args.no_captions
+        )
+        return [{
+            'source': source_label(source),
+            'status': DONE if transcript else FAILED,
+            'transcription': transcript,
+        }]
+
+    items = build_batch(args.sources, args.playlist, report)
+    runner = start_batch(
+        items, args.language, args.workers, use_vad,
+        args.download_workers, args.recognition_workers, cache=cache,
+        metrics=report.metrics, backend=args.backend, captions=not args.no_captions
+    )
+    while not runner.join(timeout=1):
+        counts = runner.counts()
+        completed = counts.get(DONE, 0) + counts.get(FAILED, 0)
+        report('progress', f"Lot en cours... ({completed}/{len(items)})",
+               value=completed / len(items), stage='batch')
+    report('progress', "Lot terminé", value=1.0, stage='batch')
+    return [dict(item.to_dict(), transcription=item.transcription) for item in items]
+
+
+def subtitles(transcript, subtitle_format):
+    return transcript.to_srt() if subtitle_format == 'srt' else transcript.to_vtt()
+
+
+def write_subtitles(args, results):
+    """Un fichier de sous-titres, ou un par source dans le dossier --output"""
+    if len(results) == 1 and not os.path.isdir(args.output or ''):
+        output = subtitles(results[0]['transcription'], args.format) if results[0]['transcription'] else ''
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            print(output)
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    for i, result in enumerate(results, start=1):
+        if result['transcription']:
+            name = os.path.splitext(os.path.basename(result['source'].rstrip('/')))[0] or 'transcription'
+            path = os.path.join(args.output, f"{i:03d}_{name}.{args.format}")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(subtitles(result['transcription'], args.format))
+
+
+def write_text(args, results):
+    if args.format == 'json':
+        output = json.dumps(
+            {
+                'language': args.language,
+                'results': [
+                    dict(result, transcription=result['transcription'].to_dict() if result['transcription'] else None)
+                    for result in results
+                ],
+            },
+            ensure_ascii=False, indent=2
+        )
+    elif len(results) == 1:
+        output = results[0].get('improved') or str(results[0]['transcription'] or '')
+    else:
+        output = '\n\n'.join(
+            f"== {result['source']} ==\n{result.get('improved') or str(result['transcription'] or '')}"
+            for result in results
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+def write_metrics(args, metrics):
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(metrics.to_prometheus() if args.metrics.endswith('.prom') else metrics.to_json())
+    if args.verbose:
+        print(f"{'étape':<16}{'appels':>8}{'erreurs':>9}{'reprises':>10}{'total (s)':>11}{'max (s)':>9}{'Mo lus':>9}{'Mo écrits':>11}",
+              file=sys.stderr)
+        for stage, stats in metrics.summary().items():
+            print(f"{stage:<16}{stats['calls']:>8}{stats['errors']:>9}{stats['retries']:>10}"
+                  f"{stats['seconds']:>11.2f}{stats['seconds_max']:>9.2f}"
+                  f"{stats['bytes_in'] / 1e6:>9.1f}{stats['bytes_out'] / 1e6:>11.1f}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = ConsoleReporter(args.verbose)
+    results = run(args, report)
+
+    if args.improve:
+        cache = None if args.no_cache else improvement_cache()
+        for result in results:
+            if result['transcription']:
+                result['improved'] = improve_text_with_gpt(
+                    str(result['transcription']), args.improve, cache=cache, report=report
+                )
+
+    if args.format in ('srt', 'vtt'):
+        write_subtitles(args, results)
+    else:
+        write_text(args, results)
+    write_metrics(args, report.metrics)
+
+    return 0 if all(result['status'] == DONE for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
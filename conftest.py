@@ -0,0 +1 @@
+"""Configuration pytest : sa présence à la racine rend les modules du projet importables depuis tests/."""
@@ -0,0 +1,205 @@
+"""Téléchargement HTTP parallèle par plages (Range), avec reprise.
+
+Quand le serveur accepte les requêtes Range et annonce la taille du fichier,
+celui-ci est découpé en plages téléchargées simultanément sur plusieurs
+connexions, chacune écrivant à sa position dans le même fichier. L'avancement
+de chaque plage est enregistré à côté du fichier partiel : après une erreur,
+un nouvel essai (ou un nouvel appel vers le même fichier de sortie) reprend
+là où chaque plage s'était arrêtée. Sinon, le fichier est lu en un seul flux,
+écrit par gros blocs sans jamais être chargé entièrement en mémoire.
+
+Le fichier partiel et son avancement sont écrits à côté du fichier de sortie,
+donc dans le dossier de travail de la tâche (module scratch) : ils comptent
+dans le quota de l'espace temporaire et disparaissent avec le dossier.
+
+La progression est remontée au plus toutes les `PROGRESS_INTERVAL` secondes,
+depuis le thread appelant.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_CONNECTIONS = 4
+MIN_RANGE_SIZE = 8 * 1024 * 1024     # en dessous, une seule connexion suffit
+CHUNK_SIZE = 256 * 1024              # lecture réseau
+BUFFER_SIZE = 4 * 1024 * 1024        # écriture disque ; l'avancement est enregistré à chaque vidage
+TIMEOUT = 30                         # secondes sans données avant d'abandonner une connexion
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+PROGRESS_INTERVAL = 0.5
+
+
+def _ignore(event, message=None, **data):
+    pass
+
+
+def _probe(session, url):
+    """Taille totale si le serveur accepte les plages, sinon None"""
+    with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        content_range = response.headers.get('Content-Range', '')
+        if response.status_code == 206 and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            return int(total) if total.isdigit() else None
+    return None
+
+
+def _split(total, connections):
+    size = -(-total // connections)
+    return [[start, min(start + size, total)] for start in range(0, total, size)]
+
+
+class _State:
+    """Plages [début, fin[ et octets déjà écrits pour chacune, enregistrés sur disque"""
+
+    def __init__(self, path, url, total, connections):
+        self.path = path
+        self.url = url
+        self.total = total
+        self.ranges = _split(total, connections)
+        self.done = [0] * len(self.ranges)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, url, total, connections):
+        state = cls(path, url, total, connections)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['url'] == url and data['total'] == total:
+                state.ranges, state.done = data['ranges'], data['done']
+        except (OSError, ValueError, KeyError):
+            pass
+        return state
+
+    @property
+    def downloaded(self):
+        return sum(self.done)
+
+    def advance(self, index, count):
+        with self._lock:
+            self.done[index] += count
+
+    def save(self):
+        with self._lock:
+            data = {'url': self.url, 'total': self.total, 'ranges': self.ranges, 'done': list(self.done)}
+        with open(f"{self.path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def _fetch_range(session, url, part_path, state, index):
+    """Télécharge la plage index à partir de là où elle s'était arrêtée"""
+    start, end = state.ranges[index]
+    for attempt in range(MAX_RETRIES + 1):
+        offset = start + state.done[index]
+        if offset >= end:
+            return
+        try:
+            headers = {'Range': f"bytes={offset}-{end - 1}"}
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError("Le serveur a ignoré la requête Range")
+                with open(part_path, 'r+b', buffering=0) as f:
+                    f.seek(offset)
+                    buffer = bytearray()
+                    try:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            buffer += chunk
+                            if len(buffer) >= BUFFER_SIZE:
+                                f.write(buffer)
+                                state.advance(index, len(buffer))
+                                buffer.clear()
+                    finally:
+                        # Ce qui a été reçu avant une coupure reste valable pour la reprise
+                        f.write(buffer)
+                        state.advance(index, len(buffer))
+            if start + state.done[index] < end:
+                raise IOError("Connexion interrompue avant la fin de la plage")
+            return
+        except Exception:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def _download_ranges(session, url, output_path, total, connections, report):
+    part_path = f"{output_path}.part"
+    state = _State.load(f"{part_path}.json", url, total, connections)
+    if not os.path.exists(part_path) or os.path.getsize(part_path) != total:
+        state = _State(state.path, url, total, connections)
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+    elif state.downloaded:
+        report('info', f"⏯️ Reprise du téléchargement ({state.downloaded * 100 / total:.0f} % déjà reçus)")
+
+    with ThreadPoolExecutor(max_workers=len(state.ranges), thread_name_prefix='download') as executor:
+        futures = [
+            executor.submit(_fetch_range, session, url, part_path, state, i)
+            for i in range(len(state.ranges))
+        ]
+        pending = set(futures)
+        try:
+            while pending:
+                _, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                _report_progress(report, state.downloaded, total)
+                state.save()
+            for future in futures:
+                future.result()
+        finally:
+            state.save()
+
+    os.replace(part_path, output_path)
+    os.remove(state.path)
+    return output_path
+
+
+def _download_stream(session, url, output_path, report):
+    """Un seul flux, écrit par gros blocs (taille éventuellement inconnue)"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with session.get(url, stream=True, timeout=TIMEOUT) as response:
+                response.raise_for_status()
+                total = int(response.headers.get('content-length', 0)) or None
+                downloaded = 0
+                last_report = 0.0
+                with open(output_path, 'wb', buffering=BUFFER_SIZE) as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        now = time.monotonic()
+                        if now - last_report >= PROGRESS_INTERVAL:
+                            _report_progress(report, downloaded, total)
+                            last_report = now
+            return output_path
+        except Exception:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def _report_progress(report, downloaded, total):
+    if total:
+        report('progress', f"Téléchargement... {downloaded / 1e6:.1f} / {total / 1e6:.1f} Mo",
+               value=min(downloaded / total, 1.0), stage='download')
+    else:
+        report('progress', f"Téléchargement... {downloaded / 1e6:.1f} Mo", value=0.0, stage='download')
+
+
+def download_file(url, output_path, session=None, connections=DEFAULT_CONNECTIONS, report=_ignore):
+    """Télécharge url vers output_path, en parallèle par plages si possible ; retourne output_path"""
+    if session is None:
+        import requests
+        session = requests.Session()
+
+    total = _probe(session, url)
+    if total:
+        connections = connections if total >= MIN_RANGE_SIZE else 1
+        _download_ranges(session, url, output_path, total, connections, report)
+    else:
+        _download_stream(session, url, output_path, report)
+    report('progress', "Téléchargement terminé", value=1.0, stage='download')
+    return output_path
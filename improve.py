@@ -0,0 +1,235 @@
+"""Amélioration du texte par GPT, découpée en morceaux traités en parallèle.
+
+La transcription est coupée aux fins de phrase en morceaux d'au plus
+`MAX_CHUNK_TOKENS` jetons, envoyés simultanément (dans la limite de `workers`
+requêtes et du limiteur OpenAI partagé par tout le processus, voir le module
+throttle). Les réponses
+arrivent en flux : le texte partiel est remonté au rapporteur au fil de l'eau.
+Chaque résultat est mis en cache par (empreinte du morceau, style, modèle) :
+relancer l'amélioration ne refacture que les morceaux qui ont changé.
+
+L'adresse de l'API se règle avec `api_base` ou la variable OPENAI_API_BASE,
+ce qui permet de travailler contre un serveur local qui imite l'API OpenAI
+(voir benchmarks/fake_openai.py).
+"""
+import hashlib
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import measure
+from throttle import OPENAI_LIMITER
+from transcript_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, TranscriptCache, cache_key
+
+DEFAULT_MODEL = 'gpt-4o-mini'
+MAX_CHUNK_TOKENS = 1500         # jetons par morceau (la réponse est du même ordre)
+DEFAULT_WORKERS = 4             # requêtes simultanées par amélioration
+REQUEST_TIMEOUT = 120           # secondes, réponse complète d'un morceau
+MAX_RETRIES = 3
+RETRY_BACKOFF = 2.0             # secondes, doublé à chaque nouvel essai
+PARTIAL_INTERVAL = 0.3          # secondes entre deux remontées du texte partiel
+
+SYSTEM_PROMPT = "Tu es un expert en réécriture et amélioration de texte."
+STYLE_PROMPTS = {
+    'default': "Reformule ce texte pour le rendre plus clair et cohérent :",
+    'formal': "Reformule ce texte dans un style formel et professionnel :",
+    'simple': "Reformule ce texte pour le rendre plus simple à comprendre :",
+    'academic': "Reformule ce texte dans un style académique :"
+}
+# Le même morceau doit donner la même requête quelle que soit sa position : le cache en dépend
+EXCERPT_NOTE = ("Le texte peut être un extrait d'une transcription plus longue : "
+                "réponds uniquement par le texte reformulé, sans introduction ni conclusion.")
+
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+
+def _ignore(event, message=None, **data):
+    pass
+
+
+def improvement_cache(max_bytes=DEFAULT_MAX_BYTES):
+    """Cache des morceaux améliorés, séparé du cache des transcriptions"""
+    os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+    return TranscriptCache(os.path.join(DEFAULT_CACHE_DIR, 'improvements.sqlite3'), max_bytes)
+
+
+def token_counter(model=DEFAULT_MODEL):
+    """Compte les jetons avec tiktoken s'il est installé, sinon estime à 4 caractères par jeton"""
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding('o200k_base')
+        return lambda text: len(encoding.encode(text))
+    except ImportError:
+        return lambda text: len(text) // 4 + 1
+
+
+def split_text(text, max_tokens=MAX_CHUNK_TOKENS, count_tokens=None):
+    """Découpe le texte en morceaux d'au plus max_tokens jetons, aux fins de phrase
+
+    Une phrase trop longue à elle seule (transcription sans ponctuation) est
+    coupée entre deux mots.
+    """
+    count_tokens = count_tokens or token_counter()
+    pieces = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        if count_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = []
+        for word in sentence.split():
+            if words and count_tokens(' '.join(words + [word])) > max_tokens:
+                pieces.append(' '.join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(' '.join(words))
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return [chunk for chunk in chunks if chunk]
+
+
+def chunk_cache_key(chunk, style, model):
+    digest = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+    return cache_key(f"sha256:{digest}", style, model)
+
+
+def improve_chunk(chunk, style, model, api_key, api_base=None, on_partial=None, limiter=OPENAI_LIMITER,
+                  stats=None, owner=None):
+    """Reformule un morceau en flux ; on_partial(texte) reçoit la réponse au fil de l'eau
+
+    `stats` (dictionnaire facultatif) reçoit le nombre de nouvelles tentatives sous 'retries'.
+    `owner` identifie l'amélioration, pour partager le débit de l'API entre tâches.
+    """
+    import openai
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{STYLE_PROMPTS[style]}\n{EXCERPT_NOTE}\n\n{chunk}"}
+    ]
+    retryable = (
+        openai.error.RateLimitError, openai.error.APIError, openai.error.Timeout,
+        openai.error.APIConnectionError, openai.error.ServiceUnavailableError
+    )
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(owner)
+        try:
+            parts = []
+            for event in openai.ChatCompletion.create(
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                stream=True,
+                api_key=api_key,
+                api_base=api_base,
+                request_timeout=REQUEST_TIMEOUT
+            ):
+                content = event['choices'][0]['delta'].get('content')
+                if content:
+                    parts.append(content)
+                    if on_partial:
+                        on_partial(''.join(parts))
+            limiter.success()
+            return ''.join(parts).strip()
+        except retryable:
+            limiter.failure()
+            if attempt == MAX_RETRIES:
+                raise
+            if stats is not None:
+                stats['retries'] = stats.get('retries', 0) + 1
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+        except Exception:
+            # Requête refusée (clé, modèle...) : le service, lui, a répondu
+            limiter.success()
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+
+
+def improve_text(text, style='default', model=DEFAULT_MODEL, api_key=None, api_base=None,
+                 workers=DEFAULT_WORKERS, cache=None, report=_ignore):
+    """Améliore le texte morceau par morceau ; retourne le texte complet, ou None en cas d'échec
+
+    Le texte assemblé jusqu'ici est remonté par l'événement 'partial'
+    (`report('partial', texte, stage='improve')`). Les morceaux réussis sont
+    mis en cache même si d'autres échouent : une nouvelle tentative ne
+    reprend que ceux qui manquent.
+    """
+    chunks = split_text(text, count_tokens=token_counter(model))
+    if not chunks:
+        return None
+    results = [None] * len(chunks)
+    partials = {}
+
+    if cache is not None:
+        for i, chunk in enumerate(chunks):
+            results[i] = cache.get(chunk_cache_key(chunk, style, model))
+    pending = [i for i, result in enumerate(results) if result is None]
+    if len(pending) < len(chunks):
+        report('info', f"♻️ {len(chunks) - len(pending)}/{len(chunks)} morceaux déjà améliorés (cache)")
+
+    def assembled():
+        return '\n\n'.join(r if r is not None else partials.get(i, '') for i, r in enumerate(results)).strip()
+
+    def publish():
+        done = sum(result is not None for result in results)
+        report('progress', f"Amélioration... ({done}/{len(chunks)} morceaux)",
+               value=done / len(chunks), stage='improve')
+        report('partial', assembled(), stage='improve')
+
+    publish()
+    # Les threads déposent leur texte partiel ici ; seul le thread appelant parle au rapporteur
+    # (hormis les mesures, que les rapporteurs acceptent depuis n'importe quel thread)
+    updates = queue.Queue()
+    failed = []
+    owner = object()
+
+    def improve_measured(i):
+        with measure(report, 'gpt', segment=i, bytes_in=len(chunks[i].encode('utf-8')), retries=0) as m:
+            result = improve_chunk(
+                chunks[i], style, model, api_key, api_base,
+                lambda partial: updates.put((i, partial)), stats=m.data, owner=owner
+            )
+            m.data['bytes_out'] = len(result.encode('utf-8'))
+            return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1)),
+                            thread_name_prefix='improve') as executor:
+        futures = {executor.submit(improve_measured, i): i for i in pending}
+        while futures:
+            done, _ = wait(futures, timeout=PARTIAL_INTERVAL, return_when=FIRST_COMPLETED)
+            while not updates.empty():
+                i, partial = updates.get_nowait()
+                partials[i] = partial
+            for future in done:
+                i = futures.pop(future)
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    failed.append(i)
+                    report('warning', f"⚠️ Morceau {i + 1}/{len(chunks)} non amélioré : {e}")
+                    continue
+                if cache is not None and results[i]:
+                    cache.put(chunk_cache_key(chunks[i], style, model), results[i])
+            publish()
+
+    if failed:
+        report('error', f"❌ {len(failed)} morceau(x) sur {len(chunks)} n'ont pas pu être améliorés ; "
+                        "relancez pour ne retraiter que ceux-ci.")
+        return None
+    return assembled()
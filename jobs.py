@@ -0,0 +1,195 @@
+"""Exécution des transcriptions en arrière-plan, indépendamment des reruns Streamlit.
+
+Le gestionnaire est partagé par toutes les sessions du processus : chaque tâche
+reçoit un identifiant, s'exécute dans un groupe de threads borné et enregistre
+ses événements (progression, avertissements, erreurs) ainsi que les segments
+reconnus au fil de l'eau. Les sessions interrogent l'état de leurs tâches et
+peuvent les annuler ; les résultats terminés sont aussi écrits sur disque pour
+rester accessibles après un rechargement de la page ou un redémarrage. Une tâche
+annulée ou en échec garde comme résultat les segments déjà reconnus.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import DONE, FAILED, PENDING as QUEUED
+from metrics import REGISTRY, StageMetrics
+from transcript import Transcript
+from transcript_cache import DEFAULT_CACHE_DIR
+
+RUNNING = 'en cours'
+CANCELLED = 'annulée'
+
+MAX_MESSAGES = 200                 # événements conservés par tâche
+RETENTION_SECONDS = 24 * 3600      # durée de conservation des tâches terminées
+
+
+class Job:
+    """Une tâche d'arrière-plan, son avancement et son résultat"""
+
+    def __init__(self, job_id, label=''):
+        self.id = job_id
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.progress_text = None
+        self.messages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.metrics = StageMetrics(parent=REGISTRY)
+        self.language = None
+        self.segments = {}
+        self.cancel_event = threading.Event()
+
+    @property
+    def running(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def report(self, event, message=None, **data):
+        """Rapporteur passé au pipeline : les événements sont stockés au lieu d'être affichés"""
+        if event == 'progress':
+            self.progress = data.get('value', self.progress)
+            self.progress_text = message
+        elif event in ('info', 'warning', 'error'):
+            self.messages.append((event, message))
+            del self.messages[:-MAX_MESSAGES]
+        elif event == 'metric':
+            self.metrics.record(message, **data)
+        elif event == 'segment':
+            self.segments[data['index']] = data['segment']
+
+    def partial(self):
+        """Transcript des segments reconnus jusqu'ici, dans l'ordre"""
+        # Copie atomique : le thread de la tâche continue d'ajouter des segments
+        segments = self.segments.copy()
+        return Transcript((segments[i] for i in sorted(segments)), self.language)
+
+    def cancel(self):
+        """Demande l'arrêt : plus aucun segment n'est envoyé, ceux déjà reconnus sont gardés"""
+        self.cancel_event.set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'label': self.label,
+            'status': self.status,
+            'progress': self.progress,
+            'progress_text': self.progress_text,
+            'messages': self.messages,
+            'result': self.result.to_dict() if isinstance(self.result, Transcript) else self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'metrics': self.metrics.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data['id'], data.get('label', ''))
+        for name, value in data.items():
+            setattr(job, name, value)
+        job.messages = [tuple(message) for message in job.messages]
+        if isinstance(job.result, dict):
+            job.result = Transcript.from_dict(job.result)
+        # Les mesures relues ne sont pas recomptées dans celles du processus
+        job.metrics = StageMetrics.from_dict(data.get('metrics'))
+        return job
+
+
+class JobManager:
+    """Groupe de threads partagé exécutant les tâches, avec persistance des résultats"""
+
+    def __init__(self, max_workers=4, storage_dir=None):
+        self.storage_dir = storage_dir or os.path.join(DEFAULT_CACHE_DIR, 'jobs')
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._prune_storage()
+
+    def submit(self, fn, *args, label='', **kwargs):
+        """Lance fn(*args, report=..., cancel=..., **kwargs) en arrière-plan ; retourne l'identifiant de la tâche
+
+        `cancel` est un threading.Event posé par Job.cancel().
+        """
+        job = Job(uuid.uuid4().hex[:12], label)
+        with self._lock:
+            self._prune_memory()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """Retourne la tâche, en mémoire ou relue depuis le disque, ou None si inconnue"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        path = self._path(job_id)
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            job = Job.from_dict(json.load(f))
+        with self._lock:
+            self._jobs.setdefault(job.id, job)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.language = kwargs.get('language')
+        if job.cancel_event.is_set():
+            # Annulée avant d'avoir démarré
+            status = CANCELLED
+        else:
+            job.status = RUNNING
+            try:
+                job.result = fn(*args, report=job.report, cancel=job.cancel_event, **kwargs)
+                status = DONE if job.result else FAILED
+                if not job.result:
+                    errors = [message for event, message in job.messages if event == 'error']
+                    job.error = errors[-1] if errors else "Aucun texte n'a été reconnu"
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+            if job.cancel_event.is_set():
+                status = CANCELLED
+                job.error = "Transcription annulée"
+        if status != DONE and job.segments:
+            # Les segments déjà reconnus ne sont pas perdus
+            job.result = job.partial()
+        job.finished_at = time.time()
+        job.progress = 1.0
+        self._save(job, status)
+        # Le statut final est posé en dernier : une session qui interroge la tâche voit un état complet
+        job.status = status
+
+    def _path(self, job_id):
+        # Les identifiants viennent de l'URL : on refuse tout ce qui n'est pas hexadécimal
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        return os.path.join(self.storage_dir, f"{job_id}.json")
+
+    def _save(self, job, status):
+        path = self._path(job.id)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(dict(job.to_dict(), status=status), f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def _prune_memory(self):
+        limit = time.time() - RETENTION_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < limit]:
+            del self._jobs[job_id]
+
+    def _prune_storage(self):
+        limit = time.time() - RETENTION_SECONDS
+        for name in os.listdir(self.storage_dir):
+            path = os.path.join(self.storage_dir, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,148 @@
+"""Métadonnées yt-dlp : une seule extraction par vidéo, gardée en cache tant qu'elle est valable.
+
+yt-dlp résout une page (YouTube, Vimeo...) en un dictionnaire d'informations :
+titre, durée et URL directe du format audio choisi. Cette extraction coûte
+plusieurs requêtes au site ; elle n'est faite qu'une fois par vidéo, puis le
+téléchargement part du dictionnaire obtenu au lieu de tout redemander.
+
+Le dictionnaire (allégé de la liste complète des formats, des miniatures et
+des traductions automatiques des sous-titres)
+est enregistré dans un cache SQLite partagé par toutes les sessions et
+conservé d'un lancement à l'autre. Les URL de formats sont signées et
+expirent (paramètre `expire` chez YouTube) : l'entrée n'est réutilisée que
+jusqu'à cette échéance, moins une marge, et au plus INFO_MAX_TTL secondes.
+"""
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import yt_dlp
+
+from metrics import measure
+from throttle import EXTRACTOR_LIMITER
+from transcript_cache import DEFAULT_CACHE_DIR, TranscriptCache, cache_key, url_source_id
+
+INFO_TTL = 3600              # validité d'une entrée sans échéance connue, en secondes
+INFO_MAX_TTL = 6 * 3600
+EXPIRY_MARGIN = 600          # le téléchargement doit pouvoir se terminer avant l'échéance
+INFO_CACHE_MAX_MB = int(os.getenv('MEDIA_INFO_CACHE_MAX_MB', '50'))
+
+# Volumineux et inutiles pour télécharger le format déjà choisi
+DROPPED_KEYS = ('formats', 'thumbnails', 'heatmap', 'storyboards')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _ignore(event, message=None, **data):
+    pass
+
+
+def info_cache():
+    """Cache des métadonnées du processus, créé au premier usage"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+            _cache = TranscriptCache(
+                os.path.join(DEFAULT_CACHE_DIR, 'media_info.sqlite3'), INFO_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _cache
+
+
+def info_key(url, ydl):
+    """Clé d'une vidéo pour un sélecteur de format donné"""
+    return cache_key(url_source_id(url), ydl.params.get('format') or '', 'info-v2')
+
+
+def format_urls(info):
+    formats = info.get('requested_formats') or [info]
+    return [f['url'] for f in formats if f.get('url')]
+
+
+def expires_at(info, now=None):
+    """Échéance d'utilisation des métadonnées : expiration des URL signées, bornée par INFO_MAX_TTL"""
+    now = now or time.time()
+    expires = [parse_qs(urlparse(url).query).get('expire', [''])[0] for url in format_urls(info)]
+    deadlines = [int(expire) - EXPIRY_MARGIN for expire in expires if expire.isdigit()]
+    if deadlines:
+        return min(now + INFO_MAX_TTL, *deadlines)
+    return now + INFO_TTL
+
+
+def _throttled(error):
+    """Vrai si l'échec vient du site qui limite les requêtes (et non d'une vidéo privée, supprimée...)"""
+    message = str(error)
+    return any(marker in message for marker in ('HTTP Error 429', 'Too Many Requests', 'rate-limit', 'rate limit'))
+
+
+def slim(info):
+    info = {k: v for k, v in info.items() if k not in DROPPED_KEYS}
+    if info.get('automatic_captions'):
+        # YouTube propose une traduction automatique vers chaque langue (paramètre tlang) :
+        # seules les pistes dans la langue d'origine servent (captions.tracks_from_info)
+        info['automatic_captions'] = {
+            language: entries for language, entries in info['automatic_captions'].items()
+            if not any('tlang=' in (entry.get('url') or '') for entry in entries)
+        }
+    return info
+
+
+def extract_info(ydl, url, report=_ignore, refresh=False):
+    """Métadonnées de la vidéo (format déjà sélectionné) depuis le cache, ou une extraction unique
+
+    `refresh` ignore l'entrée en cache (URL de format refusée par le serveur).
+    """
+    cache = info_cache()
+    key = info_key(url, ydl)
+    if refresh:
+        cache.delete(key)
+    else:
+        cached = cache.get(key)
+        if cached is not None:
+            entry = json.loads(cached)
+            if entry['expires_at'] > time.time():
+                report('info', "✅ Métadonnées de la vidéo trouvées en cache")
+                return entry['info']
+            cache.delete(key)
+
+    with measure(report, 'extract_info'):
+        # Extractions de toutes les sessions au même débit partagé, suspendues si les sites limitent
+        EXTRACTOR_LIMITER.acquire()
+        try:
+            raw = ydl.extract_info(url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            if _throttled(e):
+                EXTRACTOR_LIMITER.failure()
+            else:
+                EXTRACTOR_LIMITER.success()
+            raise
+        except Exception:
+            EXTRACTOR_LIMITER.failure()
+            raise
+        except BaseException:
+            EXTRACTOR_LIMITER.release()
+            raise
+        EXTRACTOR_LIMITER.success()
+        info = slim(ydl.sanitize_info(raw))
+    if info.get('_type', 'video') == 'video' and format_urls(info):
+        cache.put(key, json.dumps({'expires_at': expires_at(info), 'info': info}))
+    return info
+
+
+def download(ydl, url, info, report=_ignore):
+    """Télécharge le format choisi à partir des métadonnées, sans nouvelle extraction
+
+    En cas d'échec (URL signée expirée malgré la marge, format retiré), les
+    métadonnées sont extraites à nouveau une fois. Retourne les métadonnées effectivement utilisées.
+    """
+    try:
+        ydl.process_ie_result(dict(info), download=True)
+        return info
+    except yt_dlp.utils.DownloadError:
+        report('info', "🔄 Échec du téléchargement depuis les métadonnées : nouvelle extraction")
+        info = extract_info(ydl, url, report, refresh=True)
+        ydl.process_ie_result(dict(info), download=True)
+        return info
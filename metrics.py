@@ -0,0 +1,182 @@
+"""Instrumentation du pipeline : durée, octets, nouvelles tentatives et erreurs par étape.
+
+Les étapes mesurées remontent un événement `report('metric', étape, seconds=...,
+bytes_in=..., bytes_out=..., retries=..., error=..., segment=...)` par le
+rapporteur habituel. Contrairement aux autres événements, il peut être émis
+depuis n'importe quel thread : les rapporteurs se contentent de l'enregistrer
+dans un StageMetrics, sans rien afficher.
+
+Chaque StageMetrics transmet aussi ses mesures à son parent ; REGISTRY cumule
+celles de tout le processus et peut être exposé au format texte de Prometheus.
+Des jauges (valeurs instantanées, lues à la demande) peuvent s'y ajouter avec
+StageMetrics.gauge, par exemple l'occupation de l'espace temporaire.
+
+Étapes : peertube_lookup, extract_info, download, upload, convert, split,
+stream_open, recognize (par segment), gpt (par morceau), scratch_wait.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_EVENTS = 2000          # mesures par segment conservées par StageMetrics
+PROMETHEUS_PREFIX = 'speech_extractor'
+
+COUNTERS = (
+    ('calls', "Nombre d'exécutions de l'étape"),
+    ('errors', "Exécutions terminées en erreur"),
+    ('retries', "Nouvelles tentatives après une erreur temporaire"),
+    ('seconds', "Temps passé dans l'étape (s)"),
+    ('bytes_in', "Octets lus par l'étape"),
+    ('bytes_out', "Octets produits par l'étape"),
+)
+
+
+class measure:
+    """Chronomètre une étape et émet l'événement 'metric' à la sortie du bloc
+
+        with measure(report, 'convert', bytes_in=taille) as m:
+            ...
+            m.data['bytes_out'] = os.path.getsize(sortie)
+
+    Une exception levée dans le bloc est comptée comme erreur (puis propagée).
+    """
+
+    def __init__(self, report, stage, **data):
+        self.report = report
+        self.stage = stage
+        self.data = data
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.data.setdefault('error', exc_type.__name__)
+        self.report('metric', self.stage, seconds=time.perf_counter() - self.start, **self.data)
+        return False
+
+
+class StageMetrics:
+    """Cumul des mesures par étape, et détail des mesures par segment"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.stages = {}
+        self.events = []
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds=0.0, bytes_in=0, bytes_out=0, retries=0, error=None, segment=None):
+        with self._lock:
+            stats = self.stages.setdefault(stage, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0, 'seconds_max': 0.0,
+                'bytes_in': 0, 'bytes_out': 0,
+            })
+            stats['calls'] += 1
+            stats['errors'] += bool(error)
+            stats['retries'] += retries
+            stats['seconds'] += seconds
+            stats['seconds_max'] = max(stats['seconds_max'], seconds)
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            if segment is not None:
+                self.events.append({
+                    'stage': stage, 'segment': segment, 'seconds': round(seconds, 4),
+                    'bytes_in': bytes_in, 'bytes_out': bytes_out, 'retries': retries, 'error': error,
+                })
+                del self.events[:-MAX_EVENTS]
+        if self.parent is not None:
+            self.parent.record(stage, seconds, bytes_in, bytes_out, retries, error)
+
+    def gauge(self, name, help_text, read):
+        """Déclare une jauge : `read()` retourne sa valeur courante"""
+        self.gauges[name] = (help_text, read)
+
+    def gauge_values(self):
+        return {name: read() for name, (_, read) in self.gauges.items()}
+
+    def reporter(self):
+        """Rapporteur qui n'enregistre que les mesures (pour les threads sans affichage)"""
+        def report(event, message=None, **data):
+            if event == 'metric':
+                self.record(message, **data)
+        return report
+
+    def summary(self):
+        with self._lock:
+            return {
+                stage: dict(stats, seconds=round(stats['seconds'], 4), seconds_max=round(stats['seconds_max'], 4),
+                            seconds_mean=round(stats['seconds'] / stats['calls'], 4))
+                for stage, stats in self.stages.items()
+            }
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self.events)
+        data = {'stages': self.summary(), 'segments': events}
+        if self.gauges:
+            data['gauges'] = self.gauge_values()
+        return data
+
+    @classmethod
+    def from_dict(cls, data, parent=None):
+        metrics = cls(parent)
+        for stage, stats in (data or {}).get('stages', {}).items():
+            metrics.stages[stage] = {k: v for k, v in stats.items() if k != 'seconds_mean'}
+        metrics.events = list((data or {}).get('segments', []))
+        return metrics
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """Format texte d'exposition de Prometheus"""
+        summary = self.summary()
+        lines = []
+        for name, help_text in COUNTERS:
+            metric = f"{prefix}_stage_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for stage, stats in sorted(summary.items()):
+                lines.append(f'{metric}{{stage="{stage}"}} {stats[name]}')
+        metric = f"{prefix}_stage_seconds_max"
+        lines.append(f"# HELP {metric} Exécution la plus longue de l'étape (s)")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage, stats in sorted(summary.items()):
+            lines.append(f'{metric}{{stage="{stage}"}} {stats["seconds_max"]}')
+        for name, (help_text, read) in self.gauges.items():
+            metric = f"{prefix}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {read()}")
+        return '\n'.join(lines) + '\n'
+
+
+# Mesures de tout le processus (toutes sessions, tâches et lots confondus)
+REGISTRY = StageMetrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(port, host='0.0.0.0'):
+    """Expose REGISTRY sur http://host:port/metrics dans un thread ; retourne le serveur"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,363 @@
+"""Détection des instances PeerTube et accès à leur API.
+
+Chaque hôte rencontré est classé (PeerTube ou non) et la réponse est gardée en
+mémoire pour une durée limitée : les hôtes connus ne sont plus sondés. Les
+domaines des plateformes prises en charge par yt-dlp sont déclarés une fois
+pour toutes comme non-PeerTube. Pour un hôte inconnu, la demande des
+métadonnées de la vidéo sert aussi de sonde : détection et récupération des
+métadonnées se font en une seule requête. Toutes les requêtes passent par une
+même session HTTP, dont les connexions sont réutilisées.
+
+Les métadonnées d'une vidéo sont aussi gardées quelques minutes : les étapes
+d'une même transcription (sous-titres, langue, téléchargement) les demandent
+chacune sans refaire d'appel à l'API.
+"""
+import re
+import threading
+import time
+from urllib.parse import urljoin, urlparse, parse_qs
+
+PEERTUBE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json'
+}
+
+PROBE_TIMEOUT = 5              # secondes, sondes et métadonnées
+POOL_SIZE = 16                 # connexions gardées ouvertes par hôte
+PEERTUBE_TTL = 24 * 3600       # durée de validité d'un hôte reconnu comme PeerTube
+NOT_PEERTUBE_TTL = 6 * 3600    # ... d'un hôte qui a répondu sans être PeerTube
+UNREACHABLE_TTL = 300          # ... d'un hôte qui n'a pas répondu (erreur réseau)
+VIDEO_TTL = 300                # durée de validité des métadonnées d'une vidéo
+MAX_VIDEOS = 256               # vidéos gardées au plus ; les plus anciennes sont oubliées
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """Session HTTP partagée par le processus (pool de connexions)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(PEERTUBE_HEADERS)
+            _session = session
+        return _session
+
+
+class HostCache:
+    """Classement des hôtes (PeerTube ou non) avec durée de validité
+
+    Les hôtes statiques (plateformes connues) n'expirent jamais et couvrent
+    leurs sous-domaines.
+    """
+
+    def __init__(self):
+        self._static = set()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add_static(self, domains):
+        with self._lock:
+            self._static.update(domain.lower() for domain in domains)
+
+    def get(self, host):
+        """True / False si l'hôte est classé, None s'il faut le sonder"""
+        host = host.lower()
+        parts = host.split('.')
+        if any('.'.join(parts[i:]) in self._static for i in range(len(parts) - 1)):
+            return False
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            is_peertube, expires = entry
+            if expires < time.monotonic():
+                del self._entries[host]
+                return None
+            return is_peertube
+
+    def put(self, host, is_peertube, ttl):
+        with self._lock:
+            self._entries[host.lower()] = (is_peertube, time.monotonic() + ttl)
+
+
+HOSTS = HostCache()
+
+_videos = {}    # URL -> ((video_data, base_url), expiration)
+_videos_lock = threading.Lock()
+
+
+def _cached_video(url):
+    with _videos_lock:
+        entry = _videos.get(url)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del _videos[url]
+            return None
+        return entry[0]
+
+
+def _remember_video(url, video):
+    with _videos_lock:
+        _videos[url] = (video, time.monotonic() + VIDEO_TTL)
+        while len(_videos) > MAX_VIDEOS:
+            # Les dictionnaires gardent l'ordre d'insertion : la première entrée est la plus ancienne
+            del _videos[next(iter(_videos))]
+
+
+def base_url_of(url):
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+def extract_peertube_video_id(url):
+    """Extrait l'ID de la vidéo PeerTube depuis l'URL"""
+    parsed_url = urlparse(url)
+    path_parts = parsed_url.path.split('/')
+
+    # Cherche d'abord un ID après /w/ (format courant de PeerTube)
+    for i, part in enumerate(path_parts):
+        if part == 'w' and i + 1 < len(path_parts):
+            # L'ID est la partie après 'w'
+            video_id = path_parts[i + 1].split('?')[0]  # Enlève les paramètres d'URL
+            return video_id
+
+    # Si pas trouvé avec /w/, essaie d'autres formats courants
+    for part in path_parts:
+        # Ignore les parties vides ou communes
+        if not part or part in ['watch', 'videos', 'v', 'w']:
+            continue
+        # Vérifie si la partie ressemble à un ID PeerTube (longueur > 8 et alphanumérique)
+        if len(part) > 8 and part.replace('-', '').isalnum():
+            return part
+
+    # En dernier recours, cherche dans les paramètres d'URL
+    params = parse_qs(parsed_url.query)
+    for param in ['v', 'video', 'videoId']:
+        if param in params:
+            return params[param][0]
+
+    return None
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _is_video_data(data):
+    return isinstance(data, dict) and 'uuid' in data and ('files' in data or 'streamingPlaylists' in data)
+
+
+def _request_video_data(base_url, video_id):
+    """Demande les métadonnées de la vidéo ; retourne None si la réponse n'en contient pas"""
+    response = http_session().get(f"{base_url}/api/v1/videos/{video_id}", timeout=PROBE_TIMEOUT)
+    data = _json(response) if response.ok else None
+    return data if _is_video_data(data) else None
+
+
+def _probe_instance(base_url):
+    """Ancienne détection : /api/v1/config, puis /api/v1/videos"""
+    session = http_session()
+    try:
+        response = session.get(f"{base_url}/api/v1/config", timeout=PROBE_TIMEOUT)
+        data = _json(response) if response.ok else None
+        if isinstance(data, dict) and 'instance' in data:
+            return True
+    except Exception:
+        pass
+    response = session.get(f"{base_url}/api/v1/videos", timeout=PROBE_TIMEOUT)
+    data = _json(response) if response.ok else None
+    return isinstance(data, dict) and 'data' in data
+
+
+def lookup_video(url):
+    """Retourne (video_data, base_url) si l'URL désigne une vidéo PeerTube, sinon None
+
+    Ne fait aucune requête pour un hôte déjà classé non-PeerTube ; pour un hôte
+    inconnu, la requête des métadonnées sert de sonde. Les métadonnées obtenues
+    sont gardées VIDEO_TTL secondes.
+    """
+    host = urlparse(url).netloc
+    if not host or HOSTS.get(host) is False:
+        return None
+    video = _cached_video(url)
+    if video is not None:
+        return video
+    base_url = base_url_of(url)
+    video_id = extract_peertube_video_id(url)
+    try:
+        if video_id:
+            video_data = _request_video_data(base_url, video_id)
+            if video_data is not None:
+                HOSTS.put(host, True, PEERTUBE_TTL)
+                _remember_video(url, (video_data, base_url))
+                return video_data, base_url
+        if HOSTS.get(host) is None:
+            # Pas d'ID ou réponse non décisive (ID inconnu, autre site...) : sonde de l'instance
+            is_peertube = _probe_instance(base_url)
+            HOSTS.put(host, is_peertube, PEERTUBE_TTL if is_peertube else NOT_PEERTUBE_TTL)
+    except Exception:
+        if HOSTS.get(host) is None:
+            HOSTS.put(host, False, UNREACHABLE_TTL)
+    return None
+
+
+def fetch_peertube_video_data(url):
+    """Récupère les métadonnées d'une vidéo PeerTube, retourne (video_data, base_url)"""
+    base_url = base_url_of(url)
+
+    # Extrait l'ID de la vidéo
+    video_id = extract_peertube_video_id(url)
+    if not video_id:
+        raise ValueError("Impossible d'extraire l'ID de la vidéo")
+
+    # Récupère les informations de la vidéo via l'API
+    response = http_session().get(f"{base_url}/api/v1/videos/{video_id}", timeout=PROBE_TIMEOUT)
+    if not response.ok:
+        raise Exception(f"Erreur API: {response.status_code}")
+
+    return response.json(), base_url
+
+
+def fetch_peertube_captions(video_data, base_url):
+    """Pistes de sous-titres de la vidéo : tuples (langue, format, URL, automatique) comme captions.tracks_from_info"""
+    video_id = video_data.get('uuid') or video_data.get('id')
+    response = http_session().get(f"{base_url}/api/v1/videos/{video_id}/captions", timeout=PROBE_TIMEOUT)
+    if not response.ok:
+        raise Exception(f"Erreur API: {response.status_code}")
+    tracks = []
+    for caption in response.json().get('data') or []:
+        # fileUrl (PeerTube 6.2+) est absolue ; captionPath est relatif à l'instance
+        caption_url = caption.get('fileUrl') or urljoin(base_url, caption.get('captionPath') or '')
+        language = (caption.get('language') or {}).get('id')
+        if language and caption_url != base_url:
+            tracks.append((language, 'vtt', caption_url, bool(caption.get('automaticallyGenerated'))))
+    return tracks
+
+
+def _is_audio_only(media_file):
+    resolution = media_file.get('resolution') or {}
+    return media_file.get('hasVideo') is False or resolution.get('id') == 0
+
+
+def _file_cost(media_file):
+    """Ordre de préférence : audio seul, puis le plus petit débit (taille, sinon résolution)"""
+    resolution = (media_file.get('resolution') or {}).get('id') or 0
+    return (not _is_audio_only(media_file), media_file.get('size') or float('inf'), resolution)
+
+
+def find_peertube_file_url(video_data, base_url):
+    """Cherche l'URL du fichier média dans les métadonnées PeerTube
+
+    Seul l'audio est utile : parmi les fichiers proposés (`files` et ceux des
+    `streamingPlaylists`), on prend le fichier audio seul s'il existe, sinon le
+    plus léger.
+    """
+    direct_url = None
+
+    # 1. Fichiers standards et fichiers des streams (format commun sur PeerTube)
+    candidates = list(video_data.get('files') or [])
+    for playlist in video_data.get('streamingPlaylists') or []:
+        candidates.extend(playlist.get('files') or [])
+    candidates = [f for f in candidates if f.get('fileUrl') and f.get('hasAudio') is not False]
+    if candidates:
+        direct_url = min(candidates, key=_file_cost)['fileUrl']
+
+    # 2. Essaie dans le champ fileDownloadUrl
+    if not direct_url and 'fileDownloadUrl' in video_data:
+        direct_url = video_data['fileDownloadUrl']
+
+    # 3. Cherche dans les formats disponibles
+    if not direct_url and 'downloadUrl' in video_data:
+        direct_url = video_data['downloadUrl']
+
+    # 4. Dernière tentative avec le champ webVideoUrl
+    if not direct_url and 'webVideoUrl' in video_data:
+        direct_url = video_data['webVideoUrl']
+
+    # Assure que l'URL est absolue
+    if direct_url and not direct_url.startswith('http'):
+        direct_url = f"{base_url}{direct_url}"
+
+    return direct_url
+
+
+HLS_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def _hls_attributes(line):
+    return {key: value.strip('"') for key, value in HLS_ATTRIBUTE.findall(line.split(':', 1)[1])}
+
+
+def parse_master_playlist(text, playlist_url):
+    """Renditions d'une playlist HLS maîtresse : liste de (audio seul, débit, URL absolue)"""
+    renditions = []
+    stream_info = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA:'):
+            attributes = _hls_attributes(line)
+            if attributes.get('TYPE') == 'AUDIO' and attributes.get('URI'):
+                renditions.append((True, 0, urljoin(playlist_url, attributes['URI'])))
+        elif line.startswith('#EXT-X-STREAM-INF:'):
+            stream_info = _hls_attributes(line)
+        elif line and not line.startswith('#') and stream_info is not None:
+            # Une variante sans RESOLUTION ni codec vidéo ne contient que l'audio
+            codecs = stream_info.get('CODECS', '')
+            audio_only = 'RESOLUTION' not in stream_info and not any(
+                codec.strip().startswith(('avc', 'hvc', 'hev', 'vp0', 'vp9', 'av01')) for codec in codecs.split(',')
+            ) and bool(codecs)
+            renditions.append((audio_only, int(stream_info.get('BANDWIDTH') or 0), urljoin(playlist_url, line)))
+            stream_info = None
+    return renditions
+
+
+def find_hls_audio_url(video_data):
+    """Playlist HLS la plus légère qui contient l'audio (audio seul si proposé), ou None
+
+    ffmpeg ne lit alors que les segments de cette rendition, au lieu du fichier
+    vidéo complet de la meilleure qualité.
+    """
+    for playlist in video_data.get('streamingPlaylists') or []:
+        master_url = playlist.get('playlistUrl')
+        if not master_url:
+            continue
+        try:
+            response = http_session().get(master_url, timeout=PROBE_TIMEOUT)
+            response.raise_for_status()
+            renditions = parse_master_playlist(response.text, master_url)
+        except Exception:
+            renditions = []
+        if not renditions:
+            # Playlist illisible ici : ffmpeg choisira lui-même parmi les variantes
+            return master_url
+        return min(renditions, key=lambda r: (not r[0], r[1]))[2]
+    return None
+
+
+def find_peertube_audio_source(video_data, base_url):
+    """Source la plus économique pour l'audio : ('file', url) ou ('hls', url), ou None
+
+    Un fichier audio seul est téléchargé directement ; sinon, la rendition HLS la
+    plus légère est lue par ffmpeg sans passer par un fichier vidéo complet ;
+    à défaut, le fichier le plus léger est téléchargé.
+    """
+    web_files = [f for f in video_data.get('files') or [] if f.get('fileUrl') and _is_audio_only(f)]
+    if web_files:
+        return 'file', find_peertube_file_url({'files': web_files}, base_url)
+    hls_url = find_hls_audio_url(video_data)
+    if hls_url:
+        return 'hls', hls_url
+    direct_url = find_peertube_file_url(video_data, base_url)
+    return ('file', direct_url) if direct_url else None
@@ -0,0 +1,313 @@
+"""Moteurs de reconnaissance vocale interchangeables.
+
+Un moteur reçoit des lots de segments (sr.AudioData) et retourne, pour chacun,
+le texte reconnu ou l'exception rencontrée (sr.UnknownValueError pour un
+segment inaudible, sr.RequestError pour une erreur du service) :
+
+- `google` : API web gratuite de Google, un segment par requête ; le débit
+  vient du nombre de requêtes simultanées ;
+- `whisper` : modèle Whisper local (paquet openai-whisper), sur CPU ; les
+  segments d'un lot sont décodés ensemble en un seul appel au modèle ;
+- `vosk` : modèle Vosk local, léger, un modèle par langue.
+
+Les modèles locaux sont chargés une seule fois par processus (get_backend
+retourne toujours la même instance) et partagés par toutes les tâches.
+
+Les requêtes à Google passent par le limiteur partagé du service (module
+throttle) : débit borné, réparti équitablement entre les tâches (`owner`), et
+suspendu quand les erreurs se multiplient. `cancel` (threading.Event)
+interrompt l'attente du limiteur et des nouvelles tentatives.
+
+Chaque moteur sait aussi noter des langues candidates sur quelques courts
+segments (detect_language), pour choisir la langue avant la transcription.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from throttle import GOOGLE_LIMITER, ServiceUnavailable
+from transcript_cache import DEFAULT_CACHE_DIR
+
+REQUEST_TIMEOUT = 30     # délai maximal par requête, en secondes
+MAX_RETRIES = 3          # nouvelles tentatives sur sr.RequestError
+RETRY_BACKOFF = 1.0      # délai initial entre tentatives, doublé à chaque fois
+
+DEFAULT_BACKEND = 'google'
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_BATCH_SIZE = int(os.getenv('WHISPER_BATCH_SIZE', '8'))
+NO_SPEECH_THRESHOLD = 0.6    # au-delà (et avec une faible confiance), Whisper n'a rien entendu
+VOSK_MODEL_DIR = os.getenv('VOSK_MODEL_DIR', os.path.join(DEFAULT_CACHE_DIR, 'vosk'))
+VOSK_BATCH_SIZE = 4
+PROBE_WORKERS = 8        # segments × langues notés simultanément pendant la détection
+
+SAMPLE_RATE = 16000
+
+
+def recognize_segment(audio, language='fr-FR', timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES, stats=None,
+                      limiter=GOOGLE_LIMITER, owner=None, cancel=None):
+    """Reconnaît un segment audio avec Google, avec nouvelles tentatives espacées en cas d'erreur API
+
+    `stats` (dictionnaire facultatif) reçoit le nombre de nouvelles tentatives sous 'retries'
+    et le temps passé à attendre le limiteur sous 'throttle_wait'. Une panne prolongée du
+    service ou l'annulation (`cancel`) lèvent aussitôt sr.RequestError.
+    """
+    # Un Recognizer par appel : l'objet n'est pas prévu pour être partagé entre threads
+    recognizer = sr.Recognizer()
+    recognizer.operation_timeout = timeout
+
+    for attempt in range(retries + 1):
+        try:
+            waited = limiter.acquire(owner, cancel)
+        except ServiceUnavailable as e:
+            raise sr.RequestError(str(e)) from e
+        if stats is not None:
+            stats['throttle_wait'] = stats.get('throttle_wait', 0.0) + waited
+        try:
+            text = recognizer.recognize_google(audio, language=language)
+        except sr.UnknownValueError:
+            # Segment inaudible : le service a répondu normalement
+            limiter.success()
+            raise
+        except Exception as e:
+            # Erreur du service ou de la connexion (coupure, réponse illisible...) : à retenter
+            limiter.failure()
+            if attempt == retries:
+                if isinstance(e, (sr.RequestError, TimeoutError)):
+                    raise
+                raise sr.RequestError(f"Erreur de connexion : {e}") from e
+            if stats is not None:
+                stats['retries'] = stats.get('retries', 0) + 1
+            if cancel is None:
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+            elif cancel.wait(RETRY_BACKOFF * 2 ** attempt):
+                raise sr.RequestError("Requête annulée")
+        except BaseException:
+            limiter.release()
+            raise
+        else:
+            limiter.success()
+            return text
+
+
+class RecognitionBackend:
+    """Interface d'un moteur : recognize_batch(audios, language, stats, owner, cancel) -> [texte ou exception]
+
+    - `batch_size` : segments envoyés ensemble à recognize_batch ;
+    - `max_workers` : lots traités simultanément au plus (limite le nombre de
+      requêtes choisi par l'utilisateur) ;
+    - `limiter` : limiteur du service distant (module throttle), None pour un modèle local.
+
+    `owner` identifie la tâche à l'origine des requêtes, pour partager
+    équitablement le débit du service entre tâches ; `cancel` (threading.Event)
+    abrège le lot en cours quand la tâche est annulée.
+    """
+
+    name = None
+    label = None
+    batch_size = 1
+    max_workers = None
+    limiter = None
+
+    def recognize_batch(self, audios, language, stats=None, owner=None, cancel=None):
+        raise NotImplementedError
+
+    def score_language(self, audio, language):
+        """Vraisemblance (0 à 1) que le segment soit dans cette langue"""
+        raise NotImplementedError
+
+    def detect_language(self, audios, candidates):
+        """Score moyen de chaque langue candidate sur les segments ; tous les couples sont notés simultanément"""
+        pairs = [(audio, language) for audio in audios for language in candidates]
+        scores = dict.fromkeys(candidates, 0.0)
+        with ThreadPoolExecutor(max_workers=min(len(pairs), self.max_workers or PROBE_WORKERS)) as executor:
+            for (_, language), score in zip(pairs, executor.map(lambda pair: self.score_language(*pair), pairs)):
+                scores[language] += score / len(audios)
+        return scores
+
+
+class GoogleBackend(RecognitionBackend):
+    name = 'google'
+    label = "Google (en ligne)"
+    limiter = GOOGLE_LIMITER
+
+    def recognize_batch(self, audios, language, stats=None, owner=None, cancel=None):
+        results = []
+        for audio in audios:
+            try:
+                results.append(recognize_segment(audio, language, stats=stats, limiter=self.limiter, owner=owner,
+                                                 cancel=cancel))
+            except (sr.UnknownValueError, sr.RequestError, TimeoutError) as e:
+                results.append(e)
+        return results
+
+    def score_language(self, audio, language):
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = REQUEST_TIMEOUT
+        self.limiter.acquire()
+        try:
+            # show_all : résultat brut, avec la confiance de la meilleure hypothèse
+            result = recognizer.recognize_google(audio, language=language, show_all=True)
+        except Exception:
+            self.limiter.failure()
+            raise
+        except BaseException:
+            self.limiter.release()
+            raise
+        self.limiter.success()
+        alternatives = result.get('alternative') if isinstance(result, dict) else None
+        if not alternatives:
+            return 0.0
+        # Texte reconnu sans confiance annoncée : score neutre
+        return alternatives[0].get('confidence', 0.5)
+
+
+def _pcm(audio):
+    """Échantillons 16 kHz 16 bits du segment"""
+    return audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+
+
+class WhisperBackend(RecognitionBackend):
+    """Whisper sur CPU : les segments d'un lot sont décodés en un seul passage du modèle"""
+
+    name = 'whisper'
+    label = "Whisper (local)"
+    batch_size = WHISPER_BATCH_SIZE
+    # Le modèle utilise déjà tous les cœurs : un lot à la fois
+    max_workers = 1
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        try:
+            import whisper
+        except ImportError:
+            raise ImportError("Le moteur Whisper nécessite le paquet openai-whisper (pip install openai-whisper)")
+        self._whisper = whisper
+        self.model = whisper.load_model(model_name, device='cpu')
+        self._lock = threading.Lock()
+
+    def _mels(self, audios):
+        import numpy as np
+        import torch
+
+        whisper = self._whisper
+        mels = []
+        for audio in audios:
+            samples = np.frombuffer(_pcm(audio), np.int16).astype(np.float32) / 32768.0
+            # Les segments durent au plus 30 s : exactement la fenêtre du modèle
+            mels.append(whisper.log_mel_spectrogram(whisper.pad_or_trim(samples), n_mels=self.model.dims.n_mels))
+        return torch.stack(mels)
+
+    def recognize_batch(self, audios, language, stats=None, owner=None, cancel=None):
+        import torch
+
+        whisper = self._whisper
+        mels = self._mels(audios)
+        options = whisper.DecodingOptions(language=language.split('-')[0], fp16=False, without_timestamps=True)
+        try:
+            with self._lock, torch.no_grad():
+                decoded = whisper.decode(self.model, mels, options)
+        except Exception as e:
+            return [sr.RequestError(f"Whisper : {e}")] * len(audios)
+
+        results = []
+        for result in decoded:
+            text = result.text.strip()
+            silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < -1.0
+            results.append(text if text and not silent else sr.UnknownValueError())
+        return results
+
+    def detect_language(self, audios, candidates):
+        """Probabilités de langue du modèle lui-même : un seul passage pour tous les segments et toutes les langues"""
+        import torch
+
+        if not self.model.is_multilingual:
+            raise ValueError(f"Le modèle Whisper « {WHISPER_MODEL} » ne reconnaît que l'anglais")
+        mels = self._mels(audios)
+        with self._lock, torch.no_grad():
+            _, probs = self._whisper.detect_language(self.model, mels)
+        return {
+            language: sum(p.get(language.split('-')[0], 0.0) for p in probs) / len(probs)
+            for language in candidates
+        }
+
+
+class VoskBackend(RecognitionBackend):
+    """Vosk sur CPU : un modèle par langue, chargé au premier besoin puis gardé
+
+    Les modèles sont cherchés dans VOSK_MODEL_DIR/<langue> (par exemple
+    ~/.cache/speech_extractor/vosk/fr), à télécharger depuis alphacephei.com/vosk/models.
+    """
+
+    name = 'vosk'
+    label = "Vosk (local)"
+    batch_size = VOSK_BATCH_SIZE
+    max_workers = os.cpu_count() or 1
+
+    def __init__(self, model_dir=VOSK_MODEL_DIR):
+        try:
+            import vosk
+        except ImportError:
+            raise ImportError("Le moteur Vosk nécessite le paquet vosk (pip install vosk)")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model_dir = model_dir
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, language):
+        code = language.split('-')[0]
+        with self._lock:
+            if code not in self._models:
+                path = os.path.join(self.model_dir, code)
+                if not os.path.isdir(path):
+                    raise FileNotFoundError(f"Modèle Vosk introuvable pour « {code} » : {path}")
+                self._models[code] = self._vosk.Model(path)
+            return self._models[code]
+
+    def recognize_batch(self, audios, language, stats=None, owner=None, cancel=None):
+        try:
+            model = self.model(language)
+        except Exception as e:
+            return [sr.RequestError(str(e))] * len(audios)
+        results = []
+        for audio in audios:
+            # Le modèle est partagé ; chaque segment a son propre décodeur, peu coûteux
+            recognizer = self._vosk.KaldiRecognizer(model, SAMPLE_RATE)
+            # Les segments peuvent être des vues (memoryview) sur l'audio projeté en mémoire
+            recognizer.AcceptWaveform(bytes(_pcm(audio)))
+            text = json.loads(recognizer.FinalResult()).get('text', '').strip()
+            results.append(text or sr.UnknownValueError())
+        return results
+
+    def score_language(self, audio, language):
+        try:
+            model = self.model(language)
+        except FileNotFoundError:
+            # Langue sans modèle installé : impossible à transcrire de toute façon
+            return 0.0
+        recognizer = self._vosk.KaldiRecognizer(model, SAMPLE_RATE)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(bytes(_pcm(audio)))
+        words = json.loads(recognizer.FinalResult()).get('result', [])
+        return sum(word['conf'] for word in words) / len(words) if words else 0.0
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, WhisperBackend, VoskBackend)}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name=DEFAULT_BACKEND):
+    """Instance partagée du moteur (le modèle n'est chargé qu'une fois par processus)"""
+    if isinstance(name, RecognitionBackend):
+        return name
+    if name not in BACKENDS:
+        raise ValueError(f"Moteur de reconnaissance inconnu : {name}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
@@ -0,0 +1,182 @@
+"""Espace de travail temporaire borné, partagé par toutes les tâches du processus.
+
+Chaque tâche (transcription, élément d'un lot) reçoit son propre dossier sous
+SCRATCH_DIR, supprimé en entier à la fin de la tâche, qu'elle réussisse ou
+échoue : fichier uploadé, téléchargement, fichiers intermédiaires de yt-dlp
+et WAV converti disparaissent ensemble.
+
+Quand l'espace occupé atteint le quota, les nouvelles tâches attendent que
+d'autres libèrent le leur au lieu d'échouer faute de place. Au premier usage,
+les dossiers laissés par un processus arrêté brutalement sont supprimés : le
+processus propriétaire tient un verrou sur chaque dossier, que le système
+libère à sa mort. Le numéro de processus seul ne suffit pas : après le
+redémarrage d'un conteneur, le nouveau processus reçoit souvent le même.
+
+L'occupation courante est exposée dans les mesures du processus (jauges
+scratch_bytes, scratch_dirs et scratch_waiting) ; le temps d'attente est
+mesuré comme l'étape scratch_wait.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import REGISTRY, measure
+
+try:
+    import fcntl
+except ImportError:     # Windows : le propriétaire n'est identifié que par son numéro de processus
+    fcntl = None
+
+SCRATCH_DIR = os.getenv('SCRATCH_DIR') or os.path.join(tempfile.gettempdir(), 'speech_extractor')
+SCRATCH_QUOTA_MB = int(os.getenv('SCRATCH_QUOTA_MB', '4096'))   # 0 : pas de quota
+WAIT_INTERVAL = 1.0          # nouvelle mesure de l'occupation pendant l'attente, en secondes
+ORPHAN_AGE = 24 * 3600       # dossiers dont le propriétaire est inconnu, supprimés après ce délai
+LOCK_NAME = '.owner.lock'    # verrou du processus propriétaire, dans chaque dossier de travail
+
+
+def _ignore(event, message=None, **data):
+    pass
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock(path):
+    """Pose le verrou du processus sur le dossier ; retourne le descripteur à garder ouvert, ou None"""
+    if fcntl is None:
+        return None
+    fd = os.open(os.path.join(path, LOCK_NAME), os.O_WRONLY | os.O_CREAT, 0o600)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+
+def _locked(path):
+    """True si un processus vivant tient le verrou du dossier, False s'il l'a perdu, None sans verrou"""
+    if fcntl is None:
+        return None
+    try:
+        fd = os.open(os.path.join(path, LOCK_NAME), os.O_WRONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ScratchSpace:
+    """Dossiers de travail par tâche sous `root`, avec quota global en octets"""
+
+    def __init__(self, root=SCRATCH_DIR, quota_bytes=SCRATCH_QUOTA_MB * 1024 * 1024):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.waiting = 0
+        self._dirs = {}    # dossier -> descripteur de son verrou
+        self._swept = False
+        self._condition = threading.Condition()
+
+    @property
+    def active(self):
+        return len(self._dirs)
+
+    def usage(self):
+        """Octets occupés sous la racine (tous processus confondus)"""
+        return directory_size(self.root) if os.path.isdir(self.root) else 0
+
+    def sweep(self):
+        """Supprime les dossiers abandonnés par un processus arrêté ; retourne leur nombre"""
+        removed = 0
+        limit = time.time() - ORPHAN_AGE
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            owner = name.split('-', 1)[0]
+            try:
+                locked = _locked(path)
+                if locked:
+                    continue
+                if locked is None and owner.isdigit():
+                    # Dossier sans verrou (en cours de création, ou système sans verrous)
+                    if int(owner) == os.getpid() or _process_alive(int(owner)):
+                        continue
+                elif locked is None and os.path.getmtime(path) >= limit:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def _full(self):
+        # Sans dossier actif dans ce processus, attendre ne libérerait rien
+        return bool(self.quota_bytes and self._dirs) and self.usage() >= self.quota_bytes
+
+    def acquire(self, report=_ignore):
+        """Crée un dossier de travail, après avoir attendu de la place si le quota est atteint"""
+        with self._condition:
+            if not self._swept:
+                os.makedirs(self.root, exist_ok=True)
+                removed = self.sweep()
+                if removed:
+                    report('info', f"🧹 {removed} dossier(s) temporaire(s) abandonné(s) supprimé(s)")
+                self._swept = True
+            if self._full():
+                report('info', "⏳ Espace temporaire plein : en attente de la fin d'autres tâches...")
+                self.waiting += 1
+                try:
+                    with measure(report, 'scratch_wait'):
+                        while self._full():
+                            self._condition.wait(WAIT_INTERVAL)
+                finally:
+                    self.waiting -= 1
+            path = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=self.root)
+            self._dirs[path] = _lock(path)
+        return path
+
+    def release(self, path):
+        """Supprime le dossier et tout son contenu"""
+        shutil.rmtree(path, ignore_errors=True)
+        with self._condition:
+            fd = self._dirs.pop(path, None)
+            if fd is not None:
+                os.close(fd)
+            self._condition.notify_all()
+
+    @contextmanager
+    def job(self, report=_ignore):
+        """Dossier de travail d'une tâche, supprimé à la sortie du bloc, même en cas d'erreur"""
+        path = self.acquire(report)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+
+SCRATCH = ScratchSpace()
+
+REGISTRY.gauge('scratch_bytes', "Octets occupés dans l'espace temporaire", SCRATCH.usage)
+REGISTRY.gauge('scratch_dirs', "Dossiers de travail temporaires actifs", lambda: SCRATCH.active)
+REGISTRY.gauge('scratch_waiting', "Tâches en attente de place dans l'espace temporaire", lambda: SCRATCH.waiting)
@@ -0,0 +1,58 @@
+"""Lot exécuté comme une tâche d'arrière-plan : son résultat survit à la relecture depuis le disque."""
+import threading
+import time
+
+from batch import DONE, BatchItem
+from jobs import JobManager
+from transcriber import build_batch, transcribe_batch
+from transcript import Segment, Transcript
+
+
+class KnownTranscripts:
+    """Cache où toutes les transcriptions sont déjà connues : le lot ne télécharge rien"""
+
+    def get(self, key):
+        return Transcript([Segment(0, 1500, "bonjour")], 'fr-FR').to_json()
+
+
+def wait_for(manager, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id).running and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return manager.get(job_id)
+
+
+def test_batch_job_result_is_persisted(tmp_path):
+    items = build_batch(['https://www.youtube.com/watch?v=aaaaaaaaaaa', 'https://www.youtube.com/watch?v=bbbbbbbbbbb'])
+    manager = JobManager(max_workers=1, storage_dir=str(tmp_path))
+    job_id = manager.submit(transcribe_batch, items, cache=KnownTranscripts(), captions=False, label="Lot")
+
+    job = wait_for(manager, job_id)
+    assert job.status == DONE
+
+    reloaded = JobManager(storage_dir=str(tmp_path)).get(job_id)
+    restored = [BatchItem.from_dict(data) for data in reloaded.result]
+    assert [item.status for item in restored] == [DONE, DONE]
+    assert all(item.cached for item in restored)
+    assert str(restored[0].transcription) == "bonjour"
+
+
+def test_batch_measurements_go_to_the_job(tmp_path):
+    items = build_batch([str(tmp_path / 'absent.mp3')])
+    manager = JobManager(max_workers=1, storage_dir=str(tmp_path))
+    job_id = manager.submit(transcribe_batch, items, captions=False, label="Lot")
+
+    wait_for(manager, job_id)
+
+    # Les mesures du lot sont celles de la tâche, y compris une fois relue depuis le disque
+    assert 'convert' in JobManager(storage_dir=str(tmp_path)).get(job_id).metrics.stages
+
+
+def test_cancelled_batch_abandons_items_not_started():
+    items = build_batch(['https://www.youtube.com/watch?v=aaaaaaaaaaa', 'https://www.youtube.com/watch?v=bbbbbbbbbbb'])
+    cancel = threading.Event()
+    cancel.set()
+
+    results = transcribe_batch(items, cache=KnownTranscripts(), captions=False, cancel=cancel)
+
+    assert [data['error'] for data in results] == ["Lot annulé", "Lot annulé"]
@@ -0,0 +1,22 @@
+"""Clés du cache : des découpages différents ne partagent jamais leurs segments."""
+from transcriber import source_cache_key
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+def test_streaming_and_file_vad_segmentations_have_distinct_keys():
+    assert source_cache_key(URL, use_vad=True, streaming=True) != source_cache_key(URL, use_vad=True, streaming=False)
+
+
+def test_fixed_segmentation_is_shared_by_both_modes():
+    assert source_cache_key(URL, use_vad=False, streaming=True) == source_cache_key(URL, use_vad=False, streaming=False)
+
+
+def test_backend_instance_is_keyed_by_its_name():
+    from recognizers import GoogleBackend, RecognitionBackend
+
+    class LocalBackend(RecognitionBackend):
+        name = 'local'
+
+    assert source_cache_key(URL, backend=GoogleBackend()) == source_cache_key(URL, backend='google')
+    assert source_cache_key(URL, backend=LocalBackend()) == source_cache_key(URL, backend='local')
@@ -0,0 +1,80 @@
+"""Sous-titres des plateformes : lecture des fichiers et choix de la piste."""
+from captions import choose_track, parse_captions, tracks_from_info
+
+# Sous-titres automatiques défilants : chaque bloc répète la ligne précédente
+ROLLING_VTT = """WEBVTT
+Kind: captions
+Language: fr
+
+00:00:00.000 --> 00:00:02.000 align:start position:0%
+bonjour<00:00:00.500><c> à</c><00:00:01.000><c> tous</c>
+
+00:00:02.000 --> 00:00:02.010 align:start position:0%
+bonjour à tous
+ 
+
+00:00:02.010 --> 00:00:04.000 align:start position:0%
+bonjour à tous
+bienvenue<00:00:02.500><c> dans</c><00:00:03.000><c> l&#39;émission</c>
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:03,500
+<i>Première</i> ligne
+
+2
+00:01:02,250 --> 00:01:04,000
+Seconde ligne
+sur deux lignes
+"""
+
+
+def test_rolling_captions_are_deduplicated_and_untagged():
+    segments = parse_captions(ROLLING_VTT)
+
+    assert [segment.text for segment in segments] == ["bonjour à tous", "bienvenue dans l'émission"]
+    assert (segments[0].start, segments[0].end) == (0, 2000)
+    assert (segments[1].start, segments[1].end) == (2010, 4000)
+
+
+def test_srt_is_parsed():
+    segments = parse_captions(SRT)
+
+    assert [(s.start, s.end, s.text) for s in segments] == [
+        (1000, 3500, "Première ligne"),
+        (62250, 64000, "Seconde ligne sur deux lignes"),
+    ]
+
+
+def test_automatic_translations_are_ignored():
+    info = {
+        'subtitles': {'en': [{'ext': 'srt', 'url': 'https://example.org/en.srt'}]},
+        'automatic_captions': {
+            'fr-orig': [{'ext': 'json3', 'url': 'https://example.org/fr.json3'},
+                        {'ext': 'vtt', 'url': 'https://example.org/fr.vtt'}],
+            'de': [{'ext': 'vtt', 'url': 'https://example.org/fr.vtt?tlang=de'}],
+        },
+    }
+
+    assert tracks_from_info(info) == [
+        ('en', 'srt', 'https://example.org/en.srt', False),
+        ('fr-orig', 'vtt', 'https://example.org/fr.vtt', True),
+    ]
+
+
+def test_manual_track_preferred_over_automatic():
+    tracks = [
+        ('fr-orig', 'vtt', 'auto-fr', True),
+        ('fr', 'srt', 'manual-fr-srt', False),
+        ('fr', 'vtt', 'manual-fr-vtt', False),
+    ]
+
+    assert choose_track(tracks, 'fr-FR')[2] == 'manual-fr-vtt'
+    assert choose_track(tracks, 'en-US') is None
+
+
+def test_unknown_language_needs_a_single_automatic_track():
+    assert choose_track([('fr-orig', 'vtt', 'auto-fr', True), ('en', 'vtt', 'manual-en', False)])[2] == 'auto-fr'
+    assert choose_track([('fr-orig', 'vtt', 'a', True), ('en-orig', 'vtt', 'b', True)]) is None
+    # La langue annoncée par la plateforme sert quand aucune n'est demandée
+    assert choose_track([('en', 'vtt', 'manual-en', False)], hint='en')[2] == 'manual-en'
@@ -0,0 +1,46 @@
+"""Téléchargement par plages : tout reste dans le dossier du fichier de sortie."""
+import os
+
+import downloader
+from downloader import download_file
+
+
+class FakeResponse:
+    def __init__(self, data, start=None, total=None):
+        self.data = data
+        self.status_code = 206 if start is not None else 200
+        self.headers = {'Content-Range': f"bytes {start}-{start + len(data) - 1}/{total}"} if start is not None else {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+
+class RangeSession:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        start, end = headers['Range'].removeprefix('bytes=').split('-')
+        start, end = int(start), int(end)
+        return FakeResponse(self.data[start:end + 1], start, len(self.data))
+
+
+def test_ranged_download_stays_in_the_work_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_RANGE_SIZE', 1024)
+    data = os.urandom(64 * 1024)
+    output = tmp_path / 'video.mp4'
+
+    download_file('https://example.org/video.mp4', str(output), session=RangeSession(data), connections=4)
+
+    assert output.read_bytes() == data
+    assert os.listdir(tmp_path) == ['video.mp4']
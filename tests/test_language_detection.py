@@ -0,0 +1,50 @@
+"""Détection de la langue à travers le rapporteur d'une tâche d'arrière-plan."""
+import numpy as np
+import speech_recognition as sr
+
+from jobs import Job
+from recognizers import RecognitionBackend
+from transcriber import SAMPLE_RATE, SAMPLE_WIDTH, transcribe_segments
+
+
+class FakeBackend(RecognitionBackend):
+    name = 'fake'
+
+    def score_language(self, audio, language):
+        return {'en-US': 0.9, 'fr-FR': 0.2}.get(language, 0.0)
+
+    def recognize_batch(self, audios, language, stats=None, owner=None, cancel=None):
+        return [language for _ in audios]
+
+
+def speech_segments(count=4, seconds=10):
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        samples = (rng.standard_normal(seconds * SAMPLE_RATE) * 3000).astype('<i2')
+        yield i * seconds * 1000, sr.AudioData(samples.tobytes(), SAMPLE_RATE, SAMPLE_WIDTH)
+
+
+def test_candidates_detected_through_job_reporter():
+    job = Job('0123456789ab')
+    transcript = transcribe_segments(
+        speech_segments(), ['fr-FR', 'en-US'], workers=2, report=job.report, backend=FakeBackend()
+    )
+
+    assert transcript.language == 'en-US'
+    assert [segment.text for segment in transcript.segments] == ['en-US'] * 4
+    assert not [message for event, message in job.messages if event in ('warning', 'error')]
+    assert job.metrics.stages['language_probe']['calls'] == 1
+
+
+def test_detection_failure_falls_back_to_first_candidate():
+    class FailingBackend(FakeBackend):
+        def score_language(self, audio, language):
+            raise sr.RequestError("quota")
+
+    job = Job('0123456789ab')
+    transcript = transcribe_segments(
+        speech_segments(), ['de-DE', 'en-US'], workers=2, report=job.report, backend=FailingBackend()
+    )
+
+    assert transcript.language == 'de-DE'
+    assert any(event == 'warning' for event, _ in job.messages)
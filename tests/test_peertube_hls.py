@@ -0,0 +1,69 @@
+"""Playlists HLS PeerTube : la rendition la plus légère qui contient l'audio."""
+import peertube
+from peertube import find_hls_audio_url, parse_master_playlist
+
+MASTER_URL = 'https://videos.example.org/static/streaming-playlists/hls/abc/master.m3u8'
+
+SEPARATE_AUDIO = """#EXTM3U
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Audio",URI="abc-0.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720,CODECS="avc1.64001f,mp4a.40.2",AUDIO="audio"
+abc-720.m3u8
+"""
+
+VARIANTS_ONLY = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720,CODECS="avc1.64001f,mp4a.40.2"
+abc-720.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=400000,RESOLUTION=320x180,CODECS="avc1.64000d,mp4a.40.2"
+abc-180.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=640x360,CODECS="avc1.64001e,mp4a.40.2"
+https://cdn.example.org/abc-360.m3u8
+"""
+
+AUDIO_VARIANT = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=400000,RESOLUTION=320x180,CODECS="avc1.64000d,mp4a.40.2"
+abc-180.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=130000,CODECS="mp4a.40.2"
+abc-0.m3u8
+"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, timeout=None):
+        return FakeResponse(self.text)
+
+
+def choose(monkeypatch, text):
+    monkeypatch.setattr(peertube, 'http_session', lambda: FakeSession(text))
+    return find_hls_audio_url({'streamingPlaylists': [{'playlistUrl': MASTER_URL}]})
+
+
+def test_audio_media_entry_is_parsed_as_audio_only():
+    assert parse_master_playlist(SEPARATE_AUDIO, MASTER_URL) == [
+        (True, 0, 'https://videos.example.org/static/streaming-playlists/hls/abc/abc-0.m3u8'),
+        (False, 2500000, 'https://videos.example.org/static/streaming-playlists/hls/abc/abc-720.m3u8'),
+    ]
+
+
+def test_audio_only_rendition_is_chosen(monkeypatch):
+    assert choose(monkeypatch, SEPARATE_AUDIO).endswith('/abc-0.m3u8')
+    # Variante sans résolution ni codec vidéo : audio seul, malgré un débit non nul
+    assert choose(monkeypatch, AUDIO_VARIANT).endswith('/abc-0.m3u8')
+
+
+def test_lowest_bitrate_variant_is_the_fallback(monkeypatch):
+    assert choose(monkeypatch, VARIANTS_ONLY).endswith('/abc-180.m3u8')
+
+
+def test_unreadable_master_playlist_is_left_to_ffmpeg(monkeypatch):
+    assert choose(monkeypatch, "#EXTM3U\n") == MASTER_URL
@@ -0,0 +1,43 @@
+"""Sous-titres et métadonnées PeerTube : une transcription ne redemande pas ce qu'elle sait déjà."""
+import peertube
+import transcriber
+from transcript_cache import TranscriptCache
+
+VTT = "WEBVTT\n\n00:00:00.000 --> 00:00:02.000\nBonjour à tous\n"
+VIDEO = {'uuid': 'abc', 'files': [], 'language': {'id': 'fr'}}
+
+
+def test_peertube_video_looked_up_once(monkeypatch):
+    calls = []
+
+    def request(base_url, video_id):
+        calls.append(video_id)
+        return VIDEO
+
+    monkeypatch.setattr(peertube, '_request_video_data', request)
+    monkeypatch.setattr(peertube, '_videos', {})
+    url = 'https://videos.example.org/w/9c9de5e8-0a1e-484a-b099-e80766180a6d'
+
+    assert peertube.lookup_video(url) == (VIDEO, 'https://videos.example.org')
+    assert transcriber.language_hint(url) == 'fr'
+    assert len(calls) == 1
+
+
+def test_caption_transcript_is_cached(monkeypatch, tmp_path):
+    calls = []
+
+    def fetch(url, language=None, report=None):
+        calls.append(url)
+        return ('fr', 'vtt', 'https://example.org/fr.vtt', False), VTT
+
+    monkeypatch.setattr(transcriber, '_fetch_captions', fetch)
+    cache = TranscriptCache(str(tmp_path / 'cache.sqlite3'))
+    url = 'https://www.youtube.com/watch?v=aaaaaaaaaaa'
+
+    first = transcriber.transcribe_captions(url, 'fr', cache=cache)
+    second = transcriber.transcribe_captions(url, 'fr', cache=cache)
+
+    assert str(first) == str(second) == "Bonjour à tous"
+    assert len(calls) == 1
+    # La reconnaissance vocale, demandée sans les sous-titres, n'est pas servie par cette entrée
+    assert cache.get(transcriber.source_cache_key(url, 'fr')) is None
@@ -0,0 +1,23 @@
+"""Espace temporaire : les dossiers d'un processus arrêté sont reconnus même si son numéro est réutilisé."""
+import os
+
+from scratch import LOCK_NAME, ScratchSpace
+
+
+def test_sweep_removes_crashed_directory_with_reused_pid(tmp_path):
+    # Dossier d'un processus précédent qui avait le même numéro (redémarrage du conteneur)
+    crashed = tmp_path / f"{os.getpid()}-crashed"
+    crashed.mkdir()
+    (crashed / LOCK_NAME).touch()
+    (crashed / 'audio.wav').write_bytes(b'\0' * 1024)
+
+    assert ScratchSpace(str(tmp_path)).sweep() == 1
+    assert not crashed.exists()
+
+
+def test_sweep_keeps_directories_in_use(tmp_path):
+    scratch = ScratchSpace(str(tmp_path))
+    with scratch.job() as work_dir:
+        assert ScratchSpace(str(tmp_path)).sweep() == 0
+        assert os.path.isdir(work_dir)
+    assert not os.path.exists(work_dir)
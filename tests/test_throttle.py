@@ -0,0 +1,125 @@
+"""Limiteur partagé : la requête d'essai est toujours conclue."""
+import threading
+import time
+
+import pytest
+import speech_recognition as sr
+
+from recognizers import recognize_segment
+from throttle import CircuitBreaker, ServiceLimiter, ServiceUnavailable
+
+
+def open_limiter():
+    """Limiteur dont le disjoncteur vient de s'ouvrir, avec une pause nulle : la prochaine requête est l'essai"""
+    limiter = ServiceLimiter('test', 0, breaker=CircuitBreaker(threshold=1, cooldown=0.0))
+    limiter.failure()
+    return limiter
+
+
+def acquire_in_thread(limiter, timeout=2):
+    thread = threading.Thread(target=limiter.acquire, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_unexpected_error_concludes_the_probe(monkeypatch):
+    def broken(self, audio, language=None):
+        raise ConnectionResetError("connexion réinitialisée")
+
+    monkeypatch.setattr(sr.Recognizer, 'recognize_google', broken)
+    monkeypatch.setattr('recognizers.RETRY_BACKOFF', 0.0)
+    limiter = open_limiter()
+
+    with pytest.raises(sr.RequestError):
+        recognize_segment(sr.AudioData(b'\0\0' * 160, 16000, 2), retries=1, limiter=limiter)
+
+    assert acquire_in_thread(limiter)
+
+
+def test_interrupted_probe_is_released(monkeypatch):
+    def interrupted(self, audio, language=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(sr.Recognizer, 'recognize_google', interrupted)
+    limiter = open_limiter()
+
+    with pytest.raises(KeyboardInterrupt):
+        recognize_segment(sr.AudioData(b'\0\0' * 160, 16000, 2), limiter=limiter)
+
+    assert acquire_in_thread(limiter)
+
+
+def test_cancel_interrupts_a_paused_wait():
+    limiter = ServiceLimiter('test', 0, breaker=CircuitBreaker(threshold=1, cooldown=60.0))
+    limiter.failure()
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    with pytest.raises(ServiceUnavailable):
+        limiter.acquire(cancel=cancel)
+
+
+def test_cancel_leaves_the_token_queue():
+    limiter = ServiceLimiter('test', 60)
+    limiter.acquire()
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    with pytest.raises(ServiceUnavailable):
+        limiter.acquire(owner='a', cancel=cancel)
+    assert limiter.bucket.waiting == 0
+
+
+def test_prolonged_outage_fails_fast():
+    breaker = CircuitBreaker(threshold=1, cooldown=60.0, max_outage=0.2)
+    limiter = ServiceLimiter('test', 0, breaker=breaker)
+    limiter.failure()
+
+    start = time.monotonic()
+    with pytest.raises(ServiceUnavailable):
+        limiter.acquire()
+    assert time.monotonic() - start < 1
+    # Une nouvelle demande pendant la même panne échoue sans attendre
+    with pytest.raises(ServiceUnavailable):
+        limiter.acquire()
+    assert time.monotonic() - start < 1
+
+
+def test_cancel_ends_a_transcription_waiting_for_the_service():
+    from recognizers import GoogleBackend
+    from transcriber import transcribe_segments
+
+    class PausedBackend(GoogleBackend):
+        limiter = ServiceLimiter('test', 0, breaker=CircuitBreaker(threshold=1, cooldown=60.0))
+
+    PausedBackend.limiter.failure()
+    segments = ((i * 1000, sr.AudioData(b'\0\0' * 16000, 16000, 2)) for i in range(8))
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    messages = []
+
+    start = time.monotonic()
+    transcript = transcribe_segments(segments, workers=2, backend=PausedBackend(), cancel=cancel,
+                                     report=lambda event, message=None, **data: messages.append((event, message)))
+
+    assert time.monotonic() - start < 2
+    assert transcript.segments == []
+    assert not [message for event, message in messages if event == 'error']
+
+
+def test_cancel_while_probe_waits_for_a_token_releases_the_probe():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0, max_outage=60.0)
+    limiter = ServiceLimiter('test', 60, breaker=breaker)
+    limiter.acquire()          # seau vide : le prochain jeton arrive dans une seconde
+    limiter.failure()          # pause nulle : la prochaine requête devient l'essai
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    with pytest.raises(ServiceUnavailable):
+        limiter.acquire(cancel=cancel)
+
+    assert not breaker.open
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start < 2
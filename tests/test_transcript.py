@@ -0,0 +1,42 @@
+"""Exports sous-titres : horodatage, lignes et découpage des segments longs."""
+from transcript import MAX_CUE_CHARS, MAX_LINE_CHARS, Segment, Transcript, _timestamp
+
+
+def test_timestamp_formatting():
+    assert _timestamp(0, ',') == "00:00:00,000"
+    assert _timestamp(3723004, ',') == "01:02:03,004"
+    assert _timestamp(59999, '.') == "00:00:59.999"
+
+
+def test_short_segment_is_one_cue():
+    transcript = Transcript([Segment(1500, 4000, "Bonjour à tous")])
+
+    assert transcript.to_srt() == "1\n00:00:01,500 --> 00:00:04,000\nBonjour à tous\n"
+    assert transcript.to_vtt() == "WEBVTT\n\n00:00:01.500 --> 00:00:04.000\nBonjour à tous\n"
+
+
+def test_lines_are_wrapped():
+    text = "Le rapide renard brun saute par-dessus le chien paresseux qui dort"
+    (cue,) = Transcript([Segment(0, 5000, text)])._cues()
+
+    lines = cue[2].split('\n')
+    assert len(lines) == 2
+    assert all(len(line) <= MAX_LINE_CHARS for line in lines)
+    assert ' '.join(lines) == text
+
+
+def test_long_segment_is_split_and_ends_with_the_segment():
+    text = ' '.join(["mot"] * 70)
+    cues = list(Transcript([Segment(0, 5000, text)])._cues())
+
+    assert len(cues) > 1
+    assert all(len(cue_text.replace('\n', ' ')) <= MAX_CUE_CHARS for _, _, cue_text in cues)
+    assert cues[0][0] == 0 and cues[-1][1] == 5000
+    # Les sous-titres se suivent sans trou ni chevauchement
+    assert all(a[1] == b[0] for a, b in zip(cues, cues[1:]))
+
+
+def test_empty_segments_are_skipped():
+    transcript = Transcript([Segment(0, 1000, ""), Segment(1000, 2000, "Suite")])
+
+    assert transcript.to_srt().startswith("1\n00:00:01,000 --> 00:00:02,000\nSuite")
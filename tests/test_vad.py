@@ -0,0 +1,56 @@
+"""Découpage en flux : mémoire bornée et segments émis sans attendre la fin du flux."""
+import numpy as np
+
+import vad
+from vad import iter_speech_chunks
+
+RATE = 16000
+BLOCK_SECONDS = 5
+
+
+def blocks(seconds_of_speech, seconds_of_silence, log):
+    rng = np.random.default_rng(0)
+    signal = np.concatenate((
+        rng.standard_normal(seconds_of_speech * RATE) * 3000,
+        rng.standard_normal(seconds_of_silence * RATE) * 10,
+    )).astype(np.int16)
+    for start in range(0, len(signal), BLOCK_SECONDS * RATE):
+        log.append(start + BLOCK_SECONDS * RATE)
+        yield signal[start:start + BLOCK_SECONDS * RATE].tobytes()
+
+
+def test_long_silent_tail_keeps_buffer_bounded_and_emits_early(monkeypatch):
+    analysed = []
+    plan_chunks = vad.plan_chunks
+
+    def recording_plan_chunks(samples, *args, **kwargs):
+        analysed.append(len(samples))
+        return plan_chunks(samples, *args, **kwargs)
+
+    monkeypatch.setattr(vad, 'plan_chunks', recording_plan_chunks)
+    read = []
+    emitted_at = []
+    chunks = []
+    for chunk in iter_speech_chunks(blocks(10, 600, read), RATE, 30000):
+        emitted_at.append(read[-1])
+        chunks.append(chunk)
+
+    assert len(chunks) == 1
+    start_ms, end_ms, _ = chunks[0]
+    assert start_ms < 500 and 9500 < end_ms < 11000
+    # Émis dès la première analyse (fenêtre de 60 s), pas à la fin des 610 s du flux
+    assert emitted_at[0] <= 70 * RATE
+    # Le tampon analysé ne dépasse jamais la fenêtre de deux segments plus un bloc
+    assert max(analysed) <= (60 + BLOCK_SECONDS) * RATE
+
+
+def test_speech_touching_the_tail_is_kept_for_the_next_block():
+    read = []
+    chunks = list(iter_speech_chunks(blocks(58, 2, read), RATE, 30000))
+
+    # Aucun segment n'est perdu ni dupliqué à la jonction des analyses
+    covered = sum(end - start for start, end, _ in chunks)
+    assert 57000 < covered < 59500
+    # Deux segments coupés dans une même région ne se recouvrent que de leurs marges
+    assert all(a[0] < b[0] and a[1] - b[0] <= 2 * vad.PADDING_MS + vad.FRAME_MS
+               for a, b in zip(chunks, chunks[1:]))
@@ -0,0 +1,275 @@
+"""Débit et disjoncteur des services externes, partagés par toutes les sessions du processus.
+
+Chaque service (reconnaissance Google, API OpenAI, extraction yt-dlp) a un
+limiteur unique dans le processus :
+
+- un seau à jetons borne le débit au niveau accepté par le fournisseur ; les
+  demandes en attente sont servies à tour de rôle par propriétaire (une
+  transcription, une amélioration), si bien qu'une longue tâche qui a beaucoup
+  de segments en attente ne fait pas patienter les petites derrière elle ;
+- un disjoncteur s'ouvre quand les erreurs se multiplient (quota dépassé,
+  service indisponible) : toutes les requêtes sont suspendues pendant une
+  pause qui double à chaque rechute, puis une seule requête d'essai est
+  envoyée avant de rouvrir le passage. Les requêtes suspendues ne sont pas
+  perdues : elles repartent à la fermeture du disjoncteur, au lieu d'échouer
+  une à une en multipliant les nouvelles tentatives.
+
+Une panne qui dure n'est pas attendue indéfiniment : une fois le disjoncteur
+ouvert depuis plus de MAX_OUTAGE secondes, les requêtes suspendues échouent
+aussitôt (ServiceUnavailable), sauf l'essai envoyé à la fin de chaque pause.
+Les attentes acceptent aussi un `cancel` (threading.Event) qui les interrompt.
+
+Les limiteurs ne coordonnent que les threads d'un même processus.
+L'état de chaque service est exposé dans les mesures du processus (jauges
+<service>_waiting et <service>_circuit_open).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import REGISTRY
+
+FAILURE_THRESHOLD = 5      # erreurs dans la fenêtre qui ouvrent le disjoncteur
+FAILURE_WINDOW = 30.0      # secondes
+COOLDOWN = 10.0            # première pause, en secondes, doublée à chaque rechute
+MAX_COOLDOWN = 300.0
+MAX_OUTAGE = float(os.getenv('SERVICE_MAX_OUTAGE', '120'))   # secondes de panne avant d'échouer sans attendre
+WAIT_POLL_INTERVAL = 0.5   # secondes entre deux vérifications de `cancel` pendant une attente
+
+
+class ServiceUnavailable(Exception):
+    """Attente du limiteur abandonnée : panne prolongée du service, ou annulation"""
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ServiceUnavailable("Requête annulée")
+
+
+class TokenBucket:
+    """Seau à jetons : `per_minute` requêtes par minute, avec des rafales d'au plus `burst`
+
+    Quand les jetons manquent, les demandes sont servies à tour de rôle entre
+    propriétaires, et dans l'ordre d'arrivée pour un même propriétaire.
+    """
+
+    def __init__(self, per_minute, burst=1):
+        self.rate = per_minute / 60.0 if per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        # Propriétaire -> demandes en attente ; l'ordre du dictionnaire est l'ordre de passage
+        self._waiting = {}
+        self._condition = threading.Condition()
+
+    @property
+    def waiting(self):
+        return sum(len(tickets) for tickets in list(self._waiting.values()))
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, owner=None, cancel=None):
+        """Attend un jeton ; retourne le temps d'attente en secondes
+
+        Lève ServiceUnavailable si `cancel` est posé pendant l'attente.
+        """
+        if not self.rate:
+            return 0.0
+        _check_cancel(cancel)
+        start = time.monotonic()
+        ticket = object()
+        with self._condition:
+            self._waiting.setdefault(owner, deque()).append(ticket)
+            try:
+                while True:
+                    self._refill()
+                    my_turn = next(iter(self._waiting)) == owner and self._waiting[owner][0] is ticket
+                    if my_turn and self.tokens >= 1:
+                        self.tokens -= 1
+                        tickets = self._waiting.pop(owner)
+                        tickets.popleft()
+                        if tickets:
+                            # Le propriétaire repasse en fin de tour
+                            self._waiting[owner] = tickets
+                        self._condition.notify_all()
+                        return time.monotonic() - start
+                    # Le premier servi attend le prochain jeton ; les autres, d'être en tête
+                    timeout = (1 - self.tokens) / self.rate if my_turn else None
+                    if cancel is not None:
+                        timeout = min(timeout or WAIT_POLL_INTERVAL, WAIT_POLL_INTERVAL)
+                    self._condition.wait(timeout)
+                    _check_cancel(cancel)
+            except BaseException:
+                # Demande abandonnée : elle quitte la file, et la suivante peut passer
+                tickets = self._waiting.get(owner)
+                if tickets is not None and ticket in tickets:
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._waiting[owner]
+                self._condition.notify_all()
+                raise
+
+
+class CircuitBreaker:
+    """Suspend les requêtes après `threshold` erreurs en `window` secondes"""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, window=FAILURE_WINDOW, cooldown=COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, max_outage=MAX_OUTAGE):
+        self.threshold = threshold
+        self.window = window
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.max_outage = max_outage
+        self.opened_until = 0.0
+        self.outage_since = 0.0    # première ouverture depuis la dernière fermeture
+        self.openings = 0
+        self._failures = deque()
+        self._probing = False
+        self._prober = None     # thread qui a reçu la requête d'essai
+        self._condition = threading.Condition()
+
+    @property
+    def open(self):
+        return self._probing or self.paused
+
+    @property
+    def paused(self):
+        return time.monotonic() < self.opened_until
+
+    def wait(self, cancel=None):
+        """Attend que le passage soit rouvert ; retourne le temps d'attente en secondes
+
+        À la fin d'une pause, seule la première requête passe (essai) : les
+        autres attendent son résultat. Lève ServiceUnavailable si le
+        disjoncteur est ouvert depuis plus de `max_outage` secondes, ou si
+        `cancel` est posé pendant l'attente.
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                _check_cancel(cancel)
+                now = time.monotonic()
+                if now < self.opened_until or self._probing:
+                    if now - self.outage_since > self.max_outage:
+                        raise ServiceUnavailable(
+                            f"Service indisponible depuis {now - self.outage_since:.0f} s"
+                        )
+                    # Réveil au plus tard à la fin de la pause, ou quand la panne devient trop longue
+                    timeout = self.outage_since + self.max_outage - now
+                    if now < self.opened_until:
+                        timeout = min(timeout, self.opened_until - now)
+                    if cancel is not None:
+                        timeout = min(timeout, WAIT_POLL_INTERVAL)
+                    self._condition.wait(max(timeout, 0.0))
+                else:
+                    if self.opened_until:
+                        self._probing = True
+                        self._prober = threading.get_ident()
+                    return time.monotonic() - start
+
+    def success(self):
+        with self._condition:
+            # Seule la requête d'essai referme le disjoncteur : une requête partie avant la pause ne compte pas
+            if self._probing:
+                self._probing = False
+                self.opened_until = 0.0
+                self.outage_since = 0.0
+                self.cooldown = self.base_cooldown
+                self._failures.clear()
+                self._condition.notify_all()
+
+    def release(self):
+        """Abandon de la requête sans résultat (interruption) : si c'était l'essai, une autre requête le refera
+
+        Sans effet si l'essai en cours appartient à un autre thread.
+        """
+        with self._condition:
+            if self._probing and self._prober == threading.get_ident():
+                self._probing = False
+                self._condition.notify_all()
+
+    def failure(self):
+        """Enregistre une erreur ; retourne True si elle ouvre le disjoncteur"""
+        with self._condition:
+            now = time.monotonic()
+            self._failures.append(now)
+            while self._failures and self._failures[0] < now - self.window:
+                self._failures.popleft()
+            if not (self._probing or len(self._failures) >= self.threshold) or now < self.opened_until:
+                return False
+            # Rechute pendant l'essai, ou trop d'erreurs : nouvelle pause, plus longue que la précédente
+            if self._probing:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_until = now + self.cooldown
+            self.outage_since = self.outage_since or now
+            self.openings += 1
+            self._probing = False
+            self._failures.clear()
+            self._condition.notify_all()
+            return True
+
+
+class ServiceLimiter:
+    """Débit et disjoncteur d'un service : acquire() avant chaque requête, puis success() ou failure()
+
+    Chaque acquire() doit être suivi de l'un des trois comptes rendus, y compris
+    quand la requête lève une exception imprévue : sinon une requête d'essai ne
+    serait jamais conclue et le service resterait suspendu pour tout le processus.
+    release() conclut une requête interrompue sans résultat.
+    """
+
+    def __init__(self, name, per_minute, burst=1, breaker=None):
+        self.name = name
+        self.bucket = TokenBucket(per_minute, burst)
+        self.breaker = breaker or CircuitBreaker()
+
+    def acquire(self, owner=None, cancel=None):
+        """Attend la fermeture du disjoncteur puis un jeton ; retourne le temps d'attente en secondes
+
+        Lève ServiceUnavailable (sans qu'aucune requête ne soit partie) en cas de
+        panne prolongée ou si `cancel` est posé.
+        """
+        waited = 0.0
+        while True:
+            waited += self.breaker.wait(cancel)
+            try:
+                waited += self.bucket.acquire(owner, cancel)
+            except BaseException:
+                # L'essai éventuellement accordé ne partira pas : une autre requête le fera
+                self.breaker.release()
+                raise
+            # Disjoncteur ouvert pendant l'attente du jeton : la requête attend la fin de la pause
+            if not self.breaker.paused:
+                return waited
+
+    def success(self):
+        self.breaker.success()
+
+    def failure(self):
+        return self.breaker.failure()
+
+    def release(self):
+        self.breaker.release()
+
+    def register_gauges(self, registry=REGISTRY):
+        registry.gauge(f"{self.name}_waiting", f"Requêtes {self.name} en attente de débit", lambda: self.bucket.waiting)
+        registry.gauge(f"{self.name}_circuit_open", f"Disjoncteur {self.name} ouvert (1) ou fermé (0)",
+                       lambda: int(self.breaker.open))
+        return self
+
+
+# Limites par défaut prudentes ; à ajuster au quota du compte (0 : pas de limite de débit)
+GOOGLE_LIMITER = ServiceLimiter(
+    'google', int(os.getenv('GOOGLE_REQUESTS_PER_MINUTE', '300')), burst=16
+).register_gauges()
+OPENAI_LIMITER = ServiceLimiter(
+    'openai', int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '60'))
+).register_gauges()
+EXTRACTOR_LIMITER = ServiceLimiter(
+    'extractor', int(os.getenv('EXTRACTOR_REQUESTS_PER_MINUTE', '30')), burst=5
+).register_gauges()
@@ -0,0 +1,1128 @@
+"""Pipeline de transcription : téléchargement, conversion, découpage, reconnaissance, amélioration.
+
+Ce module n'importe pas Streamlit : il est utilisé par l'interface (app.py), par
+la ligne de commande (cli.py) et par les benchmarks. Les fonctions signalent leur
+avancement via un rapporteur `report(event, message=None, **data)`, où `event`
+vaut 'info', 'warning', 'error', 'debug', 'progress' (avec `value` entre 0 et 1
+et `stage`) ou 'segment' (un segment reconnu, avec `index` et `segment`, dès
+qu'il est prêt). Par défaut, les événements sont ignorés.
+
+La langue peut être un code (fr-FR) ou une suite de langues candidates :
+quelques courtes fenêtres de parole sont alors notées dans chacune, en
+parallèle, et la meilleure sert à toute la transcription. AUTO_LANGUAGE
+('auto') laisse transcribe() choisir les candidates.
+
+Les fonctions de transcription acceptent un `cancel` (threading.Event) : une
+fois posé, plus aucun segment n'est envoyé au reconnaisseur et les segments
+déjà reconnus sont retournés.
+"""
+import yt_dlp
+import os
+import speech_recognition as sr
+import tempfile
+import subprocess
+import itertools
+import json
+import math
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+import numpy as np
+from batch import DONE, FAILED, BatchItem, BatchRunner
+from captions import choose_track, parse_captions, tracks_from_info
+from downloader import download_file
+import media_info
+from metrics import REGISTRY, measure
+from recognizers import DEFAULT_BACKEND, REQUEST_TIMEOUT, get_backend
+from scratch import SCRATCH
+from peertube import (
+    HOSTS as PEERTUBE_HOSTS, fetch_peertube_captions, fetch_peertube_video_data, find_peertube_audio_source,
+    http_session, lookup_video
+)
+from transcript import ERROR, INAUDIBLE, Segment, Transcript
+from transcript_cache import cache_key, file_source_id, url_source_id
+from vad import iter_speech_chunks, plan_chunks
+
+def _ignore(event, message=None, **data):
+    """Rapporteur par défaut : aucun affichage"""
+
+# Liste des plateformes supportées
+SUPPORTED_PLATFORMS = {
+    'YouTube': ['youtube.com', 'youtu.be'],
+    'Vimeo': ['vimeo.com'],
+    'Dailymotion': ['dailymotion.com', 'dai.ly'],
+    'Facebook': ['facebook.com', 'fb.watch'],
+    'Instagram': ['instagram.com'],
+    'TikTok': ['tiktok.com'],
+    'Twitter/X': ['twitter.com', 'x.com'],
+    'Twitch': ['twitch.tv'],
+    'LinkedIn': ['linkedin.com'],
+    'SoundCloud': ['soundcloud.com'],
+    'Reddit': ['reddit.com'],
+    'Autres plateformes': ['*']
+}
+
+# Les plateformes connues ne sont jamais sondées comme instances PeerTube
+PEERTUBE_HOSTS.add_static(
+    domain for domains in SUPPORTED_PLATFORMS.values() for domain in domains if domain != '*'
+)
+
+# Paramètres de la transcription concurrente
+DEFAULT_WORKERS = 4      # requêtes de reconnaissance simultanées
+MAX_WORKERS = 16
+
+# Format audio envoyé au reconnaisseur : PCM 16 bits mono à 16 kHz suffit à la parole
+SEGMENT_DURATION = 30    # durée d'un segment, en secondes
+SAMPLE_RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2         # s16le
+CACHE_FORMAT = 'segments-v1'  # format des entrées du cache : segments horodatés en JSON
+STREAM_BLOCK_DURATION = 5  # taille des blocs lus dans le flux avant analyse VAD, en secondes
+CANCEL_POLL_INTERVAL = 0.2  # délai maximal de prise en compte d'une annulation, en secondes
+BATCH_POLL_INTERVAL = 0.5   # relecture de l'état d'un lot, en secondes
+
+# Détection automatique de la langue
+AUTO_LANGUAGE = 'auto'
+LANGUAGE_CANDIDATES = tuple(
+    code.strip() for code in os.getenv('LANGUAGE_CANDIDATES', 'fr-FR,en-US,es-ES,de-DE').split(',') if code.strip()
+)
+PROBE_COUNT = 3          # fenêtres de parole notées dans chaque langue candidate
+PROBE_DURATION = 5       # durée d'une fenêtre, en secondes
+PROBE_LOOKAHEAD = 8      # segments lus d'avance pour choisir les fenêtres
+
+# Fichiers uploadés : extensions acceptées (UPLOAD_FORMATS='*' pour tout accepter, ffmpeg décide)
+UPLOAD_FORMATS = [
+    ext.strip().lower() for ext in os.getenv(
+        'UPLOAD_FORMATS',
+        'mp3,wav,m4a,ogg,oga,opus,flac,aac,wma,amr,mp4,m4v,mov,mkv,mka,webm,avi,wmv,flv,3gp,mpeg,mpg,ts'
+    ).split(',') if ext.strip()
+]
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # blocs copiés vers ffmpeg ou vers le disque
+# Formats décodables en lisant l'entrée d'un bout à l'autre : transmis à ffmpeg par un tube,
+# sans fichier. Les autres (MP4, MOV...) peuvent avoir leur index en fin de fichier et
+# sont d'abord écrits par blocs dans le dossier de la tâche.
+PIPEABLE_FORMATS = {'mp3', 'wav', 'ogg', 'oga', 'opus', 'flac', 'aac', 'mkv', 'mka', 'webm', 'flv', 'ts', 'mpeg', 'mpg'}
+
+def normalization_args(sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """Arguments ffmpeg de sortie produisant l'audio attendu par le reconnaisseur"""
+    return ['-vn', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-ac', str(channels)]
+
+def normalize_audio(input_path, output_path, sample_rate=SAMPLE_RATE, channels=CHANNELS, report=_ignore):
+    """Convertit n'importe quel média en WAV mono adapté à la reconnaissance vocale"""
+    command = ['ffmpeg', '-y', '-i', input_path] + normalization_args(sample_rate, channels) + [output_path]
+    # L'entrée peut être une URL (playlist HLS) : sa taille n'est alors pas connue
+    bytes_in = os.path.getsize(input_path) if os.path.isfile(input_path) else 0
+    with measure(report, 'convert', bytes_in=bytes_in) as m:
+        subprocess.run(command, capture_output=True)
+        
+        # Vérifier si le fichier existe
+        if not os.path.exists(output_path):
+            m.data['error'] = 'ffmpeg'
+            return None
+        m.data['bytes_out'] = os.path.getsize(output_path)
+    return output_path
+
+def iter_upload(uploaded_file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Lit un fichier uploadé par blocs depuis le début
+
+    UploadedFile de Streamlit est un BytesIO : getbuffer() en copierait tout le contenu.
+    """
+    uploaded_file.seek(0)
+    return iter(lambda: uploaded_file.read(chunk_size), b'')
+
+def upload_format(uploaded_file):
+    return os.path.splitext(uploaded_file.name)[1].lstrip('.').lower()
+
+def save_upload(uploaded_file, path, report=_ignore):
+    """Écrit le fichier uploadé sur disque par blocs ; retourne le nombre d'octets écrits"""
+    with measure(report, 'upload') as m, open(path, 'wb') as f:
+        for chunk in iter_upload(uploaded_file):
+            m.data['bytes_out'] = m.data.get('bytes_out', 0) + f.write(chunk)
+    return m.data.get('bytes_out', 0)
+
+def process_uploaded_file(uploaded_file, report=_ignore, work_dir=None):
+    """Traite le fichier uploadé (objet fichier avec .name, comme UploadedFile) et le convertit en WAV
+
+    Les fichiers sont écrits dans `work_dir` (dossier de la tâche, voir le module
+    scratch) ou à défaut dans un nouveau dossier temporaire laissé à l'appelant.
+    """
+    input_path = None
+    try:
+        temp_dir = work_dir or tempfile.mkdtemp()
+        
+        # Sauvegarder le fichier uploadé
+        input_path = os.path.join(temp_dir, os.path.basename(uploaded_file.name))
+        save_upload(uploaded_file, input_path, report)
+            
+        # Convertir en WAV normalisé
+        output_path = normalize_audio(input_path, os.path.join(temp_dir, 'audio.wav'), report=report)
+        if not output_path:
+            report('error', "❌ Erreur lors de la conversion du fichier audio")
+            return None
+            
+        return output_path
+        
+    except Exception as e:
+        report('error', f"❌ Erreur lors du traitement du fichier : {str(e)}")
+        return None
+    
+    finally:
+        # L'original n'est plus utile une fois converti
+        if input_path and os.path.exists(input_path):
+            os.remove(input_path)
+
+def process_local_file(input_path, report=_ignore, work_dir=None):
+    """Convertit un fichier local en WAV normalisé, sans le copier au préalable"""
+    try:
+        temp_dir = work_dir or tempfile.mkdtemp()
+        output_path = normalize_audio(input_path, os.path.join(temp_dir, 'audio.wav'), report=report)
+        if not output_path:
+            report('error', "❌ Erreur lors de la conversion du fichier audio")
+            return None
+            
+        return output_path
+        
+    except Exception as e:
+        report('error', f"❌ Erreur lors du traitement du fichier : {str(e)}")
+        return None
+
+def detect_platform(url):
+    """Détecte la plateforme à partir de l'URL"""
+    for platform, domains in SUPPORTED_PLATFORMS.items():
+        for domain in domains:
+            if domain in url.lower() or domain == '*':
+                return platform
+    return 'Autres plateformes'
+
+def download_from_peertube(url, output_path, report=_ignore, video=None):
+    """Télécharge une vidéo depuis n'importe quelle instance PeerTube
+
+    `video` : (video_data, base_url) déjà obtenus par lookup_video, pour ne pas redemander les métadonnées.
+    """
+    try:
+        video_data, base_url = video or fetch_peertube_video_data(url)
+        report('debug', "Debug - Structure de données reçue:", data=list(video_data.keys()))
+        
+        # Source la plus légère contenant l'audio : fichier audio seul, rendition HLS ou petit fichier
+        audio_source = find_peertube_audio_source(video_data, base_url)
+
+        if not audio_source:
+            report('debug', "Debug - Contenu complet de la réponse:", data=json.dumps(video_data, indent=2))
+            raise Exception("Aucune URL de téléchargement trouvée")
+        
+        source_type, source_url = audio_source
+        if source_type == 'hls':
+            # ffmpeg lit la playlist et ne décode que l'audio : pas de fichier vidéo intermédiaire
+            report('info', f"🎧 Extraction de l'audio depuis la playlist HLS : {source_url}")
+            return normalize_audio(source_url, f"{output_path}.wav", report=report)
+        
+        report('info', f"URL de téléchargement trouvée: {source_url}")
+            
+        temp_file = f"{output_path}_temp.mp4"
+        try:
+            with measure(report, 'download') as m:
+                download_file(source_url, temp_file, session=http_session(), report=report)
+                m.data['bytes_out'] = os.path.getsize(temp_file)
+            
+            # Convertit en WAV
+            report('info', "Conversion en WAV...")
+            return normalize_audio(temp_file, f"{output_path}.wav", report=report)
+        finally:
+            # Nettoie le fichier temporaire, même après une erreur
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        
+    except Exception as e:
+        report('error', f"❌ Erreur lors du téléchargement PeerTube : {str(e)}")
+        if 'video_data' in locals():
+            report('debug', "Structure de la réponse de l'API :", data=list(video_data.keys()))
+        return None
+
+def build_ydl_opts(url, output_path, report=_ignore):
+    """Construit les options yt-dlp adaptées à la plateforme de l'URL"""
+    # Le média est gardé dans son format d'origine : normalize_audio le convertit en une seule passe
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': f"{output_path}.%(ext)s",
+        'quiet': True,
+        'extract_flat': False,
+        'no_warnings': True,
+        'no_color': True,
+        'geo_bypass': True,
+        'nocheckcertificate': True,
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'retries': 3,
+        'fragment_retries': 3,
+        'skip_unavailable_fragments': True,
+        'ignoreerrors': False,
+        'no_playlist': True
+    }
+    
+    platform = detect_platform(url)
+    report('info', f"📺 Plateforme détectée : {platform}")
+    
+    # Ajuster les options selon la plateforme
+    if platform == 'Facebook':
+        ydl_opts.update({'facebook_dl_timeout': 30})
+    elif platform == 'Twitter/X':
+        ydl_opts.update({'twitter_api_key': os.getenv('TWITTER_API_KEY', '')})
+    elif platform == 'Instagram':
+        ydl_opts.update({'instagram_login': os.getenv('INSTAGRAM_LOGIN', '')})
+    
+    return ydl_opts
+
+def download_and_convert_to_wav(url, report=_ignore, work_dir=None):
+    """Télécharge l'audio depuis n'importe quelle plateforme supportée
+
+    Les fichiers intermédiaires (yt-dlp, PeerTube) sont écrits dans `work_dir`,
+    supprimé avec eux à la fin de la tâche.
+    """
+    try:
+        temp_dir = work_dir or tempfile.mkdtemp()
+        output_path = os.path.join(temp_dir, 'audio')
+        
+        # Vérifie d'abord si c'est une instance PeerTube (sans requête pour les hôtes déjà classés)
+        with measure(report, 'peertube_lookup'):
+            peertube_video = lookup_video(url)
+        if peertube_video:
+            report('info', "📺 Instance PeerTube détectée")
+            return download_from_peertube(url, output_path, report, video=peertube_video)
+        
+        # Si ce n'est pas PeerTube, utilise la configuration standard yt-dlp
+        ydl_opts = build_ydl_opts(url, output_path, report)
+        
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Une seule extraction (ou aucune si les métadonnées sont en cache) :
+            # le téléchargement part du format déjà résolu
+            info = media_info.extract_info(ydl, url, report)
+            if (info.get('duration') or 0) > 3600:  # Plus d'une heure
+                report('warning', "⚠️ Cette vidéo est très longue, la transcription peut prendre du temps")
+            
+            report('info', "⏬ Téléchargement en cours...")
+            with measure(report, 'download') as m:
+                info = media_info.download(ydl, url, info, report)
+                source_path = ydl.prepare_filename(info)
+                m.data['bytes_out'] = os.path.getsize(source_path) if os.path.exists(source_path) else 0
+        
+        wav_path = normalize_audio(source_path, f"{output_path}.wav", report=report)
+        if os.path.exists(source_path):
+            os.remove(source_path)
+        return wav_path
+        
+    except Exception as e:
+        report('error', f"❌ Erreur inattendue : {str(e)}")
+        return None
+
+def _terminate(processes, temp_files=()):
+    """Arrête les processus d'un flux et supprime ses fichiers temporaires"""
+    for process in processes:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    for path in temp_files:
+        if os.path.exists(path):
+            os.remove(path)
+
+def open_pcm_stream(url, report=_ignore, work_dir=None):
+    """Lance le téléchargement et le décodage en flux, retourne (sortie PCM, durée, fonction de fermeture)"""
+    decoder_args = normalization_args() + ['-f', 's16le', 'pipe:1']
+    
+    # PeerTube : ffmpeg lit directement le fichier distant ou la rendition HLS la plus légère
+    with measure(report, 'peertube_lookup'):
+        peertube_video = lookup_video(url)
+    if peertube_video:
+        report('info', "📺 Instance PeerTube détectée")
+        video_data, base_url = peertube_video
+        audio_source = find_peertube_audio_source(video_data, base_url)
+        if not audio_source:
+            raise Exception("Aucune URL de téléchargement trouvée")
+        decoder = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-i', audio_source[1]] + decoder_args,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        return decoder.stdout, video_data.get('duration'), lambda: _terminate([decoder])
+    
+    # Autres plateformes : yt-dlp écrit le média sur sa sortie standard, ffmpeg le décode
+    ydl_opts = build_ydl_opts(url, '-', report)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = media_info.extract_info(ydl, url, report)
+    info_json = json.dumps(info)
+    
+    # Réutilise les métadonnées déjà extraites au lieu de les redemander
+    with tempfile.NamedTemporaryFile('w', suffix='.info.json', dir=work_dir, delete=False) as f:
+        f.write(info_json)
+        info_path = f.name
+    
+    downloader = subprocess.Popen(
+        [
+            sys.executable, '-m', 'yt_dlp',
+            '--quiet', '--no-warnings', '--no-playlist',
+            '-f', ydl_opts['format'],
+            '--load-info-json', info_path,
+            '-o', '-'
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    decoder = subprocess.Popen(
+        ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0'] + decoder_args,
+        stdin=downloader.stdout, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    # ffmpeg est désormais le seul lecteur du tube
+    downloader.stdout.close()
+    
+    return decoder.stdout, info.get('duration'), lambda: _terminate([decoder, downloader], [info_path])
+
+def probe_duration(path):
+    """Durée d'un média en secondes, lue par ffprobe dans son en-tête ; None si inconnue"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError):
+        return None
+
+def _feed(process, uploaded_file, report):
+    """Exécuté dans un thread : copie l'upload par blocs sur l'entrée standard de ffmpeg"""
+    try:
+        with measure(report, 'upload') as m:
+            for chunk in iter_upload(uploaded_file):
+                process.stdin.write(chunk)
+                m.data['bytes_out'] = m.data.get('bytes_out', 0) + len(chunk)
+    except (OSError, ValueError):
+        pass  # ffmpeg arrêté (erreur de décodage ou transcription annulée)
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+def open_file_pcm_stream(source, report=_ignore, work_dir=None):
+    """Décode un chemin local ou un fichier uploadé en flux PCM ; retourne (sortie PCM, durée, fermeture)
+
+    Aucun WAV n'est produit : ffmpeg lit le fichier local, ou reçoit l'upload par
+    blocs sur son entrée standard. Seuls les formats qui ne se lisent pas d'un
+    bout à l'autre sont d'abord écrits dans `work_dir`.
+    """
+    decoder_args = normalization_args() + ['-f', 's16le', 'pipe:1']
+    temp_files = []
+    if not isinstance(source, str) and upload_format(source) in PIPEABLE_FORMATS:
+        decoder = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0'] + decoder_args,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        feeder = threading.Thread(target=_feed, args=(decoder, source, report), name='upload-feed', daemon=True)
+        feeder.start()
+
+        def close():
+            _terminate([decoder])
+            feeder.join()
+        return decoder.stdout, None, close
+
+    if isinstance(source, str):
+        input_path = source
+    else:
+        input_path = os.path.join(work_dir or tempfile.mkdtemp(), os.path.basename(source.name))
+        save_upload(source, input_path, report)
+        temp_files.append(input_path)
+    decoder = subprocess.Popen(
+        ['ffmpeg', '-loglevel', 'error', '-i', input_path] + decoder_args,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    return decoder.stdout, probe_duration(input_path), lambda: _terminate([decoder], temp_files)
+
+def iter_pcm_chunks(stream, chunk_seconds=SEGMENT_DURATION):
+    """Découpe un flux PCM brut en blocs de durée fixe au fil de sa lecture"""
+    chunk_size = chunk_seconds * SAMPLE_RATE * SAMPLE_WIDTH
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def segmentation_id(use_vad=True, streaming=False):
+    """Mode de découpage, inclus dans la clé du cache pour ne pas mélanger des index incompatibles
+
+    Sur les pauses, le découpage en flux (fenêtre glissante) diffère de celui du
+    fichier entier : les deux ont leur propre variante. Le découpage fixe est
+    le même dans les deux cas.
+    """
+    mode = 'fixed'
+    if use_vad:
+        mode = 'vad-stream' if streaming else 'vad'
+    return f"{mode}-{SEGMENT_DURATION}s/{CACHE_FORMAT}"
+
+def audio_duration_ms(audio):
+    """Durée d'un AudioData, en millisecondes"""
+    return len(audio.frame_data) * 1000 // (audio.sample_rate * audio.sample_width)
+
+def stream_audio_segments(stream, close, use_vad=True):
+    """Génère des couples (début_ms, AudioData) pendant que le téléchargement se poursuit"""
+    try:
+        if use_vad:
+            blocks = iter_pcm_chunks(stream, STREAM_BLOCK_DURATION)
+            for start_ms, _, chunk in iter_speech_chunks(blocks, SAMPLE_RATE, SEGMENT_DURATION * 1000):
+                yield start_ms, sr.AudioData(chunk, SAMPLE_RATE, SAMPLE_WIDTH)
+        else:
+            start_ms = 0
+            for chunk in iter_pcm_chunks(stream, SEGMENT_DURATION):
+                audio = sr.AudioData(chunk, SAMPLE_RATE, SAMPLE_WIDTH)
+                yield start_ms, audio
+                start_ms += audio_duration_ms(audio)
+    finally:
+        close()
+
+def _energy(audio):
+    samples = np.frombuffer(audio.frame_data, dtype='<i2')
+    return float(np.mean(samples.astype(np.float32) ** 2)) if len(samples) else 0.0
+
+def probe_windows(audios, count=PROBE_COUNT, duration=PROBE_DURATION):
+    """Fenêtres de `duration` s prises au centre des `count` segments les plus énergiques (parole probable)"""
+    probes = []
+    for audio in sorted(audios, key=_energy, reverse=True)[:count]:
+        size = duration * audio.sample_rate * audio.sample_width
+        start = max(0, len(audio.frame_data) - size) // 2 // audio.sample_width * audio.sample_width
+        probe = sr.AudioData(bytes(audio.frame_data[start:start + size]), audio.sample_rate, audio.sample_width)
+        if _energy(probe):
+            probes.append(probe)
+    return probes
+
+def detect_language(segments, candidates, backend, report=_ignore):
+    """Choisit la langue parmi `candidates` sur quelques fenêtres du début ; retourne (segments, langue)
+
+    Les segments lus d'avance sont rendus en tête de la suite retournée. En cas
+    d'échec ou d'égalité, la première candidate l'emporte.
+    """
+    head = list(itertools.islice(segments, PROBE_LOOKAHEAD))
+    probes = probe_windows([audio for _, audio in head])
+    language = candidates[0]
+    if probes and len(candidates) > 1:
+        try:
+            with measure(report, 'language_probe'):
+                scores = backend.detect_language(probes, candidates)
+            language = max(candidates, key=lambda candidate: scores[candidate])
+            report('info', f"🌐 Langue détectée : {language}")
+            report('debug', "Scores des langues candidates :", data=scores)
+        except Exception as e:
+            report('warning', f"⚠️ Détection de la langue impossible ({str(e)}) : {language} utilisée")
+    
+    def resumed():
+        try:
+            yield from head
+            yield from segments
+        finally:
+            # Referme aussi le flux d'origine si la transcription s'arrête avant la fin
+            if hasattr(segments, 'close'):
+                segments.close()
+    
+    return resumed(), language
+
+def _recognize_batch(backend, audios, language, owner=None, cancel=None):
+    """Exécuté dans un worker : retourne (textes ou exceptions, durée du lot en secondes, statistiques)
+
+    Les statistiques comptent les nouvelles tentatives ('retries') et l'attente du limiteur du service
+    ('throttle_wait', en secondes).
+    """
+    stats = {'retries': 0, 'throttle_wait': 0.0}
+    start = time.perf_counter()
+    results = backend.recognize_batch(audios, language, stats=stats, owner=owner, cancel=cancel)
+    return results, time.perf_counter() - start, stats
+
+def transcribe_segments(segments, language='fr-FR', workers=DEFAULT_WORKERS, total=None,
+                        cache=None, cache_key=None, report=_ignore, backend=DEFAULT_BACKEND, cancel=None):
+    """Transcrit une suite de couples (début_ms, AudioData) ; retourne un Transcript horodaté
+
+    Les segments sont confiés au moteur `backend` (nom ou instance, voir le
+    module recognizers) par lots de backend.batch_size. Chaque résultat est
+    signalé par un événement 'segment' dès qu'il arrive. Si `cancel` est posé,
+    les lots pas encore commencés sont abandonnés, ceux qui attendent le
+    limiteur du service sont interrompus, et le Transcript ne contient que les
+    segments reconnus jusque-là. Si `language` est une suite de
+    langues candidates, la langue est d'abord détectée (detect_language).
+    """
+    backend = get_backend(backend)
+    workers = max(1, min(workers, MAX_WORKERS, backend.max_workers or MAX_WORKERS))
+    if not isinstance(language, str):
+        report('progress', "🌐 Détection de la langue...", value=0.0, stage='transcription')
+        segments, language = detect_language(iter(segments), list(language), backend, report)
+    progress_text = "Transcription en cours..."
+    report('progress', progress_text, value=0.0, stage='transcription')
+    
+    # Les résultats sont rangés par index pour conserver l'ordre des segments ;
+    # ceux d'une exécution précédente interrompue sont repris depuis le cache
+    results = {}
+    if cache:
+        results = {
+            i: Segment.from_list(json.loads(value))
+            for i, value in cache.get_segments(cache_key).items()
+        }
+    for i in sorted(results):
+        report('segment', index=i, segment=results[i])
+    pending = {}
+    done = 0
+    failed = False
+    api_errors = {}    # message -> nombre de segments touchés
+    # Les requêtes de cet appel forment une file à part dans le limiteur du service : chaque
+    # transcription en cours reçoit sa part du débit, quelle que soit sa longueur
+    owner = object()
+    limiter = backend.limiter
+    openings = limiter.breaker.openings if limiter else 0
+    
+    def cancelled():
+        return cancel is not None and cancel.is_set()
+    
+    def update_progress():
+        if total:
+            progress = min(done / total, 1.0)
+            report('progress', f"{progress_text} ({int(progress * 100)}%)", value=progress, stage='transcription')
+        else:
+            report('progress', f"{progress_text} ({done} segments)", value=0.0, stage='transcription')
+    
+    def collect(finished):
+        nonlocal openings
+        # Les événements sont émis depuis le thread appelant, jamais depuis les workers
+        for future in finished:
+            batch = pending.pop(future)
+            batch_results, batch_seconds, batch_stats = future.result()
+            if batch_stats['throttle_wait']:
+                report('metric', 'throttle_wait', seconds=batch_stats['throttle_wait'])
+            for j, ((i, segment, audio_bytes), result) in enumerate(zip(batch, batch_results)):
+                # Le temps d'un lot est réparti entre ses segments
+                finish(i, segment, audio_bytes, result, batch_seconds / len(batch),
+                       batch_stats['retries'] if j == 0 else 0)
+        if limiter and limiter.breaker.openings != openings:
+            openings = limiter.breaker.openings
+            report('warning', f"⏸️ Service {limiter.name} saturé : requêtes suspendues "
+                              f"{limiter.breaker.cooldown:.0f} s, puis reprises")
+        update_progress()
+    
+    def finish(i, segment, audio_bytes, result, seconds, retries):
+        nonlocal done, failed
+        if cancelled() and isinstance(result, Exception) and not isinstance(result, sr.UnknownValueError):
+            # Requête interrompue par l'annulation : le segment est abandonné comme les lots pas encore commencés
+            return
+        if isinstance(result, sr.UnknownValueError):
+            report('warning', f"⚠️ Segment {i+1} inaudible")
+            segment.status = INAUDIBLE
+        elif isinstance(result, Exception):
+            # Une même panne touche souvent beaucoup de segments : chaque erreur distincte n'est signalée qu'une fois
+            if str(result) not in api_errors:
+                report('error', f"❌ Erreur API (segment {i+1}): {str(result)}")
+            api_errors[str(result)] = api_errors.get(str(result), 0) + 1
+            segment.status = ERROR
+            failed = True
+        else:
+            segment.text = result
+        report('metric', 'recognize', seconds=seconds, bytes_in=audio_bytes,
+               bytes_out=len(segment.text.encode('utf-8')), retries=retries,
+               error=type(result).__name__ if segment.status == ERROR else None, segment=i)
+        results[i] = segment
+        report('segment', index=i, segment=segment)
+        # Les segments en erreur ne sont pas mis en cache : ils seront retentés
+        if cache and segment.status != ERROR:
+            cache.put_segment(cache_key, i, json.dumps(segment.to_list()))
+        done += 1
+    
+    def drain(limit):
+        # Attend que les lots en attente repassent sous `limit` ; après une annulation,
+        # ceux qui n'ont pas commencé sont abandonnés et seuls ceux en cours sont attendus
+        while len(pending) > limit:
+            if cancelled():
+                for future in list(pending):
+                    if future.cancel():
+                        del pending[future]
+            finished, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            collect(finished)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        
+        def submit():
+            # Limite le nombre de lots en attente pour borner la mémoire
+            drain(workers * 2 - 1)
+            if cancelled():
+                return
+            audios = [audio for _, _, audio in batch]
+            pending[executor.submit(_recognize_batch, backend, audios, language, owner, cancel)] = [
+                (i, segment, len(audio.frame_data)) for i, segment, audio in batch
+            ]
+            batch.clear()
+        
+        for i, (start_ms, audio) in enumerate(segments):
+            if cancelled():
+                break
+            if i in results:
+                done += 1
+                update_progress()
+                continue
+            batch.append((i, Segment(start_ms, start_ms + audio_duration_ms(audio)), audio))
+            if len(batch) >= backend.batch_size:
+                submit()
+        if batch:
+            submit()
+        drain(0)
+    
+    if cancelled():
+        # Arrête aussi la lecture du flux (téléchargement et décodage)
+        if hasattr(segments, 'close'):
+            segments.close()
+        report('warning', f"⏹️ Transcription annulée : {len(results)} segment(s) conservé(s)")
+    else:
+        report('progress', "Transcription terminée !", value=1.0, stage='transcription')
+    if sum(api_errors.values()) > 1:
+        report('error', f"❌ {sum(api_errors.values())} segments en erreur API : "
+                        "relancez pour ne retraiter que ceux-ci")
+    transcript = Transcript((results[i] for i in sorted(results)), language)
+    
+    # Une transcription incomplète n'est pas figée : la prochaine exécution reprendra les segments manquants
+    if cache and not failed and not cancelled():
+        cache.put(cache_key, transcript.to_json())
+    return transcript
+
+def transcribe_url_stream(url, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                          cache=None, cache_key=None, report=_ignore, backend=DEFAULT_BACKEND, work_dir=None,
+                          cancel=None):
+    """Transcrit une URL en flux : la reconnaissance démarre pendant le téléchargement"""
+    return transcribe_pcm_stream(
+        lambda: open_pcm_stream(url, report, work_dir), language, workers, use_vad,
+        cache=cache, cache_key=cache_key, report=report, backend=backend, cancel=cancel
+    )
+
+def transcribe_file_stream(source, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                           cache=None, cache_key=None, report=_ignore, backend=DEFAULT_BACKEND, work_dir=None,
+                           cancel=None):
+    """Transcrit un fichier local ou uploadé en flux, sans WAV intermédiaire ni copie complète en mémoire"""
+    return transcribe_pcm_stream(
+        lambda: open_file_pcm_stream(source, report, work_dir), language, workers, use_vad,
+        cache=cache, cache_key=cache_key, report=report, backend=backend, cancel=cancel
+    )
+
+def transcribe_pcm_stream(open_stream, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                          cache=None, cache_key=None, report=_ignore, backend=DEFAULT_BACKEND, cancel=None):
+    """Transcrit le flux PCM ouvert par open_stream() -> (sortie PCM, durée, fermeture)
+
+    La mémoire reste bornée quelle que soit la durée : seuls quelques segments
+    sont lus d'avance, au rythme de la reconnaissance.
+    """
+    try:
+        # Le modèle est chargé avant d'ouvrir le flux, qui ne serait sinon jamais refermé
+        backend = get_backend(backend)
+        with measure(report, 'stream_open'):
+            stream, duration, close = open_stream()
+        # Le nombre de segments n'est connu à l'avance que pour un découpage fixe
+        total = math.ceil(duration / SEGMENT_DURATION) if duration and not use_vad else None
+        return transcribe_segments(
+            stream_audio_segments(stream, close, use_vad), language, workers, total,
+            cache=cache, cache_key=cache_key, report=report, backend=backend, cancel=cancel
+        )
+    except Exception as e:
+        report('error', f"❌ Erreur de transcription en flux : {str(e)}")
+        return None
+
+def map_wav(path):
+    """Projette en mémoire les échantillons d'un WAV PCM 16 bits ; retourne (tableau int16, fréquence, canaux)
+
+    L'en-tête n'est lu qu'une fois ; les données restent dans le fichier et ne
+    sont lues qu'à mesure que les segments sont consultés.
+    """
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Fichier WAV invalide")
+        sample_rate = channels = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("Données audio absentes du fichier WAV")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(size)
+                _, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+                if bits != 16:
+                    raise ValueError(f"Format WAV non pris en charge : {bits} bits par échantillon")
+                f.seek(size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+    if sample_rate is None:
+        raise ValueError("En-tête WAV incomplet")
+    # La taille annoncée peut être fausse (écriture interrompue, fichier de plus de 4 Go)
+    count = (os.path.getsize(path) - offset) // SAMPLE_WIDTH
+    count = min(count, size // SAMPLE_WIDTH) if size not in (0, 0xFFFFFFFF) else count
+    if count <= 0:
+        return np.zeros(0, dtype='<i2'), sample_rate, channels
+    return np.memmap(path, dtype='<i2', mode='r', offset=offset, shape=(count,)), sample_rate, channels
+
+def audio_view(samples, start, end, sample_rate=SAMPLE_RATE):
+    """AudioData sur une tranche du tableau d'échantillons, sans copie"""
+    return sr.AudioData(memoryview(samples[start:end]).cast('B'), sample_rate, SAMPLE_WIDTH)
+
+def plan_segments(samples, sample_rate=SAMPLE_RATE, use_vad=True):
+    """Segments [début, fin[ (en échantillons) d'un signal mono : sur les pauses, ou de durée fixe"""
+    if use_vad:
+        # Découpage sur les pauses : les passages sans parole ne sont pas envoyés
+        return plan_chunks(samples, sample_rate, SEGMENT_DURATION * 1000)
+    step = SEGMENT_DURATION * sample_rate
+    return [(start, min(start + step, len(samples))) for start in range(0, len(samples), step)]
+
+def transcribe_audio(audio_path, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                     cache=None, cache_key=None, report=_ignore, backend=DEFAULT_BACKEND, cancel=None):
+    """Transcrit le fichier audio en le découpant en segments traités en parallèle
+
+    Le WAV est projeté en mémoire et chaque segment est une vue sur ses
+    échantillons : aucun fichier intermédiaire n'est écrit.
+    """
+    try:
+        with measure(report, 'split', bytes_in=os.path.getsize(audio_path)):
+            samples, sample_rate, channels = map_wav(audio_path)
+            if channels != 1:
+                raise ValueError(f"Audio mono attendu ({channels} canaux)")
+            bounds = plan_segments(samples, sample_rate, use_vad)
+        segments = (
+            (start * 1000 // sample_rate, audio_view(samples, start, end, sample_rate))
+            for start, end in bounds
+        )
+        return transcribe_segments(
+            segments, language, workers, total=len(bounds),
+            cache=cache, cache_key=cache_key, report=report, backend=backend, cancel=cancel
+        )
+        
+    except Exception as e:
+        report('error', f"Erreur de transcription: {str(e)}")
+        return None
+        
+    finally:
+        # Nettoyage du fichier temporaire (la projection en mémoire reste valide jusqu'à sa libération)
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+
+
+def improve_text_with_gpt(text, style='default', api_key=None, report=_ignore,
+                          model=None, workers=None, cache=None, api_base=None):
+    """Améliore le texte avec GPT (clé passée en paramètre ou variable OPENAI_API_KEY)
+
+    Le texte est traité par morceaux en parallèle, avec cache par morceau :
+    voir le module improve.
+    """
+    try:
+        import openai  # Import local
+        import improve
+
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            report('warning', "⚠️ Clé API OpenAI non configurée.")
+            return None
+
+        return improve.improve_text(
+            text, style,
+            model=model or improve.DEFAULT_MODEL,
+            api_key=api_key,
+            api_base=api_base or openai.api_base,  # OPENAI_API_BASE, lue par le module openai
+            workers=workers or improve.DEFAULT_WORKERS,
+            cache=cache,
+            report=report
+        )
+
+    except ImportError:
+        report('error', "❌ Module OpenAI non installé")
+        return None
+    except Exception as e:
+        report('error', f"Erreur lors de l'amélioration du texte : {str(e)}")
+        return None
+
+def is_url(source):
+    """Vrai si la source est une URL http(s) plutôt qu'un chemin ou un fichier uploadé"""
+    return isinstance(source, str) and urlparse(source).scheme in ('http', 'https')
+
+def source_label(source):
+    """Nom lisible d'une source : URL, chemin ou nom du fichier uploadé"""
+    return source if isinstance(source, str) else source.name
+
+def language_hint(source):
+    """Langue annoncée par la plateforme (métadonnées PeerTube ou yt-dlp), ou None
+
+    Les métadonnées yt-dlp sont celles mises en cache pour le téléchargement :
+    la question ne coûte pas d'extraction supplémentaire.
+    """
+    if not is_url(source):
+        return None
+    try:
+        peertube_video = lookup_video(source)
+        if peertube_video:
+            return (peertube_video[0].get('language') or {}).get('id')
+        with yt_dlp.YoutubeDL(build_ydl_opts(source, '-')) as ydl:
+            return media_info.extract_info(ydl, source).get('language')
+    except Exception:
+        return None
+
+def language_candidates(hint=None):
+    """Langues candidates de la détection ; celle annoncée par la plateforme passe en tête"""
+    if not hint:
+        return list(LANGUAGE_CANDIDATES)
+    code = hint.split('-')[0].lower()
+    matching = [c for c in LANGUAGE_CANDIDATES if c.split('-')[0].lower() == code] or [hint]
+    return matching + [c for c in LANGUAGE_CANDIDATES if c not in matching]
+
+def source_cache_key(source, language='fr-FR', use_vad=True, backend=DEFAULT_BACKEND, streaming=False):
+    """Clé du cache des transcriptions pour une URL, un chemin local ou un fichier uploadé
+
+    `streaming` : transcription en flux, dont le découpage sur les pauses diffère (segmentation_id).
+    """
+    if is_url(source):
+        source_id = url_source_id(source)
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            source_id = file_source_id(f)
+    else:
+        source.seek(0)
+        source_id = file_source_id(source)
+    variant = segmentation_id(use_vad, streaming)
+    # Une instance de moteur est désignée par son nom, stable d'une exécution à l'autre
+    backend = getattr(backend, 'name', backend)
+    # Les clés du moteur par défaut restent celles d'avant l'ajout des moteurs locaux
+    if backend != DEFAULT_BACKEND:
+        variant += f"/{backend}"
+    return cache_key(source_id, language, variant)
+
+def captions_cache_key(url, language=None):
+    """Clé du cache des transcriptions tirées des sous-titres de la plateforme
+
+    Distincte de celle de la reconnaissance (source_cache_key) : décocher les
+    sous-titres doit bien relancer la reconnaissance vocale.
+    """
+    return cache_key(url_source_id(url), language or AUTO_LANGUAGE, f"captions/{CACHE_FORMAT}")
+
+def _fetch_captions(url, language=None, report=_ignore):
+    """Piste de sous-titres choisie et son contenu, ou (None, None) si la plateforme n'en a pas"""
+    peertube_video = lookup_video(url)
+    if peertube_video:
+        video_data, base_url = peertube_video
+        track = choose_track(
+            fetch_peertube_captions(video_data, base_url), language, (video_data.get('language') or {}).get('id')
+        )
+        if not track:
+            return None, None
+        response = http_session().get(track[2], timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        return track, response.text
+    
+    # Les métadonnées sont celles que le téléchargement réutiliserait : pas d'extraction de plus
+    with yt_dlp.YoutubeDL(build_ydl_opts(url, '-')) as ydl:
+        info = media_info.extract_info(ydl, url, report)
+        track = choose_track(tracks_from_info(info), language, info.get('language'))
+        if not track:
+            return None, None
+        return track, ydl.urlopen(track[2]).read().decode('utf-8', 'replace')
+
+def transcribe_captions(url, language=None, report=_ignore, cache=None):
+    """Transcript tiré des sous-titres publiés par la plateforme, sans télécharger l'audio
+
+    `language` : code voulu, ou None pour la langue annoncée par la plateforme.
+    Retourne None si aucune piste ne convient : l'audio doit alors être reconnu.
+    Le Transcript obtenu est mis en cache (captions_cache_key).
+    """
+    key = captions_cache_key(url, language) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            report('info', "✅ Sous-titres de la plateforme trouvés en cache")
+            return Transcript.from_json(cached)
+    try:
+        with measure(report, 'captions') as m:
+            track, text = _fetch_captions(url, language, report)
+            m.data['bytes_out'] = len(text or '')
+    except Exception as e:
+        report('warning', f"⚠️ Sous-titres de la plateforme illisibles ({str(e)}) : reconnaissance vocale")
+        return None
+    segments = parse_captions(text) if track else []
+    if not segments:
+        report('info', "💬 Pas de sous-titres publiés dans cette langue : reconnaissance vocale")
+        return None
+    kind = "automatiques" if track[3] else "manuels"
+    report('info', f"💬 Sous-titres {kind} de la plateforme utilisés ({track[0]}) : pas de reconnaissance vocale")
+    transcript = Transcript(segments, language or track[0].removesuffix('-orig'))
+    if cache:
+        cache.put(key, transcript.to_json())
+    return transcript
+
+def prepare_audio(source, report=_ignore, work_dir=None):
+    """Télécharge ou convertit une source en WAV normalisé dans work_dir, retourne son chemin ou None"""
+    if is_url(source):
+        return download_and_convert_to_wav(source, report, work_dir)
+    if isinstance(source, str):
+        return process_local_file(source, report, work_dir)
+    return process_uploaded_file(source, report, work_dir)
+
+def transcribe(source, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True, streaming=True,
+               cache=None, report=_ignore, backend=DEFAULT_BACKEND, cancel=None, captions=True):
+    """Transcrit une URL, un chemin local ou un fichier uploadé ; retourne un Transcript ou None
+
+    Si `cancel` (threading.Event) est posé en cours de route, retourne les segments déjà reconnus.
+    Avec `captions`, les sous-titres publiés par la plateforme (transcribe_captions)
+    remplacent la reconnaissance quand il en existe dans la langue voulue.
+    """
+    key = None
+    if cache:
+        # Une transcription déjà connue évite tout téléchargement
+        key = source_cache_key(source, language, use_vad, backend, streaming)
+        cached = cache.get(key)
+        if cached is not None:
+            report('info', "✅ Transcription trouvée en cache")
+            return Transcript.from_json(cached)
+    if captions and is_url(source):
+        transcript = transcribe_captions(source, None if language == AUTO_LANGUAGE else language, report, cache)
+        if transcript:
+            return transcript
+    if language == AUTO_LANGUAGE:
+        language = language_candidates(language_hint(source))
+    
+    # Tous les fichiers de la tâche sont dans son dossier, supprimé à la fin quoi qu'il arrive
+    with SCRATCH.job(report) as work_dir:
+        if streaming:
+            transcribe_stream = transcribe_url_stream if is_url(source) else transcribe_file_stream
+            return transcribe_stream(
+                source, language, workers, use_vad,
+                cache=cache, cache_key=key, report=report, backend=backend, work_dir=work_dir,
+                cancel=cancel
+            )
+        
+        audio_path = prepare_audio(source, report, work_dir)
+        if not audio_path or (cancel is not None and cancel.is_set()):
+            return None
+        return transcribe_audio(
+            audio_path, language, workers, use_vad,
+            cache=cache, cache_key=key, report=report, backend=backend, cancel=cancel
+        )
+
+def expand_playlist(url):
+    """Retourne les URL des vidéos d'une playlist, ou [url] si ce n'en est pas une"""
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'noplaylist': False,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if info.get('_type') != 'playlist':
+        return [url]
+    entries = [entry for entry in info.get('entries') or [] if entry]
+    return [entry.get('url') or entry.get('webpage_url') for entry in entries
+            if entry.get('url') or entry.get('webpage_url')]
+
+def build_batch(sources, expand_playlists=False, report=_ignore):
+    """Construit les éléments d'un lot à partir d'URL, de chemins ou de fichiers uploadés"""
+    expanded = []
+    for source in sources:
+        if is_url(source) and expand_playlists:
+            try:
+                expanded.extend(expand_playlist(source))
+                continue
+            except Exception as e:
+                report('warning', f"⚠️ Playlist illisible ({source}) : {str(e)}")
+        expanded.append(source)
+    return [BatchItem(i, source, source_label(source)) for i, source in enumerate(expanded)]
+
+def _metrics_only(report):
+    """Rapporteur qui ne transmet que les mesures (acceptées depuis n'importe quel thread)"""
+    def forward(event, message=None, **data):
+        if event == 'metric':
+            report(event, message, **data)
+    return forward
+
+def start_batch(items, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                download_workers=2, recognition_workers=2, cache=None, metrics=None,
+                backend=DEFAULT_BACKEND, captions=True, cancel=None, report=None):
+    """Démarre un lot en arrière-plan et retourne son BatchRunner
+
+    Les threads du lot n'affichent rien : seules leurs mesures sont enregistrées,
+    dans `metrics` (StageMetrics) ou à défaut dans les mesures du processus, ou
+    transmises à `report` (seuls ses événements 'metric' sont émis). Avec
+    `captions`, un élément sous-titré par sa plateforme n'est pas téléchargé. Si
+    `cancel` (threading.Event) est posé, les éléments restants sont abandonnés.
+    """
+    keys = {}
+    work_dirs = {}
+    if report is None:
+        report = (metrics or REGISTRY).reporter()
+    else:
+        report = _metrics_only(report)
+    
+    def item_key(item):
+        if item.index not in keys:
+            keys[item.index] = source_cache_key(item.source, language, use_vad, backend)
+        return keys[item.index]
+    
+    def lookup(item):
+        cached = cache.get(item_key(item)) if cache else None
+        if cached is not None:
+            return Transcript.from_json(cached)
+        if captions and is_url(item.source):
+            return transcribe_captions(item.source, None if language == AUTO_LANGUAGE else language, report, cache)
+        return None
+    
+    def download(item):
+        # Le dossier de l'élément vit du téléchargement à la fin de sa transcription
+        work_dirs[item.index] = SCRATCH.acquire(report)
+        audio_path = None
+        try:
+            audio_path = prepare_audio(item.source, report, work_dirs[item.index])
+        finally:
+            if not audio_path:
+                SCRATCH.release(work_dirs.pop(item.index))
+        return audio_path
+    
+    def transcribe_item(item, audio_path):
+        try:
+            item_language = language
+            if language == AUTO_LANGUAGE:
+                item_language = language_candidates(language_hint(item.source))
+            return transcribe_audio(
+                audio_path, item_language, workers, use_vad,
+                cache=cache, cache_key=item_key(item) if cache else None, report=report,
+                backend=backend, cancel=cancel
+            )
+        finally:
+            SCRATCH.release(work_dirs.pop(item.index))
+    
+    return BatchRunner(
+        items, lookup, download, transcribe_item,
+        download_workers, recognition_workers, cancel
+    ).start()
+
+def transcribe_batch(items, language='fr-FR', workers=DEFAULT_WORKERS, use_vad=True,
+                     download_workers=2, recognition_workers=2, cache=None,
+                     backend=DEFAULT_BACKEND, captions=True, report=_ignore, cancel=None):
+    """Exécute un lot jusqu'au bout ; retourne l'état final de chaque élément (BatchItem.to_dict)
+
+    Prévu pour tourner comme une tâche de JobManager : l'avancement et les
+    éléments en erreur sont signalés depuis le thread appelant, et `cancel`
+    abandonne les éléments pas encore commencés.
+    """
+    runner = start_batch(
+        items, language, workers, use_vad,
+        download_workers, recognition_workers,
+        cache=cache, backend=backend, captions=captions, cancel=cancel, report=report
+    )
+    signalled = set()
+    while True:
+        finished = runner.join(timeout=BATCH_POLL_INTERVAL)
+        for item in items:
+            if item.status == FAILED and item.index not in signalled:
+                signalled.add(item.index)
+                report('warning', f"⚠️ {item.label} : {item.error}")
+        counts = runner.counts()
+        completed = counts.get(DONE, 0) + counts.get(FAILED, 0)
+        report('progress', f"Lot en cours... ({completed}/{len(items)})",
+               value=completed / len(items) if items else 1.0, stage='batch')
+        if finished:
+            break
+    report('info', f"📚 Lot terminé : {counts.get(DONE, 0)} réussis, {counts.get(FAILED, 0)} en erreur")
+    return [item.to_dict(transcription=True) for item in items]
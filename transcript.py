@@ -0,0 +1,126 @@
+"""Transcription structurée : segments horodatés et exports texte, SRT, WebVTT et JSON.
+
+Les positions sont stockées en millisecondes depuis le début du média. Le texte
+brut, les sous-titres et le JSON sont tous produits à partir du même objet, sans
+relancer la reconnaissance ; les positions permettent aussi de ne retraiter
+qu'une plage de temps choisie.
+"""
+import json
+import textwrap
+
+OK = 'ok'
+INAUDIBLE = 'inaudible'
+ERROR = 'error'
+
+MAX_CUE_CHARS = 84     # au plus deux lignes de 42 caractères par sous-titre
+MAX_LINE_CHARS = 42
+
+
+class Segment:
+    """Un segment reconnu : début et fin (ms), texte et statut"""
+
+    __slots__ = ('start', 'end', 'text', 'status')
+
+    def __init__(self, start, end, text='', status=OK):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.status = status
+
+    def to_list(self):
+        return [self.start, self.end, self.text, self.status]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def __repr__(self):
+        return f"Segment({self.start}, {self.end}, {self.text!r}, {self.status!r})"
+
+
+class Transcript:
+    """Suite ordonnée de segments ; str() donne le texte brut"""
+
+    __slots__ = ('segments', 'language')
+
+    def __init__(self, segments=(), language=None):
+        self.segments = list(segments)
+        self.language = language
+
+    @property
+    def text(self):
+        return ' '.join(segment.text for segment in self.segments if segment.text)
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return any(segment.text for segment in self.segments)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def between(self, start_ms, end_ms):
+        """Segments qui chevauchent la plage [start_ms, end_ms["""
+        return [s for s in self.segments if s.start < end_ms and s.end > start_ms]
+
+    def to_dict(self):
+        return {
+            'language': self.language,
+            'text': self.text,
+            'segments': [
+                {'start': s.start / 1000, 'end': s.end / 1000, 'text': s.text, 'status': s.status}
+                for s in self.segments
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            (Segment(round(s['start'] * 1000), round(s['end'] * 1000), s['text'], s['status'])
+             for s in data['segments']),
+            data.get('language')
+        )
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def to_srt(self):
+        blocks = []
+        for i, (start, end, text) in enumerate(self._cues(), start=1):
+            blocks.append(f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n")
+        return '\n'.join(blocks)
+
+    def to_vtt(self):
+        blocks = ['WEBVTT\n']
+        for start, end, text in self._cues():
+            blocks.append(f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n")
+        return '\n'.join(blocks)
+
+    def _cues(self):
+        """Découpe chaque segment en sous-titres lisibles, la durée répartie selon la longueur du texte"""
+        for segment in self.segments:
+            if not segment.text:
+                continue
+            parts = textwrap.wrap(segment.text, MAX_CUE_CHARS)
+            duration = segment.end - segment.start
+            total = sum(len(part) for part in parts)
+            start = segment.start
+            consumed = 0
+            for i, part in enumerate(parts):
+                consumed += len(part)
+                # Positions calculées depuis le début du segment : le dernier sous-titre finit exactement avec lui
+                end = segment.end if i == len(parts) - 1 else segment.start + duration * consumed // total
+                yield start, end, '\n'.join(textwrap.wrap(part, MAX_LINE_CHARS))
+                start = end
+
+
+def _timestamp(ms, separator):
+    hours, ms = divmod(int(ms), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
@@ -0,0 +1,167 @@
+"""Cache persistant des transcriptions, adressé par contenu.
+
+Chaque entrée est identifiée par la source (identifiant yt-dlp, URL normalisée
+ou empreinte du fichier), la langue et le mode de découpage. Elle contient la
+transcription finale et les résultats par segment, ce qui permet de reprendre
+une transcription interrompue. Les entrées les moins récemment utilisées sont
+évincées quand la taille totale dépasse la limite.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'speech_extractor')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Paramètres de suivi qui ne changent pas le média désigné
+TRACKING_PARAMS = {'feature', 'si', 'pp', 'ab_channel', 'fbclid', 'gclid', 'igshid'}
+
+
+def normalize_url(url):
+    """Normalise une URL : schéma et domaine en minuscules, sans www, fragment ni paramètres de suivi"""
+    parsed = urlparse(url.strip())
+    netloc = parsed.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query)
+        if k not in TRACKING_PARAMS and not k.startswith('utm_')
+    )
+    return urlunparse((parsed.scheme.lower() or 'https', netloc, parsed.path.rstrip('/'), '', urlencode(query), ''))
+
+
+def url_source_id(url):
+    """Identifiant stable d'une URL : extracteur et ID yt-dlp si reconnus, sinon URL normalisée"""
+    try:
+        from yt_dlp.extractor import gen_extractor_classes
+
+        # Correspondance purement locale sur les motifs d'URL, sans requête réseau
+        for ie in gen_extractor_classes():
+            if ie.ie_key() == 'Generic' or not ie.suitable(url):
+                continue
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                return f"{ie.ie_key()}:{video_id}"
+            break
+    except Exception:
+        pass
+    return f"url:{normalize_url(url)}"
+
+
+def file_source_id(buffer, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier (bytes, memoryview ou fichier ouvert)"""
+    digest = hashlib.sha256()
+    if hasattr(buffer, 'read'):
+        for chunk in iter(lambda: buffer.read(chunk_size), b''):
+            digest.update(chunk)
+    else:
+        view = memoryview(buffer)
+        for start in range(0, len(view), chunk_size):
+            digest.update(view[start:start + chunk_size])
+    return f"sha256:{digest.hexdigest()}"
+
+
+def cache_key(source_id, language, variant=''):
+    """Clé d'une entrée : source, langue et variante de traitement (découpage...)"""
+    return '|'.join((source_id, language, variant))
+
+
+class TranscriptCache:
+    """Cache SQLite des transcriptions, partagé entre les threads d'un même processus"""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+            path = os.path.join(DEFAULT_CACHE_DIR, 'transcripts.sqlite3')
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, transcript TEXT,"
+                " size INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " key TEXT NOT NULL, idx INTEGER NOT NULL, text TEXT NOT NULL,"
+                " PRIMARY KEY (key, idx))"
+            )
+
+    def get(self, key):
+        """Retourne la transcription complète, ou None ; met à jour les compteurs"""
+        with self._lock:
+            row = self._db.execute("SELECT transcript FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] is None:
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, transcript):
+        """Enregistre la transcription complète"""
+        with self._lock, self._db:
+            self._touch(key)
+            self._db.execute(
+                "UPDATE entries SET transcript = ?, size = size + ? WHERE key = ? AND transcript IS NULL",
+                (transcript, len(transcript.encode('utf-8')), key)
+            )
+            self._evict(keep=key)
+
+    def get_segments(self, key):
+        """Retourne les segments déjà transcrits, sous forme {index: texte}"""
+        with self._lock:
+            rows = self._db.execute("SELECT idx, text FROM segments WHERE key = ?", (key,)).fetchall()
+        return dict(rows)
+
+    def put_segment(self, key, index, text):
+        """Enregistre le résultat d'un segment (texte vide si inaudible)"""
+        with self._lock, self._db:
+            self._touch(key)
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO segments (key, idx, text) VALUES (?, ?, ?)", (key, index, text)
+            )
+            if cursor.rowcount:
+                self._db.execute(
+                    "UPDATE entries SET size = size + ? WHERE key = ?", (len(text.encode('utf-8')), key)
+                )
+                self._evict(keep=key)
+
+    def delete(self, key):
+        """Supprime l'entrée et ses segments (valeur périmée à remplacer)"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM segments WHERE key = ?", (key,))
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def total_size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _touch(self, key):
+        self._db.execute(
+            "INSERT INTO entries (key, last_access) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET last_access = excluded.last_access",
+            (key, time.time())
+        )
+
+    def _evict(self, keep):
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous la limite"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries WHERE key != ? ORDER BY last_access", (keep,)
+        ).fetchall():
+            self._db.execute("DELETE FROM segments WHERE key = ?", (key,))
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
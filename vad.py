@@ -0,0 +1,144 @@
+"""Découpage de l'audio sur les pauses, par détection d'activité vocale.
+
+L'énergie est calculée par trames de quelques millisecondes de façon vectorisée
+(numpy). Les trames au-dessus d'un seuil adaptatif (plancher de bruit + marge)
+sont considérées comme de la parole ; les courts silences sont comblés, les
+courtes bouffées sont ignorées. Les régions de parole sont ensuite regroupées en
+segments d'au plus `max_ms`, coupés de préférence au milieu d'une pause ; les
+longs passages sans parole ne sont jamais envoyés au reconnaisseur.
+"""
+import numpy as np
+
+FRAME_MS = 20             # durée d'une trame d'analyse
+MAX_CHUNK_MS = 30000      # longueur maximale d'un segment envoyé au reconnaisseur
+MIN_SILENCE_MS = 300      # pause minimale pour séparer deux régions de parole
+MAX_MERGE_GAP_MS = 2000   # au-delà, deux régions ne sont pas regroupées dans un même segment
+MIN_SPEECH_MS = 250       # bouffée d'énergie minimale retenue comme parole
+PADDING_MS = 200          # marge conservée autour de chaque segment
+MARGIN_DB = 12            # écart au plancher de bruit pour détecter la parole
+LOUD_MARGIN_DB = 10       # le seuil reste au moins à cet écart sous les passages forts
+SILENCE_FLOOR_DB = -50    # en dessous de ce niveau, une trame est toujours silencieuse
+ENERGY_BLOCK_FRAMES = 10000  # trames analysées à la fois (200 s d'audio), pour borner la mémoire
+
+
+def frame_energies(samples, frame_len):
+    """Niveau de chaque trame en dBFS, pour des échantillons int16 mono
+
+    Le calcul se fait par blocs de trames : un signal projeté en mémoire
+    (np.memmap) n'est jamais converti en entier en flottants.
+    """
+    n_frames = len(samples) // frame_len
+    energies = np.empty(n_frames, dtype=np.float32)
+    for first in range(0, n_frames, ENERGY_BLOCK_FRAMES):
+        last = min(first + ENERGY_BLOCK_FRAMES, n_frames)
+        frames = samples[first * frame_len:last * frame_len].astype(np.float32).reshape(last - first, frame_len)
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+        energies[first:last] = 20 * np.log10(rms + 1e-10)
+    return energies
+
+
+def _runs(mask):
+    """Retourne les plages [début, fin[ où le masque booléen est vrai"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges.reshape(-1, 2)
+
+
+def speech_mask(energies, frame_ms=FRAME_MS, min_silence_ms=MIN_SILENCE_MS,
+                min_speech_ms=MIN_SPEECH_MS, margin_db=MARGIN_DB):
+    """Masque des trames de parole, lissé pour ignorer les micro-pauses et les clics"""
+    if len(energies) == 0:
+        return np.zeros(0, dtype=bool)
+    # Plancher de bruit + marge, mais toujours sous le niveau des passages forts : un
+    # enregistrement presque sans pause ne doit pas être entièrement classé comme silence
+    noise_floor, loud = np.percentile(energies, [10, 90])
+    threshold = max(min(noise_floor + margin_db, loud - LOUD_MARGIN_DB), SILENCE_FLOOR_DB)
+    mask = energies > threshold
+
+    # Comble les silences trop courts pour être une vraie pause
+    min_silence = max(1, min_silence_ms // frame_ms)
+    for start, end in _runs(~mask):
+        if end - start < min_silence and start > 0 and end < len(mask):
+            mask[start:end] = True
+
+    # Supprime les bouffées trop courtes pour être de la parole
+    min_speech = max(1, min_speech_ms // frame_ms)
+    for start, end in _runs(mask):
+        if end - start < min_speech:
+            mask[start:end] = False
+    return mask
+
+
+def plan_chunks(samples, sample_rate, max_ms=MAX_CHUNK_MS, frame_ms=FRAME_MS, padding_ms=PADDING_MS):
+    """Calcule les segments de parole [début, fin[ (en échantillons) d'un signal int16 mono"""
+    frame_len = sample_rate * frame_ms // 1000
+    energies = frame_energies(samples, frame_len)
+    mask = speech_mask(energies, frame_ms)
+    max_frames = max_ms // frame_ms
+    max_gap = MAX_MERGE_GAP_MS // frame_ms
+    pad = padding_ms // frame_ms
+
+    chunks = []
+    for start, end in _runs(mask).tolist():
+        # Regroupe avec le segment précédent si la pause est courte et la durée maximale respectée
+        if chunks and start - chunks[-1][1] <= max_gap and end - chunks[-1][0] <= max_frames - 2 * pad:
+            chunks[-1][1] = end
+            continue
+        # Une région trop longue est coupée dans la seconde moitié de la fenêtre, à la
+        # dernière trame proche du minimum d'énergie pour garder des segments longs
+        while end - start > max_frames - 2 * pad:
+            window = energies[start + max_frames // 2:start + max_frames - 2 * pad]
+            quiet = np.flatnonzero(window <= window.min() + 3)
+            cut = start + max_frames // 2 + int(quiet[-1])
+            chunks.append([start, cut])
+            start = cut
+        chunks.append([start, end])
+
+    n_frames = len(energies)
+    return [
+        (max(0, start - pad) * frame_len, min(n_frames, end + pad) * frame_len)
+        for start, end in chunks
+    ]
+
+
+def iter_speech_chunks(blocks, sample_rate, max_ms=MAX_CHUNK_MS):
+    """Découpe un flux de blocs PCM int16 mono au fil de l'eau ; génère (début_ms, fin_ms, octets)
+
+    Un tampon d'au moins deux segments est analysé à la fois. Un segment est
+    émis dès qu'il est suivi d'une autre région de parole ou d'au moins
+    MAX_MERGE_GAP_MS sans parole : il ne peut plus être prolongé. Seul le
+    segment qui touche la fin du tampon est gardé pour l'analyse suivante ; le
+    silence qui le précède est abandonné, si bien que le tampon ne dépasse pas
+    la fenêtre d'analyse, même pendant un long silence.
+    """
+    window = 2 * max_ms * sample_rate // 1000
+    # Fin de parole + marge du segment : au-delà, la région suivante ne serait plus regroupée
+    settled = (MAX_MERGE_GAP_MS + PADDING_MS) * sample_rate // 1000
+    buffer = np.zeros(0, dtype=np.int16)
+    offset = 0  # position du tampon dans le flux, en échantillons
+
+    def emit(chunks):
+        for start, end in chunks:
+            yield ((offset + start) * 1000 // sample_rate,
+                   (offset + end) * 1000 // sample_rate,
+                   buffer[start:end].tobytes())
+
+    for block in blocks:
+        buffer = np.concatenate((buffer, np.frombuffer(block, dtype=np.int16)))
+        if len(buffer) < window:
+            continue
+        chunks = plan_chunks(buffer, sample_rate, max_ms)
+        if chunks and len(buffer) - chunks[-1][1] < settled:
+            # Le dernier segment peut se poursuivre dans le bloc suivant : il est gardé
+            yield from emit(chunks[:-1])
+            keep_from = chunks[-1][0]
+        else:
+            # Tout est émis ; seule la fin du silence reste, pour estimer le plancher de bruit
+            yield from emit(chunks)
+            keep_from = max(chunks[-1][1] if chunks else 0, len(buffer) - window // 4)
+        keep_from = int(keep_from)
+        buffer = buffer[keep_from:]
+        offset += keep_from
+
+    if len(buffer):
+        yield from emit(plan_chunks(buffer, sample_rate, max_ms))